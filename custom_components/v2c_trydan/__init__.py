@@ -1,20 +1,70 @@
 """The v2c_trydan component."""
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse, callback
 from homeassistant.const import CONF_IP_ADDRESS, Platform
-from homeassistant.helpers import device_registry as dr, config_validation as cv
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry as dr, entity_registry as er, config_validation as cv
+from homeassistant.helpers.storage import STORAGE_DIR, Store
+from homeassistant.util import dt as dt_util
+from datetime import timedelta
+import asyncio
+import contextlib
 import logging
+import math
+import os
 import aiohttp
+import voluptuous as vol
 
+from .const import (
+    DOMAIN,
+    DATA_BALANCER,
+    DATA_FLEET,
+    LEGACY_UNIQUE_IDS,
+    CONF_BALANCE_WEIGHT,
+    CONF_GRID_MARGIN_W,
+    DEFAULT_GRID_MARGIN_W,
+    CONF_PRECIO_LUZ,
+    CONF_KWH_PER_100KM,
+    SAMPLE_BUFFER_CAPACITY,
+    SNAPSHOT_STORAGE_VERSION,
+)
 from .coordinator import V2CtrydanDataUpdateCoordinator
+from .entity import async_get_device_entity_id
+from .fleet import FleetScheduler
+from .samples import SampleRing
+from .session_statistics import SessionStatistics
 
 _LOGGER = logging.getLogger(__name__)
 
-DOMAIN = "v2c_trydan"
-
 PLATFORMS = [Platform.SENSOR, Platform.SWITCH, Platform.NUMBER, Platform.SELECT]
 
+SERVICES = [
+    "set_min_intensity",
+    "set_max_intensity",
+    "set_dynamic_power_mode",
+    "set_intensity",
+    "set_min_intensity_slider",
+    "set_max_intensity_slider",
+    "set_dynamic_power_mode_slider",
+    "backtest",
+]
+
+BACKTEST_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_IP_ADDRESS): str,
+        vol.Optional("csv_path"): str,
+        vol.Optional("price_entity_id"): cv.entity_id,
+        vol.Optional("days", default=30): vol.All(vol.Coerce(int), vol.Range(min=1, max=400)),
+        vol.Optional("arrival_hour", default=19): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+        vol.Optional("departure_hour", default=7): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+        vol.Optional("daily_energy_kwh"): vol.Coerce(float),
+        vol.Optional("power_kw"): vol.All(vol.Coerce(float), vol.Range(min=0.5)),
+        vol.Optional("max_prices", default=[0.06, 0.08, 0.10, 0.12, 0.14, 0.16, 0.18, 0.20]): [vol.Coerce(float)],
+        vol.Optional("cheapest_hours", default=[2, 3, 4, 5, 6, 8]): [vol.Coerce(int)],
+        vol.Optional("min_surplus_kw", default=[1.0, 2.0, 3.0]): [vol.Coerce(float)],
+    }
+)
+
 # Configuration schema - this integration is config entry only
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
@@ -38,28 +88,104 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
     
     ip_address = entry.data[CONF_IP_ADDRESS]
+
+    # Unique IDs used to be global, make them per device
+    @callback
+    def _migrate_unique_id(entity_entry):
+        if entity_entry.unique_id in LEGACY_UNIQUE_IDS:
+            return {"new_unique_id": f"{ip_address}_{entity_entry.unique_id}"}
+        return None
+
+    await er.async_migrate_entries(hass, entry.entry_id, _migrate_unique_id)
     
     # Create the coordinator
     coordinator = V2CtrydanDataUpdateCoordinator(hass, ip_address)
+
+    # Samples of earlier runs live in a memory-mapped file
+    try:
+        samples = await hass.async_add_executor_job(_open_samples, _samples_path(hass, entry))
+    except OSError as err:
+        _LOGGER.warning(f"Samples of {ip_address} are kept in memory only: {err}")
+    else:
+        coordinator.samples.close()
+        coordinator.samples = samples
     
-    # Fetch initial data
-    await coordinator.async_config_entry_first_refresh()
+    # With the snapshot of the last run the entities are created right away
+    # and the first poll runs in the background; a new charger has to answer
+    restored = await coordinator.async_restore_snapshot(_snapshot_store(hass, entry))
+    if not restored:
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            await hass.async_add_executor_job(coordinator.samples.close)
+            raise
     
-    # Store the coordinator
+    # Store the coordinator and hand its polls to the fleet scheduler
     hass.data[DOMAIN][entry.entry_id] = coordinator
-    
-    # Register device
-    device_registry = dr.async_get(hass)
-    device_registry.async_get_or_create(
-        config_entry_id=entry.entry_id,
-        identifiers={(DOMAIN, coordinator.ip_address)},
-        manufacturer="V2C",
-        model="Trydan",
-        name=f"V2C Trydan ({coordinator.ip_address})",
-        configuration_url=f"http://{coordinator.ip_address}",
-    )
-    
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    if DATA_FLEET not in hass.data:
+        hass.data[DATA_FLEET] = FleetScheduler(hass)
+    hass.data[DATA_FLEET].async_register(coordinator)
+    if restored:
+        hass.data[DATA_FLEET].async_poll_within(coordinator, 0)
+
+    session_statistics = None
+    try:
+        # Register device
+        device_registry = dr.async_get(hass)
+        device_registry.async_get_or_create(
+            config_entry_id=entry.entry_id,
+            **coordinator.device_info,
+        )
+
+        # Switches and numbers first: sensors look them up in the entity registry
+        await hass.config_entries.async_forward_entry_setups(
+            entry, [Platform.SWITCH, Platform.NUMBER, Platform.SELECT]
+        )
+        await hass.config_entries.async_forward_entry_setups(entry, [Platform.SENSOR])
+
+        # Charging sessions go to the long-term statistics
+        session_statistics = SessionStatistics(hass, coordinator, entry.options.get(CONF_KWH_PER_100KM, 15))
+        await session_statistics.async_start()
+        entry.async_on_unload(session_statistics.async_stop)
+
+        # Chargers with a weight share the supply through the load balancer
+        _async_update_balancer(hass, entry, coordinator)
+        entry.async_on_unload(entry.add_update_listener(_async_options_updated))
+    except Exception:
+        # Leave nothing polling or open behind a failed setup
+        if session_statistics is not None:
+            session_statistics.async_stop()
+        await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+        await _async_release_coordinator(hass, entry)
+        raise
+
+    if not hass.services.has_service(DOMAIN, SERVICES[0]):
+        _async_register_services(hass)
+
+    return True
+
+def _get_coordinator(hass: HomeAssistant, call: ServiceCall):
+    """Return the coordinator targeted by a service call.
+
+    The optional ip_address field selects the charger; it is required only
+    when several chargers are configured.
+    """
+    coordinators = list(hass.data.get(DOMAIN, {}).values())
+    ip_address = call.data.get(CONF_IP_ADDRESS)
+    if ip_address is not None:
+        for coordinator in coordinators:
+            if coordinator.ip_address == ip_address:
+                return coordinator
+        _LOGGER.error(f"No V2C Trydan configured at {ip_address}")
+        return None
+    if len(coordinators) == 1:
+        return coordinators[0]
+    _LOGGER.error("Several V2C Trydan chargers are configured, the service call needs an ip_address")
+    return None
+
+@callback
+def _async_register_services(hass: HomeAssistant):
+    """Register the integration services, shared by every charger."""
 
     async def set_min_intensity(call: ServiceCall):
         #_LOGGER.debug("min_intensity service called")
@@ -68,19 +194,21 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             min_intensity = int(min_intensity)
             if 6 <= min_intensity <= 32:
                 #_LOGGER.debug(f"Valid min_intensity: {min_intensity}")
-                await async_set_min_intensity(hass, coordinator.ip_address, min_intensity)
+                if coordinator := _get_coordinator(hass, call):
+                    await async_set_min_intensity(coordinator, min_intensity)
             else:
                 _LOGGER.error("min_intensity must be between 6 and 32")
         except ValueError:
             _LOGGER.error(f"Invalid min_intensity: {min_intensity}. Must be an integer.")
 
-    async def async_set_dynamic_power_mode(call: ServiceCall):
+    async def set_dynamic_power_mode(call: ServiceCall):
         dynamic_power_mode = call.data.get("DynamicPowerMode")
         try:
             dynamic_power_mode = int(dynamic_power_mode)
             if 0 <= dynamic_power_mode <= 7:
                 #_LOGGER.debug(f"Valid dynamic_power_mode: {dynamic_power_mode}")
-                await async_set_dynamic_power_mode(hass, coordinator.ip_address, dynamic_power_mode)
+                if coordinator := _get_coordinator(hass, call):
+                    await async_set_dynamic_power_mode(coordinator, dynamic_power_mode)
             else:
                 _LOGGER.error("DynamicPowerMode must be between 0 and 7")
         except ValueError:
@@ -92,7 +220,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             max_intensity = int(max_intensity)
             if 6 <= max_intensity <= 32:
                 #_LOGGER.debug(f"Valid max_intensity: {max_intensity}")
-                await async_set_max_intensity(hass, coordinator.ip_address, max_intensity)
+                if coordinator := _get_coordinator(hass, call):
+                    await async_set_max_intensity(coordinator, max_intensity)
             else:
                 _LOGGER.error("max_intensity must be between 6 y 32")
         except ValueError:
@@ -104,7 +233,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             intensity = int(intensity)
             if 6 <= intensity <= 32:
                 #_LOGGER.debug(f"Valid intensity: {intensity}")
-                await async_set_intensity(hass, coordinator.ip_address, intensity)
+                if coordinator := _get_coordinator(hass, call):
+                    await async_set_intensity(coordinator, intensity)
             else:
                 _LOGGER.error("intensity must be between 6 y 32")
         except ValueError:
@@ -117,12 +247,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             try:
                 min_intensity = int(min_intensity)
                 if 6 <= min_intensity <= 32:
-                    if entry:
-                        ip_address = coordinator.ip_address
-                        #_LOGGER.debug(f"Calling async_set_min_intensity with IP: {ip_address} and min_intensity: {min_intensity}")
-                        await async_set_min_intensity(hass, ip_address, min_intensity)
-                    else:
-                        _LOGGER.error("Entry data not found for setting min_intensity_slider")
+                    if coordinator := _get_coordinator(hass, call):
+                        #_LOGGER.debug(f"Calling async_set_min_intensity with IP: {coordinator.ip_address} and min_intensity: {min_intensity}")
+                        await async_set_min_intensity(coordinator, min_intensity)
                 else:
                     _LOGGER.error("v2c_min_intensity must be between 6 y 32")
             except ValueError:
@@ -137,12 +264,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             try:
                 dynamic_power_mode = int(dynamic_power_mode)
                 if 0 <= dynamic_power_mode <= 7:
-                    if entry:
-                        ip_address = coordinator.ip_address
-                        #_LOGGER.debug(f"Calling async_set_dynamic_power_mode with IP: {ip_address} and dynamic_power_mode: {dynamic_power_mode}")
-                        await async_set_dynamic_power_mode(hass, coordinator.ip_address, dynamic_power_mode)
-                    else:
-                        _LOGGER.error("Entry data not found for setting dynamic_power_mode_slider")
+                    if coordinator := _get_coordinator(hass, call):
+                        #_LOGGER.debug(f"Calling async_set_dynamic_power_mode with IP: {coordinator.ip_address} and dynamic_power_mode: {dynamic_power_mode}")
+                        await async_set_dynamic_power_mode(coordinator, dynamic_power_mode)
                 else:
                     _LOGGER.error("v2c_dynamic_power_mode must be between 0 y 7")
             except ValueError:
@@ -157,12 +281,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             try:
                 max_intensity = int(max_intensity)
                 if 6 <= max_intensity <= 32:
-                    if entry:
-                        ip_address = coordinator.ip_address
-                        #_LOGGER.debug(f"Calling async_set_max_intensity with IP: {ip_address} and max_intensity: {max_intensity}")
-                        await async_set_max_intensity(hass, coordinator.ip_address, max_intensity)
-                    else:
-                        _LOGGER.error("Entry data not found for setting max_intensity_slider")
+                    if coordinator := _get_coordinator(hass, call):
+                        #_LOGGER.debug(f"Calling async_set_max_intensity with IP: {coordinator.ip_address} and max_intensity: {max_intensity}")
+                        await async_set_max_intensity(coordinator, max_intensity)
                 else:
                     _LOGGER.error("v2c_max_intensity must be between 6 y 32")
             except ValueError:
@@ -170,65 +291,207 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         else:
             _LOGGER.error("v2c_max_intensity not provided")
 
+    async def backtest(call: ServiceCall):
+        """Replay price history against the charging strategies."""
+        from .backtest import build_sessions, load_csv, run_backtest
+
+        coordinator = _get_coordinator(hass, call)
+        if coordinator is None:
+            raise HomeAssistantError("No V2C Trydan charger selected")
+        csv_path = call.data.get("csv_path")
+        if csv_path is not None:
+            if not hass.config.is_allowed_path(csv_path):
+                raise HomeAssistantError(f"{csv_path} is not in allowlist_external_dirs")
+            series = await hass.async_add_executor_job(load_csv, csv_path)
+        else:
+            series = await _async_load_history(hass, coordinator, call.data)
+
+        data = coordinator.data or {}
+        power_kw = call.data.get("power_kw") or (
+            data.get("MaxIntensity", 32) * (data.get("VoltageInstallation") or 230) / 1000
+        )
+        sessions = build_sessions(
+            series, call.data["arrival_hour"], call.data["departure_hour"], call.data.get("daily_energy_kwh")
+        )
+        parameters = {
+            "threshold": call.data["max_prices"],
+            "cheapest_hours": call.data["cheapest_hours"],
+            "deadline": [None],
+            "solar_first": call.data["min_surplus_kw"] if series.surplus_kw is not None else [],
+        }
+        results = await hass.async_add_executor_job(run_backtest, sessions, power_kw, parameters)
+        return {"sessions": len(sessions), "power_kw": round(power_kw, 2), "results": results}
+
     hass.services.async_register(DOMAIN, "set_min_intensity", set_min_intensity)
     hass.services.async_register(DOMAIN, "set_max_intensity", set_max_intensity)
-    hass.services.async_register(DOMAIN, "set_dynamic_power_mode", async_set_dynamic_power_mode)
+    hass.services.async_register(DOMAIN, "set_dynamic_power_mode", set_dynamic_power_mode)
     hass.services.async_register(DOMAIN, "set_intensity", set_intensity)
     hass.services.async_register(DOMAIN, "set_min_intensity_slider", set_min_intensity_slider)
     hass.services.async_register(DOMAIN, "set_max_intensity_slider", set_max_intensity_slider)
     hass.services.async_register(DOMAIN, "set_dynamic_power_mode_slider", set_dynamic_power_mode_slider)
+    hass.services.async_register(
+        DOMAIN, "backtest", backtest, schema=BACKTEST_SCHEMA, supports_response=SupportsResponse.ONLY
+    )
 
-    return True
+async def _async_load_history(hass: HomeAssistant, coordinator, options):
+    """Read the hourly price, solar surplus and charged energy from the recorder statistics."""
+    if "recorder" not in hass.config.components:
+        raise HomeAssistantError("The backtest needs the recorder, or a csv_path")
+    from homeassistant.components.recorder import get_instance
+    from homeassistant.components.recorder.statistics import statistics_during_period
+
+    from .backtest import HourlySeries
+
+    price_entity_id = options.get("price_entity_id")
+    if price_entity_id is None:
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            if entry.data.get(CONF_IP_ADDRESS) == coordinator.ip_address:
+                price_entity_id = entry.options.get(CONF_PRECIO_LUZ)
+    if not price_entity_id:
+        raise HomeAssistantError("No price sensor configured, set price_entity_id")
+    statistic_ids = {"price": price_entity_id}
+    for key in ("ChargeEnergy", "FVPower", "HousePower"):
+        entity_id = async_get_device_entity_id(hass, "sensor", coordinator.ip_address, key)
+        if entity_id is not None:
+            statistic_ids[key] = entity_id
+
+    # Whole local days, stepped by hour in UTC so DST changes keep every hour
+    end = dt_util.start_of_local_day()
+    start = dt_util.as_utc(end - timedelta(days=options["days"]))
+    end = dt_util.as_utc(end)
+    rows = await get_instance(hass).async_add_executor_job(
+        statistics_during_period,
+        hass,
+        start,
+        end,
+        set(statistic_ids.values()),
+        "hour",
+        None,
+        {"mean", "change"},
+    )
+    # Statistic rows by hour start timestamp
+    by_start = {
+        key: {row["start"]: row for row in rows.get(statistic_id, [])}
+        for key, statistic_id in statistic_ids.items()
+    }
+    if not by_start["price"]:
+        raise HomeAssistantError(f"No statistics recorded for {price_entity_id}")
+
+    times, prices, surplus_kw, energy_kwh = [], [], [], []
+    for hour in range(int((end - start).total_seconds() // 3600)):
+        when = start + timedelta(hours=hour)
+        timestamp = when.timestamp()
+        price = by_start["price"].get(timestamp, {}).get("mean")
+        solar = by_start.get("FVPower", {}).get(timestamp, {}).get("mean") or 0
+        house = by_start.get("HousePower", {}).get(timestamp, {}).get("mean") or 0
+        times.append(dt_util.as_local(when))
+        prices.append(math.nan if price is None else price)
+        surplus_kw.append(max(0.0, solar - house) / 1000)
+        energy_kwh.append(by_start.get("ChargeEnergy", {}).get(timestamp, {}).get("change") or 0)
+    return HourlySeries(
+        times,
+        prices,
+        surplus_kw if "FVPower" in by_start else None,
+        energy_kwh if "ChargeEnergy" in by_start and any(energy_kwh) else None,
+    )
+
+@callback
+def _async_update_balancer(hass: HomeAssistant, entry: ConfigEntry, coordinator):
+    weight = entry.options.get(CONF_BALANCE_WEIGHT, 0)
+    balancer = hass.data.get(DATA_BALANCER)
+    if weight:
+        # Loaded only once a charger has a weight
+        from .balancer import FleetBalancer
+
+        if balancer is None:
+            balancer = hass.data[DATA_BALANCER] = FleetBalancer(hass)
+        balancer.async_register(
+            coordinator, weight, entry.options.get(CONF_GRID_MARGIN_W, DEFAULT_GRID_MARGIN_W)
+        )
+    elif balancer is not None:
+        balancer.async_unregister(coordinator)
+        if not balancer:
+            hass.data.pop(DATA_BALANCER)
+
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry):
+    coordinator = hass.data[DOMAIN].get(entry.entry_id)
+    if coordinator is not None:
+        _async_update_balancer(hass, entry, coordinator)
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        await _async_release_coordinator(hass, entry)
+        if not hass.data[DOMAIN]:
+            for service in SERVICES:
+                hass.services.async_remove(DOMAIN, service)
         
     return unload_ok
 
-async def async_set_min_intensity(hass: HomeAssistant, ip_address: str, min_intensity: int):
+async def _async_release_coordinator(hass: HomeAssistant, entry: ConfigEntry):
+    """Take the coordinator of entry out of the fleet and the balancer and close it."""
+    coordinator = hass.data[DOMAIN].pop(entry.entry_id, None)
+    if coordinator is None:
+        return
+    fleet = hass.data.get(DATA_FLEET)
+    balancer = hass.data.get(DATA_BALANCER)
+    if balancer is not None:
+        balancer.async_unregister(coordinator)
+        if not balancer:
+            hass.data.pop(DATA_BALANCER)
+    coordinator.gateway.async_shutdown()
+    await coordinator.async_flush_snapshot()
+    await hass.async_add_executor_job(coordinator.samples.close)
+    if fleet is not None:
+        fleet.async_unregister(coordinator)
+        if not fleet:
+            hass.data.pop(DATA_FLEET)
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the samples and the saved snapshot of a removed charger."""
+    await hass.async_add_executor_job(_remove_samples, _samples_path(hass, entry))
+    await _snapshot_store(hass, entry).async_remove()
+
+def _snapshot_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    return Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.snapshot")
+
+def _samples_path(hass: HomeAssistant, entry: ConfigEntry) -> str:
+    return hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry.entry_id}.samples")
+
+def _open_samples(path) -> SampleRing:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return SampleRing(SAMPLE_BUFFER_CAPACITY, path)
+
+def _remove_samples(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+async def async_set_min_intensity(coordinator: V2CtrydanDataUpdateCoordinator, min_intensity: int):
     """Set minimum charging intensity."""
-    session = async_get_clientsession(hass)
-    url = f"http://{ip_address}/write/MinIntensity={min_intensity}"
     try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            response.raise_for_status()
-            _LOGGER.debug(f"Min intensity set to {min_intensity} at {ip_address}")
-    except aiohttp.ClientError as err:
+        await coordinator.async_write("MinIntensity", min_intensity)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
         _LOGGER.error(f"Error setting min intensity: {err}")
 
-async def async_set_max_intensity(hass: HomeAssistant, ip_address: str, max_intensity: int):
+async def async_set_max_intensity(coordinator: V2CtrydanDataUpdateCoordinator, max_intensity: int):
     """Set maximum charging intensity."""
-    session = async_get_clientsession(hass)
-    url = f"http://{ip_address}/write/MaxIntensity={max_intensity}"
     try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            response.raise_for_status()
-            _LOGGER.debug(f"Max intensity set to {max_intensity} at {ip_address}")
-    except aiohttp.ClientError as err:
+        await coordinator.async_write("MaxIntensity", max_intensity)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
         _LOGGER.error(f"Error setting max intensity: {err}")
 
-async def async_set_dynamic_power_mode(hass: HomeAssistant, ip_address: str, dynamic_power_mode: int):
+async def async_set_dynamic_power_mode(coordinator: V2CtrydanDataUpdateCoordinator, dynamic_power_mode: int):
     """Set dynamic power mode."""
-    session = async_get_clientsession(hass)
-    url = f"http://{ip_address}/write/DynamicPowerMode={dynamic_power_mode}"
     try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            response.raise_for_status()
-            _LOGGER.debug(f"Dynamic power mode set to {dynamic_power_mode} at {ip_address}")
-    except aiohttp.ClientError as err:
+        await coordinator.async_write("DynamicPowerMode", dynamic_power_mode)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
         _LOGGER.error(f"Error setting dynamic power mode: {err}")
 
-async def async_set_intensity(hass: HomeAssistant, ip_address: str, intensity: int):
+async def async_set_intensity(coordinator: V2CtrydanDataUpdateCoordinator, intensity: int):
     """Set charging intensity."""
-    session = async_get_clientsession(hass)
-    url = f"http://{ip_address}/write/Intensity={intensity}"
     try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            response.raise_for_status()
-            _LOGGER.debug(f"Intensity set to {intensity} at {ip_address}")
-    except aiohttp.ClientError as err:
+        await coordinator.async_write("Intensity", intensity)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
         _LOGGER.error(f"Error setting intensity: {err}")
@@ -0,0 +1,235 @@
+"""Replay of historical hourly prices against price-based charging strategies.
+
+The input is an hourly series: the price of each hour and, optionally,
+the solar surplus (kW) and the energy the car took (kWh). Every day gives
+one charging session from the arrival hour to the departure hour, and the
+session needs the energy charged in the 24 hours that start at its
+arrival.
+
+Strategies, each evaluated for a list of parameters:
+- threshold(max_price): charge in the hours priced at most max_price,
+  like the MaxPrice number
+- cheapest_hours(n): charge in the n cheapest hours of the session
+- deadline(): the charge planner, cheapest hours that cover the energy
+- solar_first(min_surplus_kw): charge while the surplus reaches
+  min_surplus_kw, then in the cheapest remaining hours
+
+Charging always stops once the session's energy is delivered, like the km
+target does. Each start or stop of the charge counts as one device write.
+
+The hour data of each session is prepared once (window, prices sorted by
+price) and every strategy takes all its parameters in one batch per
+session. threshold and cheapest_hours both charge in the k cheapest hours,
+so a session is walked once in price order, one hour more at each step,
+and every parameter reads the result of its k; deadline is the same for
+every parameter and solar_first reuses the result of an equal solar set.
+A year of sessions times dozens of parameters runs in a few milliseconds.
+"""
+import bisect
+import csv
+from dataclasses import dataclass
+from datetime import datetime
+import math
+
+
+@dataclass(frozen=True)
+class HourlySeries:
+    """Hourly history; times are the (aware) start of each hour."""
+
+    times: list
+    prices: list
+    surplus_kw: list = None
+    energy_kwh: list = None
+
+
+class _Session:
+    """Hours of one charging session, prepared for every strategy."""
+
+    __slots__ = ("prices", "surplus_kw", "energy_kwh", "by_price", "sorted_prices")
+
+    def __init__(self, prices, surplus_kw, energy_kwh):
+        self.prices = prices
+        self.surplus_kw = surplus_kw
+        self.energy_kwh = energy_kwh
+        # Hour offsets from the cheapest to the most expensive, earlier first on ties
+        self.by_price = sorted(range(len(prices)), key=prices.__getitem__)
+        self.sorted_prices = [prices[offset] for offset in self.by_price]
+
+
+def load_csv(path) -> HourlySeries:
+    """Read an hourly series from a CSV file.
+
+    Columns: time (ISO 8601 with offset), price and, optionally,
+    surplus_kw and energy_kwh. Blocking, run it in an executor.
+    """
+    times, prices, surplus_kw, energy_kwh = [], [], [], []
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        reader = csv.DictReader(csv_file)
+        columns = set(reader.fieldnames or ())
+        for row in reader:
+            times.append(datetime.fromisoformat(row["time"]))
+            prices.append(float(row["price"]))
+            if "surplus_kw" in columns:
+                surplus_kw.append(float(row["surplus_kw"] or 0))
+            if "energy_kwh" in columns:
+                energy_kwh.append(float(row["energy_kwh"] or 0))
+    return HourlySeries(
+        times,
+        prices,
+        surplus_kw if "surplus_kw" in columns else None,
+        energy_kwh if "energy_kwh" in columns else None,
+    )
+
+
+def build_sessions(series, arrival_hour, departure_hour, daily_energy_kwh=None):
+    """Split the series into daily sessions.
+
+    The session energy is the recorded energy of the 24 hours from the
+    arrival, or daily_energy_kwh when the series has none. Hours without a
+    price (NaN) stay in the window but are never chosen.
+    """
+    sessions = []
+    length = (departure_hour - arrival_hour) % 24 or 24
+    times = series.times
+    for start, when in enumerate(times):
+        if when.hour != arrival_hour or start + length > len(times):
+            continue
+        end = start + length
+        if series.energy_kwh is not None:
+            energy_kwh = sum(series.energy_kwh[start:start + 24])
+        else:
+            energy_kwh = daily_energy_kwh or 0
+        if energy_kwh <= 0:
+            continue
+        surplus_kw = series.surplus_kw[start:end] if series.surplus_kw is not None else [0.0] * length
+        prices = [math.inf if math.isnan(price) else price for price in series.prices[start:end]]
+        sessions.append(_Session(prices, surplus_kw, energy_kwh))
+    return sessions
+
+
+def _charge(session, offsets, power_kw, chronological):
+    """Charge in the given hour offsets until the energy is delivered.
+
+    Returns (cost, energy delivered, {offset: hours charged}).
+    """
+    hours_needed = session.energy_kwh / power_kw
+    charged = {}
+    order = sorted(offsets) if chronological else offsets
+    for offset in order:
+        if hours_needed * 3600 < 1:
+            break
+        if session.prices[offset] == math.inf:
+            continue
+        hours = min(1.0, hours_needed)
+        charged[offset] = hours
+        hours_needed -= hours
+    cost = 0.0
+    for offset, hours in charged.items():
+        grid_kw = max(0.0, power_kw - session.surplus_kw[offset])
+        cost += session.prices[offset] * grid_kw * hours
+    return cost, session.energy_kwh - max(hours_needed, 0.0) * power_kw, charged
+
+
+def _writes(charged):
+    """Starts and stops of the charge over the session."""
+    writes = 0
+    previous = None
+    for offset in sorted(charged):
+        if previous is None or offset != previous + 1:
+            writes += 2
+        elif charged[previous] < 1:
+            writes += 2
+        previous = offset
+    return writes
+
+
+def _outcome(session, offsets, power_kw, chronological):
+    """Return (cost, energy delivered, writes) of charging in offsets."""
+    cost, delivered, charged = _charge(session, offsets, power_kw, chronological)
+    return cost, delivered, _writes(charged)
+
+
+def _cheapest(session, counts, power_kw):
+    """Charge in the count cheapest hours, in time order, for every count.
+
+    One walk over the hours by price adds an hour at each step; each
+    distinct count is evaluated once.
+    """
+    wanted = set(counts)
+    outcomes = {}
+    chosen = []
+    for count in range(max(wanted) + 1):
+        if count:
+            bisect.insort(chosen, session.by_price[count - 1])
+        if count in wanted:
+            outcomes[count] = _outcome(session, chosen, power_kw, chronological=False)
+    return [outcomes[count] for count in counts]
+
+
+def _threshold(session, max_prices, power_kw):
+    return _cheapest(
+        session, [bisect.bisect_right(session.sorted_prices, price) for price in max_prices], power_kw
+    )
+
+
+def _cheapest_hours(session, hours, power_kw):
+    length = len(session.prices)
+    return _cheapest(session, [min(max(int(count), 0), length) for count in hours], power_kw)
+
+
+def _deadline(session, parameters, power_kw):
+    outcome = _outcome(session, session.by_price, power_kw, chronological=False)
+    return [outcome] * len(parameters)
+
+
+def _solar_first(session, min_surplus_kw, power_kw):
+    outcomes = {}
+    batch = []
+    for minimum in min_surplus_kw:
+        solar = tuple(offset for offset, surplus in enumerate(session.surplus_kw) if surplus >= minimum)
+        if solar not in outcomes:
+            solar_set = set(solar)
+            grid = [offset for offset in session.by_price if offset not in solar_set]
+            outcomes[solar] = _outcome(session, list(solar) + grid, power_kw, chronological=False)
+        batch.append(outcomes[solar])
+    return batch
+
+
+STRATEGIES = {
+    "threshold": _threshold,
+    "cheapest_hours": _cheapest_hours,
+    "deadline": _deadline,
+    "solar_first": _solar_first,
+}
+
+
+def run_backtest(sessions, power_kw, parameters):
+    """Evaluate every strategy for each of its parameters.
+
+    parameters maps a strategy name to the list of values to try (the
+    deadline planner takes [None]). Returns one result dict per pair.
+    """
+    results = []
+    needed = sum(session.energy_kwh for session in sessions)
+    for name, values in parameters.items():
+        if not values:
+            continue
+        strategy = STRATEGIES[name]
+        # Totals per parameter: cost, energy delivered, writes
+        totals = [[0.0, 0.0, 0] for _ in values]
+        for session in sessions:
+            for total, outcome in zip(totals, strategy(session, values, power_kw)):
+                total[0] += outcome[0]
+                total[1] += outcome[1]
+                total[2] += outcome[2]
+        for value, (cost, delivered, writes) in zip(values, totals):
+            results.append({
+                "strategy": name,
+                "parameter": value,
+                "sessions": len(sessions),
+                "cost": round(cost, 2),
+                "energy_kwh": round(delivered, 2),
+                "unmet_kwh": round(needed - delivered, 2),
+                "writes": writes,
+            })
+    return results
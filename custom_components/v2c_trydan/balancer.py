@@ -0,0 +1,254 @@
+"""Share one supply between several V2C Trydan chargers."""
+import bisect
+import logging
+import math
+from time import monotonic
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import FLEET_BALANCE_INTERVAL, FLEET_BALANCE_INCREASE_INTERVAL
+from .gateway import PRIORITY_SAFETY, PRIORITY_USER
+
+_LOGGER = logging.getLogger(__name__)
+
+# ChargeState codes of /RealTimeData
+NOT_CONNECTED = 0
+
+DEFAULT_VOLTAGE = 230
+
+# Bisection steps of the weighted share: 32 A / 2**16, well below one amp;
+# the amps lost to rounding are handed out afterwards
+_SHARE_STEPS = 16
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def allocate(budget_a, demands):
+    """Split budget_a amps between demands, in O(len(demands)).
+
+    demands is a list of (weight, low, high) sorted by weight, highest
+    first. Cars are admitted in that order while the budget covers their
+    low amps; the rest get 0, meaning paused. What is left is shared in
+    proportion to the weights up to each car's high amps, and the amps lost
+    to rounding go to the first cars with room. Returns the amps per demand.
+    """
+    allocation = []
+    remaining = budget_a
+    for weight, low, high in demands:
+        if low <= remaining:
+            allocation.append(low)
+            remaining -= low
+        else:
+            allocation.append(0)
+    if remaining <= 0:
+        return allocation
+
+    # Smallest level whose weighted shares, capped at high, use up the rest
+    rooms = [
+        (weight, high - low) if amps else (weight, 0)
+        for (weight, low, high), amps in zip(demands, allocation)
+    ]
+    if sum(room for _, room in rooms) <= remaining:
+        return [high if amps else 0 for (_, _, high), amps in zip(demands, allocation)]
+    low_level = 0.0
+    high_level = max(room / weight for weight, room in rooms if room)
+    for _ in range(_SHARE_STEPS):
+        level = (low_level + high_level) / 2
+        if sum(min(room, weight * level) for weight, room in rooms) > remaining:
+            high_level = level
+        else:
+            low_level = level
+
+    extra = [math.floor(min(room, weight * low_level)) for weight, room in rooms]
+    remaining -= sum(extra)
+    for index, (_, room) in enumerate(rooms):
+        if remaining <= 0:
+            break
+        if extra[index] < room:
+            extra[index] += 1
+            remaining -= 1
+    return [amps + more for amps, more in zip(allocation, extra)]
+
+
+class _Member:
+    """Balancing state of one charger."""
+
+    __slots__ = ("coordinator", "weight", "margin_w", "unsub", "paused", "last_increase", "writing")
+
+    def __init__(self, coordinator, weight, margin_w):
+        self.coordinator = coordinator
+        self.weight = weight
+        self.margin_w = margin_w
+        self.unsub = None
+        self.paused = False
+        self.last_increase = -math.inf
+        self.writing = False
+
+
+class FleetBalancer:
+    """Set the Intensity of every charger on a shared supply.
+
+    The supply is the lowest ContractedPower reported by the members,
+    minus the largest margin; the household load is the largest HousePower,
+    since every charger measures the same supply. Chargers that are offline
+    or run the device's own dynamic control keep their current draw, the
+    others share the rest with allocate(). Idle chargers draw nothing and
+    keep the Intensity the user set; the balancer only releases its own
+    pause, so the next car can charge.
+
+    A cycle runs after a member's poll, at most every FLEET_BALANCE_INTERVAL
+    seconds. Each charger gets its changed values in one batch of writes and
+    no new batch while one is on its way. Cuts and pauses go out at once as
+    safety writes; raises and resumes at most every
+    FLEET_BALANCE_INCREASE_INTERVAL seconds per charger, so a fluctuating
+    load or a crowd of cars plugging in costs each charger at most a cut
+    and a raise per interval. Its pauses are written as the balancer's
+    (see pause_owner), so they do not cancel a km target.
+    """
+
+    def __init__(self, hass):
+        self.hass = hass
+        self._members = []
+        self._last_cycle = -math.inf
+        self._cancel_cycle = None
+
+    def __len__(self):
+        return len(self._members)
+
+    @callback
+    def async_register(self, coordinator, weight, margin_w):
+        """Balance a charger with weight (higher first) until unregistered."""
+        self.async_unregister(coordinator)
+        member = _Member(coordinator, weight, margin_w)
+        member.unsub = coordinator.async_add_listener(self._async_schedule)
+        # Kept sorted by weight so every cycle is a single pass
+        weights = [-other.weight for other in self._members]
+        self._members.insert(bisect.bisect_right(weights, -weight), member)
+        self._async_schedule()
+
+    @callback
+    def async_unregister(self, coordinator):
+        """Stop balancing a charger; the values it has stay as they are."""
+        for member in self._members:
+            if member.coordinator is coordinator:
+                member.unsub()
+                self._members.remove(member)
+                break
+        if not self._members and self._cancel_cycle is not None:
+            self._cancel_cycle()
+            self._cancel_cycle = None
+
+    @callback
+    def _async_schedule(self):
+        if self._cancel_cycle is not None or not self._members:
+            return
+        delay = max(0.0, self._last_cycle + FLEET_BALANCE_INTERVAL - monotonic())
+        self._cancel_cycle = async_call_later(self.hass, delay, self._async_cycle)
+
+    @callback
+    def _async_cycle(self, _now=None):
+        self._cancel_cycle = None
+        self._last_cycle = now = monotonic()
+
+        contracted_w = math.inf
+        house_w = 0.0
+        margin_w = 0.0
+        voltage = 0.0
+        fixed_w = 0.0
+        members = []
+        demands = []
+        for member in self._members:
+            data = member.coordinator.data
+            if data is None:
+                continue
+            contracted = _number(data.get("ContractedPower"))
+            if contracted > 0:
+                contracted_w = min(contracted_w, contracted)
+            house_w = max(house_w, _number(data.get("HousePower")))
+            margin_w = max(margin_w, member.margin_w)
+            voltage = voltage or _number(data.get("VoltageInstallation"))
+            if data.get("ChargeState") in (None, NOT_CONNECTED) or data.get("Locked"):
+                self._async_send(member, self._idle_writes(member, data))
+                continue
+            if (
+                not member.coordinator.last_update_success
+                or member.writing
+                or data.get("Dynamic")
+                or (data.get("Paused") and not member.paused)
+            ):
+                # Not ours to change right now, count what it may draw
+                if not data.get("Paused"):
+                    setpoint_w = _number(data.get("Intensity")) * (
+                        _number(data.get("VoltageInstallation")) or DEFAULT_VOLTAGE
+                    )
+                    fixed_w += max(_number(data.get("ChargePower")), setpoint_w)
+                continue
+            members.append(member)
+            demands.append((
+                member.weight,
+                int(_number(data.get("MinIntensity"), 6)),
+                int(_number(data.get("MaxIntensity"), 32)),
+            ))
+        if not demands or contracted_w == math.inf:
+            return
+
+        voltage = voltage or DEFAULT_VOLTAGE
+        budget_a = math.floor((contracted_w - margin_w - house_w - fixed_w) / voltage)
+        for member, amps in zip(members, allocate(budget_a, demands)):
+            self._async_send(member, self._member_writes(member, amps, now))
+
+    def _idle_writes(self, member, data):
+        """Return the writes that release the balancer's pause of an idle charger."""
+        if not member.paused or member.writing or not member.coordinator.last_update_success:
+            return []
+        member.paused = False
+        return [("Paused", 0, PRIORITY_USER)] if data.get("Paused") else []
+
+    def _member_writes(self, member, amps, now):
+        """Return the (key, value, priority) writes that give member amps."""
+        data = member.coordinator.data
+        current = int(_number(data.get("Intensity")))
+        paused = bool(data.get("Paused"))
+        if amps == 0:
+            if paused:
+                return []
+            member.paused = True
+            return [("Paused", 1, PRIORITY_SAFETY)]
+        if amps < current and not paused:
+            return [("Intensity", amps, PRIORITY_SAFETY)]
+        if (amps > current or paused) and now - member.last_increase >= FLEET_BALANCE_INCREASE_INTERVAL:
+            member.last_increase = now
+            writes = [("Intensity", amps, PRIORITY_USER)] if amps != current else []
+            if paused:
+                member.paused = False
+                writes.append(("Paused", 0, PRIORITY_USER))
+            return writes
+        return []
+
+    @callback
+    def _async_send(self, member, writes):
+        """Send one charger's writes as a batch, in order."""
+        if not writes:
+            return
+        member.writing = True
+        self.hass.async_create_background_task(
+            self._async_write(member, writes),
+            f"v2c_trydan balance {member.coordinator.ip_address}",
+        )
+
+    async def _async_write(self, member, writes):
+        coordinator = member.coordinator
+        try:
+            for key, value, priority in writes:
+                _LOGGER.debug(f"Load balancer: setting {key}={value} on {coordinator.ip_address}")
+                await coordinator.async_write(key, value, priority, owner="balancer")
+        except Exception as err:
+            _LOGGER.error(f"Load balancer could not write to {coordinator.ip_address}: {err}")
+        finally:
+            member.writing = False
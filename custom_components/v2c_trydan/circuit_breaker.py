@@ -0,0 +1,86 @@
+"""Per-device circuit breaker for V2C Trydan requests."""
+import random
+from time import monotonic
+
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_BACKOFF_BASE,
+    BREAKER_BACKOFF_MAX,
+    BREAKER_JITTER,
+)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Decide whether a request may be sent to the device.
+
+    - closed: requests flow normally, failures are counted
+    - open: requests are refused until the backoff window expires
+    - half_open: a single probe is allowed; success closes the breaker,
+      failure reopens it with a longer, jittered backoff
+    """
+
+    def __init__(
+        self,
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        backoff_base=BREAKER_BACKOFF_BASE,
+        backoff_max=BREAKER_BACKOFF_MAX,
+        jitter=BREAKER_JITTER,
+        clock=monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self._clock = clock
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._openings = 0
+        self._retry_at = 0.0
+
+    @property
+    def is_probing(self) -> bool:
+        """Return True while the half-open probe is outstanding."""
+        return self.state == STATE_HALF_OPEN
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now."""
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN and self._clock() >= self._retry_at:
+            self.state = STATE_HALF_OPEN
+            return True
+        return False
+
+    def time_until_retry(self) -> float:
+        """Seconds until the next probe is allowed."""
+        if self.state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self._retry_at - self._clock())
+
+    def record_success(self) -> bool:
+        """Register a successful request. Return True if the device recovered."""
+        recovered = self.state != STATE_CLOSED
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._openings = 0
+        return recovered
+
+    def record_failure(self) -> bool:
+        """Register a failed request. Return True if the breaker just opened."""
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            just_opened = self.state == STATE_CLOSED
+            self._open()
+            return just_opened
+        return False
+
+    def _open(self):
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** self._openings)
+        backoff *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._openings += 1
+        self._retry_at = self._clock() + backoff
+        self.state = STATE_OPEN
@@ -1,12 +1,27 @@
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
 from homeassistant.const import CONF_IP_ADDRESS
-from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util import dt as dt_util
 import aiohttp
-import asyncio
 
-from .const import DOMAIN, CONF_KWH_PER_100KM, CONF_PRECIO_LUZ
+from .const import (
+    DOMAIN,
+    CONF_KWH_PER_100KM,
+    CONF_PRECIO_LUZ,
+    CONF_DEPARTURE_TIME,
+    CONF_SOLAR_HYSTERESIS_W,
+    CONF_SOLAR_MAX_STEP,
+    CONF_SOLAR_BATTERY_PRIORITY,
+    CONF_GRID_MARGIN_W,
+    CONF_BALANCE_WEIGHT,
+    DEFAULT_SOLAR_HYSTERESIS_W,
+    DEFAULT_SOLAR_MAX_STEP,
+    DEFAULT_SOLAR_BATTERY_PRIORITY,
+    DEFAULT_GRID_MARGIN_W,
+    REQUEST_TIMEOUT,
+    CONNECT_TIMEOUT,
+)
 
 DATA_SCHEMA = vol.Schema(
     {
@@ -63,12 +78,19 @@ class V2CtrydanConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     async def _test_connection(self, ip_address: str) -> bool:
         """Test connection to the V2C Trydan device."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"http://{ip_address}/RealTimeData",
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    return response.status == 200
+            # Share the request of an already configured coordinator for this device
+            for coordinator in self.hass.data.get(DOMAIN, {}).values():
+                if coordinator.ip_address == ip_address:
+                    await coordinator.async_get_realtime_data()
+                    return True
+
+            # Imported here: the coordinator stack is not needed to show the form
+            from .coordinator import async_fetch_realtime_data
+
+            session = async_get_clientsession(self.hass)
+            timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+            await async_fetch_realtime_data(session, ip_address, timeout)
+            return True
         except Exception:
             return False
 
@@ -80,10 +102,23 @@ class V2CtrydanOptionsFlowHandler(config_entries.OptionsFlowWithConfigEntry):
         super().__init__(config_entry)
         self.current_kwh_per_100km = config_entry.options.get(CONF_KWH_PER_100KM, 20.8)
         self.current_precio_luz = config_entry.options.get(CONF_PRECIO_LUZ, "sensor.pvpc")
+        self.current_departure_time = config_entry.options.get(CONF_DEPARTURE_TIME, "")
+        self.current_solar_hysteresis_w = config_entry.options.get(CONF_SOLAR_HYSTERESIS_W, DEFAULT_SOLAR_HYSTERESIS_W)
+        self.current_solar_max_step = config_entry.options.get(CONF_SOLAR_MAX_STEP, DEFAULT_SOLAR_MAX_STEP)
+        self.current_solar_battery_priority = config_entry.options.get(
+            CONF_SOLAR_BATTERY_PRIORITY, DEFAULT_SOLAR_BATTERY_PRIORITY
+        )
+        self.current_grid_margin_w = config_entry.options.get(CONF_GRID_MARGIN_W, DEFAULT_GRID_MARGIN_W)
+        self.current_balance_weight = config_entry.options.get(CONF_BALANCE_WEIGHT, 0)
 
     async def async_step_init(self, user_input=None):
+        errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            departure_time = user_input.get(CONF_DEPARTURE_TIME)
+            if departure_time and dt_util.parse_time(departure_time) is None:
+                errors[CONF_DEPARTURE_TIME] = "invalid_time"
+            else:
+                return self.async_create_entry(title="", data=user_input)
 
         options_schema = vol.Schema(
             {
@@ -93,9 +128,27 @@ class V2CtrydanOptionsFlowHandler(config_entries.OptionsFlowWithConfigEntry):
                 vol.Optional(
                     CONF_PRECIO_LUZ, description={"suggested_value": self.current_precio_luz}
                 ): str,
+                vol.Optional(
+                    CONF_DEPARTURE_TIME, description={"suggested_value": self.current_departure_time}
+                ): str,
+                vol.Optional(
+                    CONF_SOLAR_HYSTERESIS_W, default=self.current_solar_hysteresis_w
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_SOLAR_MAX_STEP, default=self.current_solar_max_step
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+                vol.Optional(
+                    CONF_SOLAR_BATTERY_PRIORITY, default=self.current_solar_battery_priority
+                ): bool,
+                vol.Optional(
+                    CONF_GRID_MARGIN_W, default=self.current_grid_margin_w
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_BALANCE_WEIGHT, default=self.current_balance_weight
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=10)),
             }
         )
 
         return self.async_show_form(
-            step_id="init", data_schema=options_schema
+            step_id="init", data_schema=options_schema, errors=errors
         )
\ No newline at end of file
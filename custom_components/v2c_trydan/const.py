@@ -2,4 +2,100 @@ DOMAIN = "v2c_trydan"
 CONF_IP_ADDRESS = "ip_address"
 CONF_KWH_PER_100KM = "kwh_per_100km"
 CONF_KM_TO_CHARGE = "km_to_charge"
-CONF_PRECIO_LUZ = "precio_luz"
\ No newline at end of file
+CONF_PRECIO_LUZ = "precio_luz"
+CONF_DEPARTURE_TIME = "departure_time"
+CONF_SOLAR_HYSTERESIS_W = "solar_hysteresis_w"
+CONF_SOLAR_MAX_STEP = "solar_max_step"
+CONF_SOLAR_BATTERY_PRIORITY = "solar_battery_priority"
+CONF_GRID_MARGIN_W = "grid_margin_w"
+CONF_BALANCE_WEIGHT = "balance_weight"
+
+# Option defaults of the solar controller and the grid protection
+DEFAULT_SOLAR_HYSTERESIS_W = 230
+DEFAULT_SOLAR_MAX_STEP = 2
+DEFAULT_SOLAR_BATTERY_PRIORITY = True
+DEFAULT_GRID_MARGIN_W = 300
+
+# Share of the energy drawn from the grid that ends up in the battery
+CHARGE_EFFICIENCY = 0.92
+
+# Adaptive polling intervals (seconds)
+POLL_INTERVAL_BURST = 0.5       # Grid protection with little headroom left
+POLL_INTERVAL_FAST = 5          # Charging, control loop active or recent write
+POLL_INTERVAL_CONNECTED = 20    # Hose connected but not charging
+POLL_INTERVAL_IDLE = 120        # Hose not connected and readings stable
+
+# Keep polling fast for this long after any write (seconds)
+FAST_POLL_HOLD_AFTER_WRITE = 60
+
+# Power readings considered to detect volatility
+VOLATILITY_KEYS = ("ChargePower", "HousePower", "FVPower", "BatteryPower")
+VOLATILITY_WINDOW = 6           # Samples kept per key
+VOLATILITY_THRESHOLD_W = 250    # Spread in W that counts as volatile
+
+# ChargePower above this value is treated as charging (W)
+CHARGING_POWER_THRESHOLD_W = 50
+
+# HTTP timeouts (seconds)
+REQUEST_TIMEOUT = 5
+CONNECT_TIMEOUT = 2
+PROBE_TIMEOUT = 3               # Half-open probe against an offline device
+PROBE_CONNECT_TIMEOUT = 1
+
+# Circuit breaker
+BREAKER_FAILURE_THRESHOLD = 3   # Consecutive failures before opening
+BREAKER_BACKOFF_BASE = 10       # First backoff window (seconds)
+BREAKER_BACKOFF_MAX = 300       # Longest backoff window (seconds)
+BREAKER_JITTER = 0.2            # +/- fraction applied to each window
+
+# User writes to the same key are merged, last value wins: a write goes out
+# once no newer value arrived for the window, and never later than the max delay (seconds)
+WRITE_COALESCE_WINDOW = 0.25
+WRITE_COALESCE_MAX_DELAY = 1
+
+# Time the device needs before a read reflects a write (seconds)
+WRITE_SETTLE_TIME = 2
+
+# Recent samples per latency histogram, used for the p50/p99 metrics
+METRICS_WINDOW = 200
+
+# Polls kept per charger in the sample ring buffer, about 3.5 days at the
+# fast poll rate and longer while idle
+SAMPLE_BUFFER_CAPACITY = 60480
+
+# Snapshots requested within this window are shared between callers (seconds)
+SNAPSHOT_TTL = 1
+
+# The last snapshot is saved for the next startup at most this often (seconds)
+SNAPSHOT_SAVE_DELAY = 60
+SNAPSHOT_STORAGE_VERSION = 1
+
+# Snapshot keys that practically never change; compared once every
+# STATIC_KEYS_CHECK_EVERY polls instead of on every poll
+STATIC_KEYS = frozenset({"FirmwareVersion", "SSID", "IP", "ID", "ContractedPower"})
+STATIC_KEYS_CHECK_EVERY = 60
+
+# Fleet scheduler shared by every configured charger
+DATA_FLEET = f"{DOMAIN}_fleet"
+FLEET_MAX_CONCURRENT_POLLS = 4  # Requests in flight across all chargers
+FLEET_REQUEST_BUDGET = 4        # Time budget for one poll request (seconds)
+FLEET_SLOW_POLL = 1             # Polls slower than this move to the slow lane (seconds)
+FLEET_SLOW_LANE_POLLS = 1       # Requests in flight across slow chargers
+
+# Load balancer for chargers on one supply
+DATA_BALANCER = f"{DOMAIN}_balancer"
+FLEET_BALANCE_INTERVAL = 5      # Shortest time between two allocations (seconds)
+FLEET_BALANCE_INCREASE_INTERVAL = 30  # Shortest time between two raises of one charger (seconds)
+
+# Unique IDs used before multi-charger support, migrated to "<ip>_<id>"
+LEGACY_UNIQUE_IDS = frozenset({
+    "v2c_max_intensity",
+    "v2c_min_intensity",
+    "v2c_km_to_charge",
+    "v2c_intensity",
+    "v2c_MaxPrice",
+    "v2c_dynamic_power_mode_select",
+    "v2c_carga_pvpc",
+    "v2c_precio_luz_entity",
+    "NumericalStatus",
+})
@@ -1,133 +1,546 @@
+import asyncio
 import logging
-from datetime import timedelta
-import json
-import re
+import math
+from time import monotonic, time
 import aiohttp
-from aiohttp import ClientError, client_exceptions, ClientSession
+from aiohttp import ClientError, client_exceptions
+from homeassistant.core import CALLBACK_TYPE, callback
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from tenacity import retry, stop_after_attempt, wait_fixed, RetryError
+from homeassistant.helpers.device_registry import DeviceInfo
+
+from .circuit_breaker import CircuitBreaker
+from .metrics import DeviceMetrics
+from .gateway import RequestGateway, PRIORITY_POLL, PRIORITY_SAFETY, PRIORITY_USER
+from .decoder import decode_realtime_data
+from .samples import SampleRing
+from .const import (
+    POLL_INTERVAL_BURST,
+    POLL_INTERVAL_FAST,
+    POLL_INTERVAL_CONNECTED,
+    POLL_INTERVAL_IDLE,
+    FAST_POLL_HOLD_AFTER_WRITE,
+    VOLATILITY_KEYS,
+    VOLATILITY_WINDOW,
+    VOLATILITY_THRESHOLD_W,
+    CHARGING_POWER_THRESHOLD_W,
+    DOMAIN,
+    REQUEST_TIMEOUT,
+    CONNECT_TIMEOUT,
+    PROBE_TIMEOUT,
+    PROBE_CONNECT_TIMEOUT,
+    SNAPSHOT_TTL,
+    WRITE_SETTLE_TIME,
+    STATIC_KEYS,
+    STATIC_KEYS_CHECK_EVERY,
+    SAMPLE_BUFFER_CAPACITY,
+    SNAPSHOT_SAVE_DELAY,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
-def arreglar_json_invalido(json_str: str) -> dict:
-    """Fix malformed JSON responses from V2C Trydan devices.
+async def async_fetch_realtime_data(session, ip_address, timeout, metrics=None) -> dict:
+    """Fetch and decode /RealTimeData from a V2C Trydan device.
     
-    Handles common issues:
-    - Duplicated FirmwareVersion fields
-    - Missing quotes on version numbers
-    - Malformed structure
+    A single attempt is made; retries are paced by the caller. Decode time
+    and firmware repairs are recorded in metrics when given.
+
+    Handles firmware issues:
+    - Incorrect Content-Type (text instead of application/json)
+    - Malformed JSON, repaired by decode_realtime_data
     """
-    # Remove duplicate FirmwareVersion fields (keep the last one)
-    firmware_pattern = r'"FirmwareVersion":"[^"]*",'
-    matches = list(re.finditer(firmware_pattern, json_str))
-    if len(matches) > 1:
-        # Remove all but the last occurrence
-        for match in matches[:-1]:
-            json_str = json_str[:match.start()] + json_str[match.end():]
-    
-    # Fix version numbers without quotes
-    cadena = json_str.replace("1.6.13", "\"1.6.13\"")
-    json_str_arreglado = cadena.replace("\"ReadyState\":", ",\"ReadyState\":")
-    
+    url = f"http://{ip_address}/RealTimeData"
     try:
-        return json.loads(json_str_arreglado)
-    except json.JSONDecodeError as e:
-        _LOGGER.error(f"Error al parsear JSON: {str(e)}\nJSON: {json_str_arreglado}")
-        raise UpdateFailed(f"Error al parsear los datos JSON: {str(e)}")
+        async with session.get(url, timeout=timeout) as response:
+            if response.status == 200:
+                raw = await response.read()
+                content_type = response.headers.get('content-type', '').lower()
+                
+                # Log content-type issues for debugging
+                if 'application/json' not in content_type:
+                    _LOGGER.debug(f"Device returned non-JSON content-type: {content_type}, parsing as JSON anyway")
+                
+                started = monotonic()
+                data, repairs = decode_realtime_data(raw)
+                if metrics is not None:
+                    metrics.decode.observe(monotonic() - started)
+                    metrics.firmware_repairs += repairs
+                if repairs:
+                    _LOGGER.debug(f"Repaired {repairs} firmware quirks in response from {ip_address}")
+                return data
+            else:
+                response.raise_for_status()
+                
+    except client_exceptions.ClientConnectorError as err:
+        _LOGGER.debug(f"Connection error to {ip_address}: {err}")
+        raise
+    except (client_exceptions.ServerTimeoutError, asyncio.TimeoutError) as err:
+        _LOGGER.debug(f"Timeout error to {ip_address}: {err}")
+        raise
+    except ClientError as err:
+        _LOGGER.debug(f"HTTP client error to {ip_address}: {err}")
+        raise
+    except ValueError as e:
+        _LOGGER.error(f"JSON parsing error from {ip_address}: {e}")
+        raise
+    except Exception as e:
+        _LOGGER.error(f"Unexpected error fetching data from {ip_address}: {e}")
+        raise
+
+async def async_write_value(session, ip_address, key, value, timeout):
+    """Send /write/<key>=<value> to a V2C Trydan device.
+
+    The device answers 200 with the text ERROR when it rejects a value.
+    """
+    url = f"http://{ip_address}/write/{key}={value}"
+    async with session.get(url, timeout=timeout) as response:
+        response.raise_for_status()
+        response_text = await response.text()
+    if response_text.strip().upper() == "ERROR":
+        raise ValueError(f"Device rejected {key}={value}")
+    _LOGGER.debug(f"{key} set to {value} at {ip_address}")
 
 class V2CtrydanDataUpdateCoordinator(DataUpdateCoordinator):
     def __init__(self, hass, ip_address):
         self.ip_address = ip_address
-        self.error_reportado = False
+        # Shared by every entity of the charger
+        self.device_info = DeviceInfo(
+            identifiers={(DOMAIN, ip_address)},
+            name=f"V2C Trydan ({ip_address})",
+            manufacturer="V2C",
+            model="Trydan",
+            configuration_url=f"http://{ip_address}",
+        )
         self._session = None
-        self._consecutive_errors = 0
-        self.MAX_CONSECUTIVE_ERRORS = 5
+        self._breaker = CircuitBreaker()
+        self.metrics = DeviceMetrics()
+        # Every request to the device goes through the gateway, one at a time
+        self.gateway = RequestGateway(hass, self._async_send_write, self.metrics)
+
+        # Single-flight fetch state
+        self._snapshot = None
+        self._snapshot_started = 0.0
+        self._inflight = None
+        self._inflight_started = 0.0
+        self._last_write = 0.0
+
+        # Written values not confirmed by a poll yet: key -> (value, settled at)
+        self._unconfirmed = {}
+
+        # Per-key diff of the last snapshot; None means every key changed
+        self.changed_keys = None
+        self._static_values = {}
+        self._polls_since_static_check = 0
+
+        # Adaptive polling state, polls are driven by the fleet scheduler
+        self.scheduler = None
+        self.poll_interval = POLL_INTERVAL_FAST
+        self.request_budget = REQUEST_TIMEOUT
+        self._fast_poll_until = 0.0
+        self._fast_poll_holders = set()
+        # GridProtection checked on every snapshot, None while disabled
+        self.protection = None
+        self._protecting = False
+        # Who wrote the pause holding the charge: "protection", "balancer",
+        # or None when it is the user's
+        self.pause_owner = None
+        # Every poll, oldest first; replaced by a persistent ring on setup
+        self.samples = SampleRing(SAMPLE_BUFFER_CAPACITY)
+        # Last snapshot kept for the next startup, see async_restore_snapshot
+        self._store = None
+        self._store_pending = False
+        self.restored_at = None
 
         super().__init__(
             hass, 
             _LOGGER, 
-            name="v2c_trydan", 
-            update_interval=timedelta(seconds=5),
+            name=f"v2c_trydan {ip_address}", 
+            update_interval=None,
             always_update=False
         )
 
-    async def _async_update_data(self):
-        """Fetch data from API."""
+    async def async_write(self, key, value, priority=PRIORITY_USER, owner=None):
+        """Write a value to the device through the request gateway.
+
+        The value shows up in the coordinator data right away and is checked
+        by the first poll made once the device settled; a failed write or a
+        different read-back rolls it back. owner names the subsystem behind a
+        Paused=1 write, see pause_owner.
+        """
+        if key == "Paused":
+            self.pause_owner = owner if value else None
+        self._unconfirmed[key] = (value, math.inf)
+        self._async_apply_values({key: value})
+        await self.gateway.async_write(key, value, priority)
+
+    async def _async_send_write(self, key, value):
+        if self._session is None:
+            self._session = async_get_clientsession(self.hass)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+        # A newer value may have been queued for the key while this one was sent
+        current = self._unconfirmed.get(key, (None,))[0] == value
+        metrics = self.metrics
+        metrics.writes += 1
+        started = monotonic()
+        try:
+            await async_write_value(self._session, self.ip_address, key, value, timeout)
+        except Exception as err:
+            metrics.write_failures += 1
+            if isinstance(err, ValueError):
+                metrics.writes_rejected += 1
+            elif isinstance(err, (asyncio.TimeoutError, client_exceptions.ServerTimeoutError)):
+                metrics.timeouts += 1
+            if current and self._unconfirmed.get(key, (None,))[0] == value:
+                del self._unconfirmed[key]
+                if self._snapshot is not None:
+                    self._async_apply_values({key: self._snapshot.get(key)})
+            raise
+        metrics.write.observe(monotonic() - started)
+        if self._unconfirmed.get(key, (None,))[0] == value:
+            self._unconfirmed[key] = (value, monotonic() + WRITE_SETTLE_TIME)
+        self.async_note_write()
+        if self.scheduler is not None:
+            # Bring the next poll forward to read the value back
+            self.scheduler.async_poll_within(self, WRITE_SETTLE_TIME)
+
+    @callback
+    def _async_apply_values(self, values):
+        """Show values in the coordinator data before a poll reads them."""
+        if self.data is None:
+            return
+        self.data = {**self.data, **values}
+        self.changed_keys = frozenset(values)
+        self.async_update_listeners()
+
+    def _merge_unconfirmed(self, data, requested):
+        """Check written values against a snapshot requested at requested.
+
+        Snapshots requested before the device settled keep the written value;
+        later ones confirm it or, on mismatch, replace it.
+        """
+        merged = data
+        for key, (value, settled_at) in list(self._unconfirmed.items()):
+            if requested < settled_at:
+                if merged is data:
+                    merged = dict(data)
+                merged[key] = value
+                continue
+            del self._unconfirmed[key]
+            if data.get(key) != value:
+                self.metrics.writes_rolled_back += 1
+                _LOGGER.warning(
+                    f"{self.ip_address} reports {key}={data.get(key)} after writing {value}, rolling back"
+                )
+        return merged
+
+    @callback
+    def async_note_write(self):
+        """Switch back to fast polling after a write to the device."""
+        self._last_write = monotonic()
+        self._fast_poll_until = self._last_write + FAST_POLL_HOLD_AFTER_WRITE
+        self._async_snap_to_fast()
+
+    @callback
+    def async_hold_fast_poll(self, owner) -> CALLBACK_TYPE:
+        """Keep polling fast while a control loop is active.
+
+        Returns a callback that releases the hold.
+        """
+        self._fast_poll_holders.add(owner)
+        self._async_snap_to_fast()
+
+        @callback
+        def release():
+            self._fast_poll_holders.discard(owner)
+
+        return release
+
+    @callback
+    def _async_snap_to_fast(self):
+        """Reschedule the next poll at the fast rate if currently slower."""
+        self.poll_interval = min(self.poll_interval, POLL_INTERVAL_FAST)
+        if self.scheduler is not None:
+            self.scheduler.async_poll_within(self, POLL_INTERVAL_FAST)
+
+    @callback
+    def async_set_protection(self, protection):
+        """Check every snapshot against the contracted power, None to stop."""
+        self.protection = protection
+        if protection is not None and self.scheduler is not None:
+            # Check a fresh snapshot right away
+            self.scheduler.async_poll_within(self, POLL_INTERVAL_BURST)
+
+    @callback
+    def _async_protect(self, data):
+        """Send the writes the grid protection asks for ahead of other traffic."""
+        if self._protecting:
+            # The previous writes are still on their way, the next poll checks again
+            return
+        writes = self.protection.update(data, monotonic())
+        if self.protection.burst(monotonic()) and self.poll_interval > POLL_INTERVAL_BURST:
+            self.poll_interval = POLL_INTERVAL_BURST
+            if self.scheduler is not None:
+                self.scheduler.async_poll_within(self, POLL_INTERVAL_BURST)
+        if writes:
+            self._protecting = True
+            self.hass.async_create_background_task(
+                self._async_protective_writes(writes, self._snapshot_started),
+                f"v2c_trydan protection {self.ip_address}",
+            )
+
+    async def _async_protective_writes(self, writes, observed_at):
+        """Send writes and record the time from the request that saw the load."""
+        try:
+            for key, value in writes.items():
+                _LOGGER.warning(f"Grid protection: setting {key}={value} on {self.ip_address}")
+                await self.async_write(key, value, PRIORITY_SAFETY, owner="protection")
+        except Exception as err:
+            _LOGGER.error(f"Grid protection could not write to {self.ip_address}: {err}")
+        else:
+            self.metrics.protection.observe(monotonic() - observed_at)
+            self.metrics.protection_actions += 1
+        finally:
+            self._protecting = False
+
+    async def async_restore_snapshot(self, store) -> bool:
+        """Start from the snapshot saved in store by the last run.
+
+        The data is marked as not updated, so the entities can be created
+        from it and stay unavailable until the device answers a poll. Every
+        later snapshot is saved to store. Returns whether one was found.
+        """
+        self._store = store
+        stored = await store.async_load()
+        if not stored or not isinstance(stored.get("data"), dict):
+            return False
+        self.data = stored["data"]
+        self.last_update_success = False
+        self.restored_at = stored.get("time")
+        return True
+
+    @callback
+    def _async_save_snapshot(self):
+        """Save the newest snapshot within SNAPSHOT_SAVE_DELAY seconds."""
+        if self._store is None or self._store_pending:
+            return
+        self._store_pending = True
+        self._store.async_delay_save(self._snapshot_to_store, SNAPSHOT_SAVE_DELAY)
+
+    async def async_flush_snapshot(self):
+        """Save a pending snapshot now, before the charger is unloaded."""
+        if self._store_pending:
+            await self._store.async_save(self._snapshot_to_store())
+
+    @callback
+    def _snapshot_to_store(self) -> dict:
+        self._store_pending = False
+        return {"time": time(), "data": self.data}
+
+    def as_diagnostics(self) -> dict:
+        """Return the polling and request state for the diagnostics download."""
+        return {
+            "poll_interval": self.poll_interval,
+            "request_budget": self.request_budget,
+            "fast_poll_holders": len(self._fast_poll_holders),
+            "grid_protection": self.protection is not None,
+            "last_update_success": self.last_update_success,
+            "restored_snapshot_time": self.restored_at,
+            "breaker": {
+                "state": self._breaker.state,
+                "failures": self._breaker.failures,
+                "retry_in": round(self._breaker.time_until_retry(), 1),
+            },
+            "queued_requests": len(self.gateway),
+            "unconfirmed_writes": sorted(self._unconfirmed),
+            "samples": self.samples.as_diagnostics(),
+            "metrics": self.metrics.as_dict(),
+        }
+
+    def _is_volatile(self) -> bool:
+        """Tell if the recent power readings moved more than the threshold."""
+        for key in VOLATILITY_KEYS:
+            # NaN marks a poll without a reading, it never equals itself
+            history = [value for value in self.samples.last(key, VOLATILITY_WINDOW) if value == value]
+            if history and max(history) - min(history) > VOLATILITY_THRESHOLD_W:
+                return True
+        return False
+
+    def _select_poll_interval(self, data) -> int:
+        """Pick the next poll interval from the last snapshot."""
+        volatile = self._is_volatile()
+
+        if self.protection is not None and self.protection.burst(monotonic()):
+            return POLL_INTERVAL_BURST
+
+        if self._fast_poll_holders or monotonic() < self._fast_poll_until:
+            return POLL_INTERVAL_FAST
+
+        charge_state = data.get("ChargeState")
+        paused = bool(data.get("Paused", 0))
+        try:
+            charge_power = float(data.get("ChargePower") or 0)
+        except (TypeError, ValueError):
+            charge_power = 0
+
+        if charge_power > CHARGING_POWER_THRESHOLD_W or (charge_state == 2 and not paused):
+            return POLL_INTERVAL_FAST
+
+        if volatile:
+            return POLL_INTERVAL_FAST
+
+        if charge_state in (1, 2):
+            # The device's own dynamic control loop may start a charge at any time
+            if data.get("Dynamic") and not paused:
+                return POLL_INTERVAL_FAST
+            return POLL_INTERVAL_CONNECTED
+
+        return POLL_INTERVAL_IDLE
+
+    def snapshot_changed(self, keys) -> bool:
+        """Tell whether any of keys changed in the last update.
+
+        keys=None stands for an entity that depends on the whole snapshot.
+        """
+        if self.changed_keys is None or keys is None:
+            return True
+        return not self.changed_keys.isdisjoint(keys)
+
+    def _diff_snapshot(self, data):
+        """Return the keys whose value differs from the current snapshot."""
+        previous = self.data
+        if previous is None or not self.last_update_success:
+            self._static_values = {key: data.get(key) for key in STATIC_KEYS}
+            self._polls_since_static_check = 0
+            return None
+
+        changed = {
+            key for key, value in data.items()
+            if key not in STATIC_KEYS and previous.get(key) != value
+        }
+        if len(data) != len(previous):
+            changed.update(previous.keys() ^ data.keys())
+
+        self._polls_since_static_check += 1
+        if self._polls_since_static_check >= STATIC_KEYS_CHECK_EVERY:
+            self._polls_since_static_check = 0
+            for key in STATIC_KEYS:
+                value = data.get(key)
+                if self._static_values.get(key) != value:
+                    self._static_values[key] = value
+                    changed.add(key)
+
+        return frozenset(changed)
+
+    async def async_get_realtime_data(self, max_age=SNAPSHOT_TTL) -> dict:
+        """Return a /RealTimeData snapshot requested at most max_age seconds ago.
+
+        Concurrent callers share one in-flight request, and a snapshot that is
+        recent enough is returned without touching the device.
+        """
+        not_before = monotonic() - max_age
+        while True:
+            if self._snapshot is not None and self._snapshot_started >= not_before:
+                return self._snapshot
+            fetch = self._inflight
+            if fetch is None:
+                self._inflight_started = monotonic()
+                fetch = self._inflight = self.hass.async_create_task(self._async_fetch_snapshot())
+                # Consume the result in case every caller was cancelled
+                fetch.add_done_callback(lambda task: task.cancelled() or task.exception())
+                break
+            if self._inflight_started >= not_before:
+                break
+            # Let the stale request finish rather than stacking a second one
+            await asyncio.wait([fetch])
+        return await asyncio.shield(fetch)
+
+    async def _async_fetch_snapshot(self) -> dict:
+        """Run the single in-flight request to the device."""
+        started = self._inflight_started
         try:
-            if self._session is None:
-                self._session = async_get_clientsession(self.hass)
-            
-            data = await self._async_get_json(self._session, f"http://{self.ip_address}/RealTimeData")
-            
-            # Reset error tracking on successful update
-            if self.error_reportado or self._consecutive_errors > 0:
-                self.error_reportado = False
-                self._consecutive_errors = 0
+            if not self._breaker.allow_request():
+                self.metrics.polls_suppressed += 1
+                raise UpdateFailed(
+                    f"{self.ip_address} is offline, next probe in {self._breaker.time_until_retry():.0f} s"
+                )
+
+            if self._breaker.is_probing:
+                self.metrics.retries += 1
+                timeout = aiohttp.ClientTimeout(total=PROBE_TIMEOUT, connect=PROBE_CONNECT_TIMEOUT)
+            else:
+                timeout = aiohttp.ClientTimeout(
+                    total=min(REQUEST_TIMEOUT, self.request_budget), connect=CONNECT_TIMEOUT
+                )
+
+            try:
+                if self._session is None:
+                    self._session = async_get_clientsession(self.hass)
+                data = await self.gateway.async_submit(
+                    lambda: self._async_request_snapshot(timeout), PRIORITY_POLL
+                )
+            except Exception as e:
+                if self._breaker.record_failure():
+                    _LOGGER.warning(
+                        f"{self.ip_address} unreachable after {self._breaker.failures} attempts, "
+                        f"backing off for {self._breaker.time_until_retry():.0f} s"
+                    )
+                raise UpdateFailed(f"Error fetching data from {self.ip_address}: {e}")
+
+            if self._breaker.record_success():
                 _LOGGER.info(f"Connection to {self.ip_address} restored")
-            
+
+            self._snapshot = data
+            self._snapshot_started = started
             return data
-            
-        except RetryError as e:
-            self._consecutive_errors += 1
-            if self._consecutive_errors >= self.MAX_CONSECUTIVE_ERRORS:
-                if not self.error_reportado:
-                    self.error_reportado = True
-                    _LOGGER.error(
-                        f"Persistent connection issues with {self.ip_address} after {self._consecutive_errors} attempts. "
-                        "Consider checking device connectivity."
-                    )
-            raise UpdateFailed(f"Failed to connect to {self.ip_address} after multiple retries: {e}")
-            
-        except Exception as e:
-            self._consecutive_errors += 1
-            if not self.error_reportado:
-                self.error_reportado = True
-                _LOGGER.error(f"Unexpected error communicating with {self.ip_address}: {e}")
-            raise UpdateFailed(f"Error fetching data from {self.ip_address}: {e}")
-
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-    async def _async_get_json(self, session, url):
-        """Get JSON data from API with retry logic.
-        
-        Handles firmware issues:
-        - Incorrect Content-Type (text instead of application/json)
-        - Malformed JSON with duplicate fields
-        """
+        finally:
+            self._inflight = None
+
+    async def _async_request_snapshot(self, timeout) -> dict:
+        """Send one /RealTimeData request and record its latency."""
+        metrics = self.metrics
+        metrics.polls += 1
+        started = monotonic()
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    text = await response.text()
-                    content_type = response.headers.get('content-type', '').lower()
-                    
-                    # Log content-type issues for debugging
-                    if 'application/json' not in content_type:
-                        _LOGGER.debug(f"Device returned non-JSON content-type: {content_type}, parsing as JSON anyway")
-                    
-                    try:
-                        return json.loads(text)
-                    except json.JSONDecodeError:
-                        # Try to fix malformed JSON
-                        _LOGGER.debug(f"JSON parsing failed, attempting to fix malformed response")
-                        return arreglar_json_invalido(text)
-                else:
-                    response.raise_for_status()
-                    
-        except client_exceptions.ClientConnectorError as err:
-            _LOGGER.debug(f"Connection error to {self.ip_address}: {err}")
-            raise
-        except client_exceptions.ServerTimeoutError as err:
-            _LOGGER.debug(f"Timeout error to {self.ip_address}: {err}")
-            raise
-        except ClientError as err:
-            _LOGGER.debug(f"HTTP client error to {self.ip_address}: {err}")
+            data = await async_fetch_realtime_data(self._session, self.ip_address, timeout, metrics)
+        except Exception as err:
+            metrics.poll_failures += 1
+            if isinstance(err, (asyncio.TimeoutError, client_exceptions.ServerTimeoutError)):
+                metrics.timeouts += 1
             raise
-        except json.JSONDecodeError as e:
-            _LOGGER.error(f"JSON parsing error from {self.ip_address}: {e}")
+        metrics.poll.observe(monotonic() - started)
+        return data
+
+    async def _async_update_data(self):
+        """Fetch data from API."""
+        # Never reuse a snapshot requested before the last write, nor the
+        # previous poll's when polling in bursts
+        max_age = min(SNAPSHOT_TTL, self.poll_interval / 2, monotonic() - self._last_write)
+        try:
+            data = await self.async_get_realtime_data(max_age)
+        except UpdateFailed:
+            self.changed_keys = None
+            retry_in = self._breaker.time_until_retry()
+            if retry_in:
+                # Sleep through the backoff window instead of polling a dead device
+                self.poll_interval = max(retry_in, POLL_INTERVAL_FAST)
             raise
-        except Exception as e:
-            _LOGGER.error(f"Unexpected error fetching data from {self.ip_address}: {e}")
-            raise
\ No newline at end of file
+
+        if self._unconfirmed:
+            data = self._merge_unconfirmed(data, self._snapshot_started)
+        if not data.get("Paused"):
+            self.pause_owner = None
+
+        self.samples.append(time(), data)
+        interval = self._select_poll_interval(data)
+        if self.poll_interval != interval:
+            _LOGGER.debug(f"Polling {self.ip_address} every {interval} s")
+            self.poll_interval = interval
+
+        self.changed_keys = self._diff_snapshot(data)
+        self._async_save_snapshot()
+        if self.protection is not None:
+            self._async_protect(data)
+        return data
@@ -0,0 +1,50 @@
+"""Tolerant decoder for /RealTimeData payloads sent by V2C Trydan firmware."""
+import json
+import re
+
+# Firmware quirks repaired in one pass over the raw bytes:
+# - version numbers sent without quotes:  "FirmwareVersion":1.6.13
+# - missing comma before the next key:    "Timer":0"ReadyState":0
+# Duplicate keys need no repair, json keeps the last occurrence.
+# Only the FirmwareVersion value is quoted: a string value such as an SSID
+# may hold ":1.2.3," and must be left alone.
+_QUIRKS = re.compile(
+    rb'(?<="FirmwareVersion":)(?P<version>\s*\d+(?:\.\d+){2,})(?=\s*[,}"])'
+    rb'|(?<=[0-9"el\]}])(?P<comma>)(?="[A-Za-z_][A-Za-z0-9_]*"\s*:)'
+)
+_UNQUOTED_VERSION = re.compile(rb'"FirmwareVersion":\s*\d')
+
+
+def _repair(match) -> bytes:
+    version = match.group("version")
+    if version is not None:
+        return b'"' + version.strip() + b'"'
+    return b","
+
+
+def _needs_repair(raw: bytes) -> bool:
+    """Cheaply tell whether the payload may carry a firmware quirk.
+
+    In compact JSON every opening quote follows one of '{', ',', ':' or '[',
+    so any other quote pair points at a missing comma. False positives
+    (whitespace, escaped quotes) only cost the repair pass.
+    """
+    openings = raw.count(b'{"') + raw.count(b',"') + raw.count(b':"') + raw.count(b'["')
+    return raw.count(b'"') != 2 * openings or _UNQUOTED_VERSION.search(raw) is not None
+
+
+def decode_realtime_data(raw) -> tuple[dict, int]:
+    """Decode a /RealTimeData payload.
+
+    Returns the decoded data and the number of firmware quirks repaired.
+    Raises ValueError if the payload cannot be decoded.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode()
+    repairs = 0
+    if _needs_repair(raw):
+        raw, repairs = _QUIRKS.subn(_repair, raw)
+    data = json.loads(raw.decode("utf-8", errors="replace"))
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+    return data, repairs
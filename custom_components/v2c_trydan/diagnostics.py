@@ -0,0 +1,20 @@
+"""Diagnostics support for V2C Trydan."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_IP_ADDRESS
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+# Identify the installation rather than describe the charger's behaviour
+TO_REDACT = {CONF_IP_ADDRESS, "IP", "SSID", "ID", "title", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "coordinator": coordinator.as_diagnostics(),
+        "data": async_redact_data(coordinator.data or {}, TO_REDACT),
+    }
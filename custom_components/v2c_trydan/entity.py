@@ -0,0 +1,83 @@
+"""Base entity for the V2C Trydan integration."""
+from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+
+
+class V2CtrydanEntity(CoordinatorEntity):
+    """Coordinator entity that only writes state when its keys change."""
+
+    # Snapshot keys rendered by the entity; None means the whole snapshot
+    _watched_keys = None
+
+    def __init__(self, coordinator):
+        super().__init__(coordinator)
+        self._attr_device_info = coordinator.device_info
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        if self.coordinator.snapshot_changed(self._watched_keys):
+            self.async_write_ha_state()
+
+
+@callback
+def async_get_device_entity_id(hass, platform, ip_address, key):
+    """Return the entity_id of another entity of the same charger.
+
+    Entities of this integration use "<ip>_<key>" unique IDs. Returns None
+    if the entity is not registered (yet).
+    """
+    return er.async_get(hass).async_get_entity_id(platform, DOMAIN, f"{ip_address}_{key}")
+
+
+class DeviceEntityIds:
+    """entity_ids of other entities of the same charger, resolved once.
+
+    Takes name=(platform, key) pairs. The IDs come from the entity
+    registry's unique ID index and are resolved again only after a registry
+    update that may concern one of them (creation, removal, rename), so
+    lookups never scan the registry. Call async_track and keep the returned
+    callback to unsubscribe; the optional action runs whenever the IDs may
+    have changed.
+    """
+
+    def __init__(self, hass, ip_address, **entities):
+        self.hass = hass
+        self._unique_ids = {
+            name: (platform, f"{ip_address}_{key}") for name, (platform, key) in entities.items()
+        }
+        self._entity_ids = None
+        self._action = None
+
+    def get(self, name):
+        """Return the entity_id registered for name, or None."""
+        if self._entity_ids is None:
+            registry = er.async_get(self.hass)
+            self._entity_ids = {
+                name: registry.async_get_entity_id(platform, DOMAIN, unique_id)
+                for name, (platform, unique_id) in self._unique_ids.items()
+            }
+        return self._entity_ids[name]
+
+    @callback
+    def async_track(self, action=None):
+        """Follow registry updates; returns the unsubscribe callback."""
+        self._action = action
+        return self.hass.bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_registry_updated)
+
+    @callback
+    def _async_registry_updated(self, event):
+        if self._entity_ids is None:
+            return
+        resolved = self._entity_ids.values()
+        data = event.data
+        if data["entity_id"] in resolved or data.get("old_entity_id") in resolved:
+            self._entity_ids = None
+        elif None in resolved and data["action"] != "remove":
+            # One of the missing entities may just have been registered
+            self._entity_ids = None
+        if self._entity_ids is None and self._action is not None:
+            self._action()
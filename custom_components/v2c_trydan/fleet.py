@@ -0,0 +1,170 @@
+"""Shared poll scheduler for every configured V2C Trydan charger."""
+import asyncio
+import heapq
+import itertools
+import logging
+
+from .const import (
+    FLEET_MAX_CONCURRENT_POLLS,
+    FLEET_REQUEST_BUDGET,
+    FLEET_SLOW_POLL,
+    FLEET_SLOW_LANE_POLLS,
+    POLL_INTERVAL_FAST,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Golden ratio conjugate, spreads successive phases evenly over the interval
+_PHASE_STEP = 0.6180339887498949
+
+
+class _Slot:
+    """Scheduling state of one coordinator."""
+
+    __slots__ = ("due", "running", "slow")
+
+    def __init__(self, due):
+        self.due = due
+        self.running = False
+        self.slow = False
+
+
+class FleetScheduler:
+    """Drive the polls of all coordinators from one timer.
+
+    - each charger gets its own phase so polls do not fire at the same time
+    - at most max_concurrent polls are in flight at once
+    - every poll request is bounded by request_budget, and chargers whose
+      last poll was slow share a separate single-slot lane, so they cannot
+      hold the shared slots and delay the others
+
+    Coordinators expose poll_interval (seconds), request_budget and
+    async_refresh(); the scheduler sets request_budget on registration.
+    """
+
+    def __init__(
+        self,
+        hass,
+        max_concurrent=FLEET_MAX_CONCURRENT_POLLS,
+        request_budget=FLEET_REQUEST_BUDGET,
+    ):
+        self.hass = hass
+        self._loop = hass.loop
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._slow_lane = asyncio.Semaphore(FLEET_SLOW_LANE_POLLS)
+        self._request_budget = request_budget
+        self._slots = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._phases = itertools.count()
+        self._timer = None
+        self._timer_due = None
+
+    def __len__(self):
+        return len(self._slots)
+
+    def async_register(self, coordinator):
+        """Start polling a coordinator on its own phase."""
+        phase = (next(self._phases) * _PHASE_STEP) % 1 * POLL_INTERVAL_FAST
+        coordinator.request_budget = self._request_budget
+        coordinator.scheduler = self
+        self._slots[coordinator] = _Slot(self._loop.time() + phase)
+        self._push(coordinator)
+
+    def async_unregister(self, coordinator):
+        """Stop polling a coordinator."""
+        self._slots.pop(coordinator, None)
+        coordinator.scheduler = None
+        if not self._slots and self._timer is not None:
+            self._timer.cancel()
+            self._timer = self._timer_due = None
+            self._heap.clear()
+
+    def async_poll_within(self, coordinator, delay):
+        """Make sure the coordinator polls within delay seconds."""
+        slot = self._slots.get(coordinator)
+        if slot is None or slot.running:
+            # A running poll picks the coordinator's new interval when done
+            return
+        due = self._loop.time() + delay
+        if due < slot.due:
+            slot.due = due
+            self._push(coordinator)
+
+    def _push(self, coordinator):
+        slot = self._slots[coordinator]
+        heapq.heappush(self._heap, (slot.due, next(self._sequence), coordinator))
+        self._arm()
+
+    def _arm(self):
+        """Set the timer for the earliest due poll."""
+        while self._heap:
+            due, _, coordinator = self._heap[0]
+            slot = self._slots.get(coordinator)
+            if slot is not None and slot.due == due:
+                break
+            # Entry superseded by a later reschedule or unregistration
+            heapq.heappop(self._heap)
+        else:
+            return
+        if self._timer is not None:
+            if self._timer_due <= due:
+                return
+            self._timer.cancel()
+        self._timer_due = due
+        self._timer = self._loop.call_at(due, self._run_due)
+
+    def _run_due(self):
+        self._timer = self._timer_due = None
+        now = self._loop.time()
+        while self._heap and self._heap[0][0] <= now:
+            due, _, coordinator = heapq.heappop(self._heap)
+            slot = self._slots.get(coordinator)
+            if slot is None or slot.due != due or slot.running:
+                # A running poll reschedules itself when done
+                continue
+            slot.running = True
+            self.hass.async_create_background_task(
+                self._async_poll(coordinator, slot),
+                f"v2c_trydan poll {coordinator.ip_address}",
+            )
+        self._arm()
+
+    async def _async_poll(self, coordinator, slot):
+        lane = self._slow_lane if slot.slow else self._semaphore
+        await lane.acquire()
+        holding = True
+        started = self._loop.time()
+        try:
+            refresh = self.hass.async_create_background_task(
+                coordinator.async_refresh(), f"v2c_trydan refresh {coordinator.ip_address}"
+            )
+            done, _ = await asyncio.wait({refresh}, timeout=None if slot.slow else FLEET_SLOW_POLL)
+            if not done:
+                # Over the shared lane budget: free the slot for the other chargers
+                lane.release()
+                holding = False
+                if not slot.slow:
+                    _LOGGER.debug(f"{coordinator.ip_address} moved to the slow poll lane")
+                    slot.slow = True
+                await refresh
+            elif slot.slow and self._loop.time() - started < FLEET_SLOW_POLL:
+                _LOGGER.debug(f"{coordinator.ip_address} moved back to the shared poll lane")
+                slot.slow = False
+            refresh.result()
+        except Exception as err:
+            _LOGGER.exception(f"Unexpected error polling {coordinator.ip_address}: {err}")
+        finally:
+            if holding:
+                lane.release()
+            slot.running = False
+        if self._slots.get(coordinator) is not slot:
+            return
+        now = self._loop.time()
+        interval = coordinator.poll_interval
+        # Stay on the device's phase grid when possible
+        due = slot.due + interval
+        if due <= now:
+            due = now + interval
+        slot.due = due
+        self._push(coordinator)
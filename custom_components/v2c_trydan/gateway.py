@@ -0,0 +1,167 @@
+"""Per-device request gateway for V2C Trydan chargers."""
+import asyncio
+import itertools
+import logging
+
+from .const import WRITE_COALESCE_WINDOW, WRITE_COALESCE_MAX_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_SAFETY = 0
+PRIORITY_USER = 1
+PRIORITY_POLL = 2
+PRIORITY_DIAGNOSTIC = 3
+
+
+class _Request:
+    """A queued write or job and the callers waiting for its outcome."""
+
+    __slots__ = ("priority", "sequence", "ready_at", "deadline", "key", "value", "job", "waiters")
+
+    def __init__(self, priority, sequence, ready_at, key=None, value=None, job=None):
+        self.priority = priority
+        self.sequence = sequence
+        self.ready_at = ready_at
+        self.deadline = ready_at
+        self.key = key
+        self.value = value
+        self.job = job
+        self.waiters = []
+
+
+class RequestGateway:
+    """Serialize the traffic to one charger's embedded web server.
+
+    - one request at a time, the device copes badly with concurrent ones
+    - queued requests go out by priority: safety writes, user writes,
+      polls, then diagnostics
+    - a write that has not been sent yet is replaced by a newer write to
+      the same key (last write wins); user writes go out once no newer
+      value arrived for coalesce_window seconds, or after max_delay at the
+      latest, so a burst of values like a dragged slider becomes a single
+      request
+
+    write is a coroutine function (key, value) that sends one write;
+    coalesced writes are counted in metrics.
+    """
+
+    def __init__(
+        self,
+        hass,
+        write,
+        metrics,
+        coalesce_window=WRITE_COALESCE_WINDOW,
+        max_delay=WRITE_COALESCE_MAX_DELAY,
+    ):
+        self.hass = hass
+        self._loop = hass.loop
+        self._write = write
+        self._metrics = metrics
+        self._coalesce_window = coalesce_window
+        self._max_delay = max_delay
+        self._queue = []
+        self._pending_writes = {}
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._worker = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    async def async_write(self, key, value, priority=PRIORITY_USER):
+        """Write key=value to the device.
+
+        Returns once the value, or a newer one for the same key, is written;
+        a failed write raises in every caller it stood for.
+        """
+        now = self._loop.time()
+        request = self._pending_writes.get(key)
+        if request is not None:
+            request.value = value
+            self._metrics.writes_coalesced += 1
+            if priority < request.priority:
+                request.priority = priority
+            request.ready_at = min(now + self._coalesce_window, request.deadline)
+        else:
+            request = _Request(priority, next(self._sequence), now + self._coalesce_window, key, value)
+            request.deadline = now + self._max_delay
+            self._pending_writes[key] = request
+            self._queue.append(request)
+        if priority == PRIORITY_SAFETY:
+            request.ready_at = now
+        return await self._async_wait(request)
+
+    async def async_submit(self, job, priority=PRIORITY_POLL):
+        """Run job, a coroutine function, in turn with the other requests."""
+        request = _Request(priority, next(self._sequence), self._loop.time(), job=job)
+        self._queue.append(request)
+        return await self._async_wait(request)
+
+    def async_shutdown(self):
+        """Drop the queued requests and stop the worker."""
+        for request in self._queue:
+            for waiter in request.waiters:
+                waiter.cancel()
+        self._queue.clear()
+        self._pending_writes.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def _async_wait(self, request):
+        waiter = self._loop.create_future()
+        request.waiters.append(waiter)
+        if self._worker is None:
+            self._worker = self.hass.async_create_background_task(
+                self._async_run(), "v2c_trydan request gateway"
+            )
+        else:
+            self._wakeup.set()
+        return await waiter
+
+    def _next_ready(self, now):
+        """Return the most urgent request that may go out now."""
+        ready = [request for request in self._queue if request.ready_at <= now]
+        if not ready:
+            return None
+        return min(ready, key=lambda request: (request.priority, request.sequence))
+
+    async def _async_run(self):
+        try:
+            while self._queue:
+                now = self._loop.time()
+                request = self._next_ready(now)
+                if request is None:
+                    # Only writes still collecting newer values are queued
+                    delay = min(queued.ready_at for queued in self._queue) - now
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                self._queue.remove(request)
+                if request.key is not None:
+                    del self._pending_writes[request.key]
+                await self._async_send(request)
+        finally:
+            self._worker = None
+
+    async def _async_send(self, request):
+        try:
+            if request.job is not None:
+                result = await request.job()
+            else:
+                result = await self._write(request.key, request.value)
+        except asyncio.CancelledError:
+            for waiter in request.waiters:
+                waiter.cancel()
+            raise
+        except Exception as err:
+            for waiter in request.waiters:
+                if not waiter.done():
+                    waiter.set_exception(err)
+        else:
+            for waiter in request.waiters:
+                if not waiter.done():
+                    waiter.set_result(result)
@@ -0,0 +1,44 @@
+"""Completion time of the km to charge target."""
+from datetime import datetime, timedelta, timezone
+import statistics
+
+from .const import CHARGE_EFFICIENCY, CHARGING_POWER_THRESHOLD_W, VOLATILITY_WINDOW
+from .samples import TIME
+
+
+def km_to_energy(km, kwh_per_100km) -> float:
+    """Return the energy (kWh) the charger delivers for km of range."""
+    return km * kwh_per_100km / 100 / CHARGE_EFFICIENCY
+
+
+def energy_to_km(energy_kwh, kwh_per_100km) -> float:
+    """Return the km of range energy_kwh delivered by the charger adds."""
+    return energy_kwh / (kwh_per_100km / 100) * CHARGE_EFFICIENCY
+
+
+def completion_time(samples, target_kwh, window=VOLATILITY_WINDOW):
+    """Return when ChargeEnergy reaches target_kwh, None if not charging.
+
+    Reads the last poll and the rolling ChargePower from the sample ring.
+    The power is the mean of the last polls while charging, so a single
+    noisy reading barely moves the estimate; a poll below the charging
+    threshold starts over.
+    """
+    when = samples.latest(TIME)
+    energy_kwh = samples.latest("ChargeEnergy")
+    # NaN marks a poll without a reading, it never equals itself
+    if when is None or energy_kwh != energy_kwh:
+        return None
+    at = datetime.fromtimestamp(when, timezone.utc)
+    remaining_kwh = target_kwh - energy_kwh
+    if remaining_kwh <= 0:
+        return at
+
+    power_w = []
+    for value in reversed(samples.last("ChargePower", window)):
+        if not value > CHARGING_POWER_THRESHOLD_W:
+            break
+        power_w.append(value)
+    if not power_w:
+        return None
+    return at + timedelta(hours=remaining_kwh * 1000 / statistics.fmean(power_w))
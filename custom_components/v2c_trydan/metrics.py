@@ -0,0 +1,101 @@
+"""In-process metrics of the requests made to one V2C Trydan charger."""
+import bisect
+from collections import deque
+
+from .const import METRICS_WINDOW
+
+# Upper bounds of the latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10)
+
+COUNTERS = (
+    "polls",
+    "poll_failures",
+    "polls_suppressed",
+    "retries",
+    "timeouts",
+    "firmware_repairs",
+    "writes",
+    "write_failures",
+    "writes_rejected",
+    "writes_coalesced",
+    "writes_rolled_back",
+    "protection_actions",
+)
+
+
+class LatencyHistogram:
+    """Latencies in fixed buckets since startup, plus the most recent samples.
+
+    Percentiles come from the recent samples, so they follow the current
+    link quality; the buckets keep the long-term shape.
+    """
+
+    __slots__ = ("counts", "count", "total", "max", "recent")
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+
+    def percentile(self, fraction):
+        """Return the fraction percentile of the recent samples, in seconds."""
+        if not self.recent:
+            return None
+        samples = sorted(self.recent)
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+    def as_dict(self):
+        buckets = {
+            f"le_{bound * 1000:g}ms": count
+            for bound, count in zip(LATENCY_BUCKETS, self.counts)
+        }
+        buckets["gt_10000ms"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": _ms(self.total / self.count) if self.count else None,
+            "p50_ms": _ms(self.percentile(0.5)),
+            "p99_ms": _ms(self.percentile(0.99)),
+            "max_ms": _ms(self.max) if self.count else None,
+            "buckets": buckets,
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+class DeviceMetrics:
+    """Latency histograms and counters of one charger.
+
+    - poll: /RealTimeData request time, decode: parse and repair time,
+      write: /write request time, protection: time from the poll that saw
+      a grid overload to its protective writes being done
+    - counters are plain attributes named in COUNTERS
+    """
+
+    def __init__(self):
+        self.poll = LatencyHistogram()
+        self.decode = LatencyHistogram()
+        self.write = LatencyHistogram()
+        self.protection = LatencyHistogram()
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+
+    def as_dict(self):
+        return {
+            "poll": self.poll.as_dict(),
+            "decode": self.decode.as_dict(),
+            "write": self.write.as_dict(),
+            "protection": self.protection.as_dict(),
+            "counters": {counter: getattr(self, counter) for counter in COUNTERS},
+        }
@@ -1,15 +1,11 @@
 from homeassistant.components.number import NumberEntity
-from homeassistant.components.sensor import SensorStateClass
-from homeassistant.const import DEVICE_DEFAULT_NAME, CONF_IP_ADDRESS
-from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.device_registry import DeviceInfo
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.const import CONF_IP_ADDRESS
 import logging
 import aiohttp
 import asyncio
 
-from . import DOMAIN
+from .const import DOMAIN
+from .entity import V2CtrydanEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,44 +18,26 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     
     async_add_entities([MaxIntensityNumber(coordinator)])
     async_add_entities([MinIntensityNumber(coordinator)])
-    async_add_entities([KmToChargeNumber(hass, ip_address)])
+    async_add_entities([KmToChargeNumber(hass, ip_address, coordinator.device_info)])
     async_add_entities([IntensityNumber(coordinator)])
-    async_add_entities([MaxPrice(hass, ip_address)])
+    async_add_entities([MaxPrice(hass, ip_address, coordinator.device_info)])
 
-class MaxIntensityNumber(CoordinatorEntity, NumberEntity):
+class MaxIntensityNumber(V2CtrydanEntity, NumberEntity):
     """Representation of max intensity number entity."""
     
+    _watched_keys = ("MaxIntensity", "MinIntensity")
+    _attr_has_entity_name = True
+    _attr_translation_key = "max_intensity"
+    _attr_icon = "mdi:car"
+    _attr_native_unit_of_measurement = "A"
+    _attr_native_max_value = 32
+
     def __init__(self, coordinator):
         """Initialize the number entity."""
         super().__init__(coordinator)
         self._coordinator = coordinator
         self._ip_address = coordinator.ip_address
-        self._attr_has_entity_name = True
-        self._attr_translation_key = "max_intensity"
-
-    @property
-    def unique_id(self):
-        return "v2c_max_intensity"
-
-        
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
-
-    @property
-    def icon(self):
-        return "mdi:car"
-
-    @property
-    def native_unit_of_measurement(self):
-        return "A"
+        self._attr_unique_id = f"{self._ip_address}_v2c_max_intensity"
 
     @property
     def native_value(self):
@@ -68,10 +46,6 @@ class MaxIntensityNumber(CoordinatorEntity, NumberEntity):
             return self._coordinator.data.get('MaxIntensity', 32)
         return 32
 
-    @property
-    def native_max_value(self):
-        return 32
-
     @property
     def native_min_value(self):
         """Return minimum value from device data."""
@@ -79,10 +53,6 @@ class MaxIntensityNumber(CoordinatorEntity, NumberEntity):
             return self._coordinator.data.get('MinIntensity', 6)
         return 6
 
-    @property
-    def state_class(self):
-        return SensorStateClass.MEASUREMENT
-
     async def async_set_native_value(self, value):
         # Convert to integer for the device
         int_value = int(value)
@@ -90,73 +60,39 @@ class MaxIntensityNumber(CoordinatorEntity, NumberEntity):
         max_val = self.native_max_value
         if min_val <= int_value <= max_val:
             await self._set_max_intensity(int_value)
-            # Request coordinator update after setting value
-            await self._coordinator.async_request_refresh()
         else:
             _LOGGER.error(f"v2c_max_intensity must be between {min_val} and {max_val}")
             
     async def _set_max_intensity(self, max_intensity):
         """Set max intensity on the device."""
-        if not self._ip_address:
-            _LOGGER.error("IP address not available for MaxIntensityNumber")
-            return
-            
-        session = async_get_clientsession(self.hass)
-        url = f"http://{self._ip_address}/write/MaxIntensity={max_intensity}"
         try:
-            timeout = aiohttp.ClientTimeout(total=5, connect=2)
-            async with session.get(url, timeout=timeout) as response:
-                response.raise_for_status()
-                response_text = await response.text()
-                
-                # Check if device returned an error
-                if response_text.strip().upper() == "ERROR":
-                    _LOGGER.error(f"Device returned ERROR when setting max intensity to {max_intensity}")
-                    raise ValueError(f"Device rejected max intensity value {max_intensity}")
+            await self._coordinator.async_write("MaxIntensity", max_intensity)
         except asyncio.TimeoutError as err:
             _LOGGER.error(f"Timeout setting max intensity: {err}")
             raise
         except aiohttp.ClientError as err:
             _LOGGER.error(f"HTTP error setting max intensity: {err}")
             raise
-        except Exception as err:
-            _LOGGER.error(f"Unexpected error setting max intensity: {err}")
+        except ValueError:
+            _LOGGER.error(f"Device returned ERROR when setting max intensity to {max_intensity}")
             raise
 
-class MinIntensityNumber(CoordinatorEntity, NumberEntity):
+class MinIntensityNumber(V2CtrydanEntity, NumberEntity):
     """Representation of min intensity number entity."""
     
+    _watched_keys = ("MinIntensity", "MaxIntensity")
+    _attr_has_entity_name = True
+    _attr_translation_key = "min_intensity"
+    _attr_icon = "mdi:car"
+    _attr_native_unit_of_measurement = "A"
+    _attr_native_min_value = 6
+
     def __init__(self, coordinator):
         """Initialize the number entity."""
         super().__init__(coordinator)
         self._coordinator = coordinator
         self._ip_address = coordinator.ip_address
-        self._attr_has_entity_name = True
-        self._attr_translation_key = "min_intensity"
-
-    @property
-    def unique_id(self):
-        return "v2c_min_intensity"
-
-        
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
-
-    @property
-    def icon(self):
-        return "mdi:car"
-
-    @property
-    def native_unit_of_measurement(self):
-        return "A"
+        self._attr_unique_id = f"{self._ip_address}_v2c_min_intensity"
 
     @property
     def native_value(self):
@@ -172,14 +108,6 @@ class MinIntensityNumber(CoordinatorEntity, NumberEntity):
             return self._coordinator.data.get('MaxIntensity', 32)
         return 32
 
-    @property
-    def native_min_value(self):
-        return 6
-
-    @property
-    def state_class(self):
-        return SensorStateClass.MEASUREMENT
-
     async def async_set_native_value(self, value):
         # Convert to integer for the device
         int_value = int(value)
@@ -187,90 +115,45 @@ class MinIntensityNumber(CoordinatorEntity, NumberEntity):
         max_val = self.native_max_value
         if min_val <= int_value <= max_val:
             await self._set_min_intensity(int_value)
-            # Request coordinator update after setting value
-            await self._coordinator.async_request_refresh()
         else:
             _LOGGER.error(f"v2c_min_intensity must be between {min_val} and {max_val}")
             
     async def _set_min_intensity(self, min_intensity):
         """Set min intensity on the device."""
-        if not self._ip_address:
-            _LOGGER.error("IP address not available for MinIntensityNumber")
-            return
-            
-        session = async_get_clientsession(self.hass)
-        url = f"http://{self._ip_address}/write/MinIntensity={min_intensity}"
         try:
-            timeout = aiohttp.ClientTimeout(total=5, connect=2)
-            async with session.get(url, timeout=timeout) as response:
-                response.raise_for_status()
-                response_text = await response.text()
-                
-                # Check if device returned an error
-                if response_text.strip().upper() == "ERROR":
-                    _LOGGER.error(f"Device returned ERROR when setting min intensity to {min_intensity}")
-                    raise ValueError(f"Device rejected min intensity value {min_intensity}")
+            await self._coordinator.async_write("MinIntensity", min_intensity)
         except asyncio.TimeoutError as err:
             _LOGGER.error(f"Timeout setting min intensity: {err}")
             raise
         except aiohttp.ClientError as err:
             _LOGGER.error(f"HTTP error setting min intensity: {err}")
             raise
-        except Exception as err:
-            _LOGGER.error(f"Unexpected error setting min intensity: {err}")
+        except ValueError:
+            _LOGGER.error(f"Device returned ERROR when setting min intensity to {min_intensity}")
             raise
 
-
 class KmToChargeNumber(NumberEntity):
     """Representation of km to charge number entity."""
-    
-    def __init__(self, hass, ip_address):
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "km_to_charge"
+    _attr_icon = "mdi:car"
+    _attr_native_unit_of_measurement = "km"
+    _attr_native_min_value = 0
+    _attr_native_max_value = 1000
+
+    def __init__(self, hass, ip_address, device_info):
         """Initialize the number entity."""
         self._hass = hass
         self._ip_address = ip_address
         self._state = 0
-        self._attr_has_entity_name = True
-        self._attr_translation_key = "km_to_charge"
-
-    @property
-    def unique_id(self):
-        return "v2c_km_to_charge"
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
-
-    @property
-    def icon(self):
-        return "mdi:car"
-
-    @property
-    def native_unit_of_measurement(self):
-        return "km"
+        self._attr_unique_id = f"{ip_address}_v2c_km_to_charge"
+        self._attr_device_info = device_info
 
     @property
     def native_value(self):
         return self._state
 
-    @property
-    def native_max_value(self):
-        return 1000
-
-    @property
-    def native_min_value(self):
-        return 0
-
-    @property
-    def state_class(self):
-        return SensorStateClass.MEASUREMENT
-
     async def async_set_native_value(self, value):
         if 0 <= value <= 1000:
             self._state = value
@@ -278,40 +161,21 @@ class KmToChargeNumber(NumberEntity):
         else:
             _LOGGER.error("v2c_km_to_charge must be between 0 and 1000")
 
-class IntensityNumber(CoordinatorEntity, NumberEntity):
+class IntensityNumber(V2CtrydanEntity, NumberEntity):
     """Representation of intensity number entity."""
     
+    _watched_keys = ("Intensity", "MinIntensity", "MaxIntensity")
+    _attr_has_entity_name = True
+    _attr_translation_key = "intensity"
+    _attr_icon = "mdi:car"
+    _attr_native_unit_of_measurement = "A"
+
     def __init__(self, coordinator):
         """Initialize the number entity."""
         super().__init__(coordinator)
         self._coordinator = coordinator
         self._ip_address = coordinator.ip_address
-        self._attr_has_entity_name = True
-        self._attr_translation_key = "intensity"
-
-    @property
-    def unique_id(self):
-        return "v2c_intensity"
-
-        
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
-
-    @property
-    def icon(self):
-        return "mdi:car"
-
-    @property
-    def native_unit_of_measurement(self):
-        return "A"
+        self._attr_unique_id = f"{self._ip_address}_v2c_intensity"
 
     @property
     def native_value(self):
@@ -334,86 +198,50 @@ class IntensityNumber(CoordinatorEntity, NumberEntity):
             return self._coordinator.data.get('MinIntensity', 6)
         return 6
 
-    @property
-    def state_class(self):
-        return SensorStateClass.MEASUREMENT
-
     async def async_set_native_value(self, value):
         # Convert to integer for the device
         int_value = int(value)
         if self.native_min_value <= int_value <= self.native_max_value:
             await self._set_intensity(int_value)
-            # Request coordinator update after setting value
-            await self._coordinator.async_request_refresh()
         else:
             _LOGGER.error("v2c_intensity must be between {} and {}".format(self.native_min_value, self.native_max_value))
             
     async def _set_intensity(self, intensity):
         """Set intensity on the device."""
-        if not self._ip_address:
-            _LOGGER.error("IP address not available for IntensityNumber")
-            return
-            
-        session = async_get_clientsession(self.hass)
-        url = f"http://{self._ip_address}/write/Intensity={intensity}"
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                response.raise_for_status()
-                _LOGGER.debug(f"Intensity set successfully to {intensity}")
+            await self._coordinator.async_write("Intensity", intensity)
+        except asyncio.TimeoutError as err:
+            _LOGGER.error(f"Timeout setting intensity: {err}")
+            raise
         except aiohttp.ClientError as err:
-            _LOGGER.error(f"Error setting intensity: {err}")
+            _LOGGER.error(f"HTTP error setting intensity: {err}")
+            raise
+        except ValueError:
+            _LOGGER.error(f"Device returned ERROR when setting intensity to {intensity}")
             raise
 
 class MaxPrice(NumberEntity):
     """Representation of max price number entity."""
-    
-    def __init__(self, hass, ip_address):
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "max_price"
+    _attr_icon = "mdi:currency-eur"
+    _attr_native_min_value = 0.000
+    _attr_native_max_value = 1.000
+    _attr_native_step = 0.001
+
+    def __init__(self, hass, ip_address, device_info):
         """Initialize the number entity."""
         self._hass = hass
         self._ip_address = ip_address
         self._state = 0
-        self._attr_has_entity_name = True
-        self._attr_translation_key = "max_price"
-
-    @property
-    def unique_id(self):
-        return "v2c_MaxPrice"
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
-
-    @property
-    def icon(self):
-        return "mdi:currency-eur"
+        self._attr_unique_id = f"{ip_address}_v2c_MaxPrice"
+        self._attr_device_info = device_info
 
     @property
     def native_value(self):
         return self._state
 
-    @property
-    def native_step(self) -> float | None:
-        return 0.001
-
-    @property
-    def native_max_value(self):
-        return 1.000
-
-    @property
-    def native_min_value(self):
-        return 0.000
-
-    @property
-    def state_class(self):
-        return SensorStateClass.MEASUREMENT
-
     async def async_set_native_value(self, value):
         if 0 <= value <= 1.0:
             self._state = value
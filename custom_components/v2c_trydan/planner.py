@@ -0,0 +1,114 @@
+"""Cheapest-hours charging plan before a departure time."""
+from dataclasses import dataclass
+from datetime import timedelta, timezone
+import heapq
+import math
+
+
+@dataclass(frozen=True)
+class ChargePlan:
+    """Charging windows chosen by plan_charge.
+
+    windows: sorted, non overlapping (start, end) datetimes
+    energy_kwh: energy the windows deliver at the planned power
+    cost: estimated cost, in the price sensor's unit times kWh
+    unmet_kwh: energy that does not fit before the departure
+    """
+
+    windows: tuple
+    energy_kwh: float
+    cost: float
+    unmet_kwh: float
+
+    def charging_at(self, when) -> bool:
+        """Tell whether the plan charges at when."""
+        # In UTC: local times of one zone compare by wall clock
+        when = when.astimezone(timezone.utc)
+        return any(start <= when < end for start, end in self.windows)
+
+    def next_change(self, after):
+        """Return the first window start or end later than after, or None."""
+        after = after.astimezone(timezone.utc)
+        for start, end in self.windows:
+            if start > after:
+                return start
+            if end > after:
+                return end
+        return None
+
+
+def hourly_slots(curve, today, tomorrow):
+    """Yield (start, end, price) for every hour of today and tomorrow.
+
+    curve holds today's 24 prices by local hour followed by tomorrow's;
+    today and tomorrow are the local midnights the hours refer to. The
+    hours are stepped in UTC, so a day with a DST change has 23 or 25
+    slots: the skipped hour has none and the repeated one gets its price
+    twice.
+    """
+    hour = timedelta(hours=1)
+    for offset, midnight in ((0, today), (24, tomorrow)):
+        start = midnight.astimezone(timezone.utc)
+        # Adding a day to an aware datetime moves the wall clock
+        next_midnight = (midnight + timedelta(days=1)).astimezone(timezone.utc)
+        while start < next_midnight:
+            local = start.astimezone(midnight.tzinfo)
+            yield local, (start + hour).astimezone(midnight.tzinfo), curve[offset + local.hour]
+            start += hour
+
+
+def plan_charge(slots, energy_kwh, power_kw, now, departure) -> ChargePlan:
+    """Pick the cheapest slots between now and departure for energy_kwh.
+
+    slots are (start, end, price) with NaN for unknown prices; those are
+    left out, so a plan made before tomorrow's prices are published only
+    uses the known hours. The slots are clipped to [now, departure); the
+    last slot used is shortened to the energy still missing. The windows
+    are in the time zone of the slots.
+    """
+    if energy_kwh <= 0 or power_kw <= 0:
+        return ChargePlan((), 0.0, 0.0, max(energy_kwh, 0.0))
+
+    # Computed in UTC: local times of one zone compare and add by wall
+    # clock, which is off by an hour around a DST change
+    now = now.astimezone(timezone.utc)
+    departure = departure.astimezone(timezone.utc)
+    zone = None
+    candidates = []
+    for start, end, price in slots:
+        zone = start.tzinfo
+        start = max(start.astimezone(timezone.utc), now)
+        end = min(end.astimezone(timezone.utc), departure)
+        if end > start and not math.isnan(price):
+            candidates.append((price, start, end))
+
+    # At most two slots are clipped (by now and by the departure), so the
+    # cheapest ceil(hours) + 2 slots always cover the energy if anything does
+    hours_needed = energy_kwh / power_kw
+    cheapest = heapq.nsmallest(math.ceil(hours_needed) + 2, candidates)
+
+    chosen = []
+    cost = 0.0
+    for price, start, end in cheapest:
+        # Float residue below a second is not worth a window
+        if hours_needed * 3600 < 1:
+            break
+        hours = (end - start).total_seconds() / 3600
+        if hours > hours_needed:
+            hours = hours_needed
+            end = start + timedelta(hours=hours)
+        chosen.append((start, end))
+        cost += price * hours * power_kw
+        hours_needed -= hours
+
+    # Adjacent hours become one window, so the charger is not paused between them
+    windows = []
+    for start, end in sorted(chosen):
+        if windows and windows[-1][1] == start:
+            windows[-1] = (windows[-1][0], end)
+        else:
+            windows.append((start, end))
+    windows = [(start.astimezone(zone), end.astimezone(zone)) for start, end in windows]
+
+    unmet_kwh = max(hours_needed, 0.0) * power_kw
+    return ChargePlan(tuple(windows), energy_kwh - unmet_kwh, cost, unmet_kwh)
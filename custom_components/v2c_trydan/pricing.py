@@ -0,0 +1,63 @@
+"""Hourly price curve published by the configured electricity price sensor."""
+from array import array
+import math
+
+# Attributes of the PVPC sensor with the price of each hour of today and tomorrow
+PRICE_ATTRIBUTES = tuple(f"price_{hour:02d}h" for hour in range(24))
+NEXT_DAY_PRICE_ATTRIBUTES = tuple(f"price_next_day_{hour:02d}h" for hour in range(24))
+
+
+def _price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parse_price_curve(attributes) -> array:
+    """Return the 48 hourly prices of today and tomorrow, NaN where missing."""
+    return array(
+        "d",
+        [_price(attributes.get(name)) for name in PRICE_ATTRIBUTES + NEXT_DAY_PRICE_ATTRIBUTES],
+    )
+
+
+class PriceCurveCache:
+    """Price curve of the latest publication and the hours under a maximum price.
+
+    The curve is parsed only when the price sensor publishes new
+    attributes; Home Assistant keeps the same attributes object while they
+    do not change. The valid hours are recomputed only when the curve, the
+    maximum price or the current hour changes.
+    """
+
+    def __init__(self):
+        self._attributes = None
+        self.curve = None
+        self._valid_key = None
+        self._valid = None
+
+    def update(self, attributes) -> bool:
+        """Take the attributes of a price sensor state; True if the curve changed."""
+        if attributes is self._attributes:
+            return False
+        self._attributes = attributes
+        curve = parse_price_curve(attributes)
+        # Compared as bytes: NaN for missing hours never equals itself
+        if self.curve is not None and curve.tobytes() == self.curve.tobytes():
+            return False
+        self.curve = curve
+        self._valid_key = None
+        return True
+
+    def valid_hours(self, max_price, current_hour):
+        """Return (hours left today, hours tomorrow, total) priced at most max_price."""
+        key = (max_price, current_hour)
+        if key != self._valid_key:
+            # NaN never compares lower or equal, missing hours drop out
+            curve = self.curve
+            today = [hour for hour in range(current_hour + 1, 24) if curve[hour] <= max_price]
+            next_day = [hour for hour in range(24) if curve[24 + hour] <= max_price]
+            self._valid = (today, next_day, len(today) + len(next_day))
+            self._valid_key = key
+        return self._valid
@@ -0,0 +1,137 @@
+"""Protection of the contracted power against household load spikes."""
+from dataclasses import dataclass
+import math
+
+from .const import DEFAULT_GRID_MARGIN_W
+
+# ChargeState codes of /RealTimeData
+NOT_CONNECTED = 0
+
+DEFAULT_VOLTAGE = 230
+
+
+@dataclass(frozen=True)
+class GridSettings:
+    """Tuning of the grid protection.
+
+    margin_w: power kept free below ContractedPower
+    burst_headroom_w: poll in bursts once the headroom is below this
+    burst_hold: keep bursting this long after the headroom recovered (seconds)
+    resume_w: extra headroom needed before the intensity goes back up
+    """
+
+    margin_w: float = DEFAULT_GRID_MARGIN_W
+    burst_headroom_w: float = 1500
+    burst_hold: float = 30
+    resume_w: float = 460
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class GridProtection:
+    """Keep HousePower plus the charge under ContractedPower.
+
+    The car may take what ContractedPower minus the margin leaves over
+    HousePower. The protection acts on the Intensity setpoint, not on the
+    power drawn at the moment, so a car that starts or ramps up later is
+    covered too: a setpoint above the allowance is cut at once, to
+    MinIntensity and then by pausing the charge. Once the load drops by
+    resume_w more, the intensity goes back up towards the setpoint it had
+    before the first cut; a setpoint changed by anyone else in between
+    ends the restore.
+
+    update() returns the writes to send, in order, or None.
+    """
+
+    def __init__(self, settings=GridSettings()):
+        self.settings = settings
+        self._burst_until = -math.inf
+        self._restore_to = None
+        self._written = None
+        self._paused = False
+
+    def burst(self, now) -> bool:
+        """Tell whether the headroom was low within the last burst_hold seconds."""
+        return now < self._burst_until
+
+    def headroom(self, data) -> float:
+        """Return the power (W) left under the limit, inf without ContractedPower."""
+        contracted = _number(data.get("ContractedPower"))
+        if contracted <= 0:
+            return math.inf
+        return (
+            contracted - self.settings.margin_w
+            - _number(data.get("HousePower")) - _number(data.get("ChargePower"))
+        )
+
+    def update(self, data, now):
+        """Return {key: value} writes for a snapshot taken at now (monotonic), or None."""
+        settings = self.settings
+        contracted = _number(data.get("ContractedPower"))
+        current = data.get("Intensity")
+        if (
+            contracted <= 0
+            or data.get("ChargeState") in (None, NOT_CONNECTED)
+            or not isinstance(current, (int, float))
+        ):
+            self._restore_to = self._written = None
+            self._paused = False
+            return None
+
+        if self.headroom(data) < settings.burst_headroom_w:
+            self._burst_until = now + settings.burst_hold
+
+        current = int(current)
+        paused = bool(data.get("Paused"))
+        low = int(_number(data.get("MinIntensity"), 6))
+        voltage = _number(data.get("VoltageInstallation")) or DEFAULT_VOLTAGE
+        free_w = contracted - settings.margin_w - _number(data.get("HousePower"))
+        allowed = math.floor(free_w / voltage)
+        resume = math.floor((free_w - settings.resume_w) / voltage)
+
+        if not paused:
+            if self._paused:
+                # Resumed by someone else
+                self._paused = False
+            if allowed < low:
+                if self._restore_to is None:
+                    self._restore_to = current
+                self._paused = True
+                return {"Paused": 1}
+            if allowed < current:
+                if self._restore_to is None:
+                    self._restore_to = current
+                self._written = allowed
+                return {"Intensity": allowed}
+
+        if self._restore_to is None:
+            return None
+        if self._paused:
+            if resume < low:
+                return None
+            self._paused = False
+            target = min(resume, self._restore_to)
+            writes = {}
+            if target != current:
+                writes["Intensity"] = target
+            writes["Paused"] = 0
+        elif paused or current != self._written:
+            # The charge or its setpoint is under someone else's control now
+            self._restore_to = self._written = None
+            return None
+        elif resume > current:
+            target = min(resume, self._restore_to)
+            writes = {"Intensity": target}
+        else:
+            return None
+
+        if target >= self._restore_to:
+            self._restore_to = self._written = None
+        else:
+            self._written = target
+        return writes
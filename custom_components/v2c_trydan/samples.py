@@ -0,0 +1,137 @@
+"""Ring buffer of the /RealTimeData samples of one charger."""
+import math
+import mmap
+import os
+import struct
+
+# Numeric snapshot keys stored for every poll, besides the time
+SAMPLE_COLUMNS = (
+    "ChargePower",
+    "HousePower",
+    "FVPower",
+    "BatteryPower",
+    "Intensity",
+    "ChargeEnergy",
+    "VoltageInstallation",
+    "ChargeState",
+    "Paused",
+    "Locked",
+    "Dynamic",
+)
+
+# Column with the POSIX time of each sample
+TIME = "time"
+
+_MAGIC = b"V2CS"
+_VERSION = 1
+# magic, version, capacity, columns, head, count
+_HEADER = struct.Struct("<4sIIIQQ")
+_POSITION = struct.Struct("<QQ")
+_POSITION_OFFSET = 16
+
+
+class SampleRing:
+    """Fixed-size ring of samples stored as one column per key.
+
+    The time column is float64 and the others float32 (NaN where the
+    snapshot has no number), laid out one after the other behind a small
+    header with the write position. With a path the columns live in a
+    memory-mapped file, so the samples survive a restart without replay:
+    a file with another layout is reset. Without a path the ring lives in
+    anonymous memory. Opening a file is blocking, run it in an executor.
+
+    append() writes one slot per column in place; reads return lists in
+    chronological order.
+    """
+
+    def __init__(self, capacity, path=None):
+        self.capacity = capacity
+        self.path = path
+        size = _HEADER.size + capacity * (8 + 4 * len(SAMPLE_COLUMNS))
+        if path is None:
+            self._mmap = mmap.mmap(-1, size)
+        else:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if os.fstat(fd).st_size != size:
+                    os.ftruncate(fd, size)
+                self._mmap = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+
+        magic, version, stored_capacity, columns, head, count = _HEADER.unpack_from(self._mmap, 0)
+        if (magic, version, stored_capacity, columns) != (_MAGIC, _VERSION, capacity, len(SAMPLE_COLUMNS)):
+            head = count = 0
+            _HEADER.pack_into(self._mmap, 0, _MAGIC, _VERSION, capacity, len(SAMPLE_COLUMNS), 0, 0)
+        self._head = head % capacity
+        self._count = min(count, capacity)
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+        self._columns = {TIME: view[offset:offset + capacity * 8].cast("d")}
+        offset += capacity * 8
+        for key in SAMPLE_COLUMNS:
+            self._columns[key] = view[offset:offset + capacity * 4].cast("f")
+            offset += capacity * 4
+        self._value_columns = tuple((key, self._columns[key]) for key in SAMPLE_COLUMNS)
+        self._view = view
+
+    def __len__(self):
+        return self._count
+
+    def append(self, when, data):
+        """Store the numeric keys of a snapshot taken at when (POSIX time)."""
+        if self._mmap.closed:
+            # A poll that was in flight when the charger was unloaded
+            return
+        head = self._head
+        self._columns[TIME][head] = when
+        for key, column in self._value_columns:
+            value = data.get(key)
+            try:
+                column[head] = value
+            except TypeError:
+                column[head] = math.nan
+        self._head = (head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        _POSITION.pack_into(self._mmap, _POSITION_OFFSET, self._head, self._count)
+
+    def last(self, key, count):
+        """Return the last count values of key (or TIME), oldest first."""
+        count = min(count, self._count)
+        if count <= 0:
+            return []
+        column = self._columns[key]
+        start = self._head - count
+        if start >= 0:
+            return column[start:self._head].tolist()
+        return column[start:].tolist() + column[:self._head].tolist()
+
+    def latest(self, key):
+        """Return the newest value of key (or TIME), None when empty."""
+        if not self._count:
+            return None
+        return self._columns[key][self._head - 1]
+
+    def as_diagnostics(self) -> dict:
+        """Return the size and time span of the ring."""
+        times = self._columns[TIME]
+        return {
+            "capacity": self.capacity,
+            "samples": self._count,
+            "persistent": self.path is not None,
+            "oldest": times[self._head - self._count] if self._count else None,
+            "newest": self.latest(TIME),
+        }
+
+    def close(self):
+        """Flush the samples to the file and unmap it. Blocking."""
+        if self._mmap.closed:
+            return
+        for column in self._columns.values():
+            column.release()
+        self._view.release()
+        if self.path is not None:
+            self._mmap.flush()
+        self._mmap.close()
@@ -1,184 +1,142 @@
 import logging
-import asyncio
-from datetime import timedelta, datetime, timezone
-
-import aiohttp
-import re
-import async_timeout
-import voluptuous as vol
-
-from homeassistant.const import (
-    CONF_NAME,
-    STATE_UNKNOWN,
-    CONF_IP_ADDRESS,
-)
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.const import CONF_IP_ADDRESS, UnitOfTime
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.components.sensor import (
-    PLATFORM_SCHEMA,
     SensorEntity,
+    SensorEntityDescription,
     SensorDeviceClass,
     SensorStateClass,
 )
-from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity import EntityCategory
-from homeassistant.exceptions import PlatformNotReady
-from homeassistant.helpers import entity_registry
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.event import (
-    async_track_time_interval,
+    async_track_time_change,
+    async_track_point_in_time,
     async_track_state_change_event,
-    async_call_later,
-)
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-    UpdateFailed,
 )
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, CONF_KWH_PER_100KM, CONF_PRECIO_LUZ
-from .coordinator import V2CtrydanDataUpdateCoordinator
-from .number import KmToChargeNumber
-
-DEPENDENCIES = ["switch"]
+from .const import DOMAIN, CONF_KWH_PER_100KM, CONF_PRECIO_LUZ, CONF_DEPARTURE_TIME, CHARGE_EFFICIENCY
+from .entity import V2CtrydanEntity, DeviceEntityIds
+from .kmtarget import completion_time, km_to_energy
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
-    {
-        vol.Required(CONF_IP_ADDRESS): str,
-    }
-)
-
-DEVICE_CLASS_MAP = {
-    "ChargePower": SensorDeviceClass.POWER,
-    "ChargeEnergy": SensorDeviceClass.ENERGY,
-    "HousePower": SensorDeviceClass.POWER,
-    "FVPower": SensorDeviceClass.POWER,
-    "BatteryPower": SensorDeviceClass.POWER,
-    "Intensity": SensorDeviceClass.CURRENT,
-    "MinIntensity": SensorDeviceClass.CURRENT,
-    "MaxIntensity": SensorDeviceClass.CURRENT,
-    "ContractedPower": SensorDeviceClass.POWER,
-    "VoltageInstallation": SensorDeviceClass.VOLTAGE,
-    # Text sensors configuration
-    "ChargeState": SensorDeviceClass.ENUM,    # Fixed states
-    "ChargeTime": None,                       # Dynamic time format
-    "FirmwareVersion": None,                  # Dynamic version - diagnostic
-    "ReadyState": None,                       # Numeric state
-    "Timer": None,                            # Timer value
-    "Dynamic": None,                          # Boolean/numeric state
-    "DynamicPowerMode": None,                 # Mode indicator
-    "Locked": None,                           # Boolean state
-    "Paused": None,                           # Boolean state
-    "PauseDynamic": None,                     # Boolean state
-    "SlaveError": None,                       # Error indicator
-    "IP": None,                               # IP address - diagnostic
-    "SignalStatus": None,                     # WiFi signal status
-    "SSID": None,                             # WiFi network name - diagnostic
-    "ID": None,                               # Device ID - diagnostic
-}
-
-# Translation keys for sensor entities
-TRANSLATION_KEY_MAP = {
-    "ChargeEnergy": "chargeenergy",
-    "ChargePower": "chargepower", 
-    "ChargeState": "chargestate",
-    "ChargeTime": "chargetime",
-    "ContractedPower": "contractedpower",
-    "Dynamic": "dynamic",
-    "DynamicPowerMode": "dynamicpowermode",
-    "FVPower": "fvpower",
-    "HousePower": "housepower",
-    "BatteryPower": "batterypower",
-    "Intensity": "intensity",
-    "Locked": "locked",
-    "MaxIntensity": "maxintensity",
-    "MinIntensity": "minintensity",
-    "Paused": "paused",
-    "PauseDynamic": "pausedynamic",
-    "SlaveError": "slaveerror",
-    "Timer": "timer",
-    "FirmwareVersion": "firmware_version",
-    "ReadyState": "readystate",
-    "VoltageInstallation": "voltageinstallation",
-    "IP": "ip",
-    "SignalStatus": "signalstatus",
-    "SSID": "ssid",
-    "ID": "id",
-}
+CHARGE_STATE_OPTIONS = [
+    "Manguera no conectada",
+    "Manguera conectada (NO CARGA)",
+    "Manguera conectada (CARGANDO)",
+]
+
+def _charge_state(value):
+    if isinstance(value, int) and 0 <= value < len(CHARGE_STATE_OPTIONS):
+        return CHARGE_STATE_OPTIONS[value]
+    return value
+
+def _charge_time(value):
+    seconds = value or 0
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+def _watts(value):
+    try:
+        return round(float(value))
+    except (ValueError, TypeError):
+        return None
 
-STATE_CLASS_MAP = {
-    "ChargeEnergy": "total_increasing",
-    "ChargePower": "measurement",
-    "HousePower": "measurement", 
-    "FVPower": "measurement",
-    "BatteryPower": "measurement",
-    "Intensity": "measurement",
-    "MinIntensity": "measurement",
-    "MaxIntensity": "measurement",
-    "ReadyState": "measurement",
-    "ContractedPower": "measurement",
-    "Timer": "measurement",
-    "Dynamic": "measurement",
-    "DynamicPowerMode": "measurement",
-    "Locked": "measurement",
-    "Paused": "measurement",
-    "PauseDynamic": "measurement",
-    "SlaveError": "measurement",
-    "VoltageInstallation": "measurement",
-    "SignalStatus": "measurement"
-}
+def _float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
 
-NATIVE_UNIT_MAP = {
-    "ChargePower": "W",
-    "ChargeEnergy": "kWh",
-    "HousePower": "W",
-    "FVPower": "W",
-    "BatteryPower": "W",
-    "Intensity": "A",
-    "MinIntensity": "A",
-    "MaxIntensity": "A",
-    "ContractedPower": "W",
-    "VoltageInstallation": "V",
-    # Text sensors and state sensors must have None for units
-    "ChargeTime": None,
-    "FirmwareVersion": None,
-    "ReadyState": None,
-    "Timer": None,
-    "Dynamic": None,
-    "DynamicPowerMode": None,
-    "Locked": None,
-    "Paused": None,
-    "PauseDynamic": None,
-    "SlaveError": None,
-    "IP": None,
-    "SignalStatus": None,
-    "SSID": None,
-    "ID": None
+@dataclass(frozen=True, kw_only=True)
+class V2CtrydanSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor for one /RealTimeData key."""
+
+    # Turns the raw snapshot value into the sensor state
+    value_fn: Callable[[Any], Any] = lambda value: value
+
+def _measurement(key, translation_key, device_class=None, unit=None, **kwargs):
+    return V2CtrydanSensorEntityDescription(
+        key=key,
+        translation_key=translation_key,
+        device_class=device_class,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=unit,
+        **kwargs,
+    )
+
+# Built once at import; keys missing here get a plain description at setup
+SENSOR_DESCRIPTIONS = {
+    description.key: description
+    for description in (
+        V2CtrydanSensorEntityDescription(
+            key="ChargeEnergy",
+            translation_key="chargeenergy",
+            device_class=SensorDeviceClass.ENERGY,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            native_unit_of_measurement="kWh",
+        ),
+        _measurement("ChargePower", "chargepower", SensorDeviceClass.POWER, "W", value_fn=_watts),
+        V2CtrydanSensorEntityDescription(
+            key="ChargeState",
+            translation_key="chargestate",
+            device_class=SensorDeviceClass.ENUM,
+            options=CHARGE_STATE_OPTIONS,
+            value_fn=_charge_state,
+        ),
+        V2CtrydanSensorEntityDescription(key="ChargeTime", translation_key="chargetime", value_fn=_charge_time),
+        _measurement("ContractedPower", "contractedpower", SensorDeviceClass.POWER, "W"),
+        _measurement("Dynamic", "dynamic"),
+        _measurement("DynamicPowerMode", "dynamicpowermode"),
+        _measurement("FVPower", "fvpower", SensorDeviceClass.POWER, "W", value_fn=_watts),
+        _measurement("HousePower", "housepower", SensorDeviceClass.POWER, "W", value_fn=_watts),
+        _measurement("BatteryPower", "batterypower", SensorDeviceClass.POWER, "W", value_fn=_watts),
+        _measurement("Intensity", "intensity", SensorDeviceClass.CURRENT, "A"),
+        _measurement("Locked", "locked"),
+        _measurement("MaxIntensity", "maxintensity", SensorDeviceClass.CURRENT, "A"),
+        _measurement("MinIntensity", "minintensity", SensorDeviceClass.CURRENT, "A"),
+        _measurement("Paused", "paused"),
+        _measurement("PauseDynamic", "pausedynamic"),
+        _measurement("SlaveError", "slaveerror"),
+        _measurement("Timer", "timer"),
+        V2CtrydanSensorEntityDescription(
+            key="FirmwareVersion",
+            translation_key="firmware_version",
+            entity_category=EntityCategory.DIAGNOSTIC,
+        ),
+        _measurement("ReadyState", "readystate"),
+        _measurement("VoltageInstallation", "voltageinstallation", SensorDeviceClass.VOLTAGE, "V"),
+        V2CtrydanSensorEntityDescription(key="IP", translation_key="ip", entity_category=EntityCategory.DIAGNOSTIC),
+        _measurement("SignalStatus", "signalstatus", entity_category=EntityCategory.DIAGNOSTIC),
+        V2CtrydanSensorEntityDescription(key="SSID", translation_key="ssid", entity_category=EntityCategory.DIAGNOSTIC),
+        V2CtrydanSensorEntityDescription(key="ID", translation_key="id", entity_category=EntityCategory.DIAGNOSTIC),
+    )
 }
 
-# Options for ENUM sensors
-SENSOR_OPTIONS_MAP = {
-    "ChargeState": [
-        "Manguera no conectada",
-        "Manguera conectada (NO CARGA)",
-        "Manguera conectada (CARGANDO)"
-    ]
+# Request metrics exposed as diagnostic sensors: key -> (unit, value from DeviceMetrics)
+METRIC_SENSOR_MAP = {
+    "poll_latency_p50": (UnitOfTime.MILLISECONDS, lambda metrics: _ms(metrics.poll.percentile(0.5))),
+    "poll_latency_p99": (UnitOfTime.MILLISECONDS, lambda metrics: _ms(metrics.poll.percentile(0.99))),
+    "write_latency_p50": (UnitOfTime.MILLISECONDS, lambda metrics: _ms(metrics.write.percentile(0.5))),
+    "write_latency_p99": (UnitOfTime.MILLISECONDS, lambda metrics: _ms(metrics.write.percentile(0.99))),
+    "protection_reaction_p99": (UnitOfTime.MILLISECONDS, lambda metrics: _ms(metrics.protection.percentile(0.99))),
+    "decode_time_p99": (UnitOfTime.MICROSECONDS, lambda metrics: _us(metrics.decode.percentile(0.99))),
+    "poll_failures": (None, lambda metrics: metrics.poll_failures),
+    "timeouts": (None, lambda metrics: metrics.timeouts),
+    "firmware_repairs": (None, lambda metrics: metrics.firmware_repairs),
+    "writes_coalesced": (None, lambda metrics: metrics.writes_coalesced),
 }
 
-# Entity categories for diagnostic sensors
-ENTITY_CATEGORY_MAP = {
-    "FirmwareVersion": EntityCategory.DIAGNOSTIC,  # Diagnostic information
-    "ChargeTime": None,                            # Main operational data
-    "ChargeState": None,                           # Main operational data
-    "IP": EntityCategory.DIAGNOSTIC,               # Diagnostic information
-    "SSID": EntityCategory.DIAGNOSTIC,             # Diagnostic information
-    "ID": EntityCategory.DIAGNOSTIC,               # Diagnostic information
-    "SignalStatus": EntityCategory.DIAGNOSTIC      # Diagnostic information
-}
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
 
-UPDATE_INTERVAL = timedelta(minutes=1)
+def _us(seconds):
+    return None if seconds is None else round(seconds * 1000000)
 
 async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entities):
     """Set up V2C Trydan sensors from a config entry."""
@@ -186,27 +144,22 @@ async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entitie
     kwh_per_100km = config_entry.options.get(CONF_KWH_PER_100KM, 15)
     
     # Get coordinator from domain data (already created in __init__.py)
-    coordinator = hass.data[DOMAIN].get(config_entry.entry_id)
-    if not coordinator:
-        # Create coordinator as fallback
-        _LOGGER.info("Creating coordinator as fallback for sensor platform")
-        coordinator = V2CtrydanDataUpdateCoordinator(hass, ip_address)
-        try:
-            await coordinator.async_config_entry_first_refresh()
-            hass.data[DOMAIN][config_entry.entry_id] = coordinator
-        except Exception as e:
-            _LOGGER.error(f"Failed to setup coordinator: {e}")
-            return
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
     # Create sensors only if coordinator has data
     sensors = []
     if coordinator.data:
         sensors = [
-            V2CtrydanSensor(coordinator, ip_address, key, kwh_per_100km, config_entry.entry_id)
+            V2CtrydanSensor(
+                coordinator, SENSOR_DESCRIPTIONS.get(key) or V2CtrydanSensorEntityDescription(key=key)
+            )
             for key in coordinator.data.keys()
         ]
-        sensors.append(ChargeKmSensor(coordinator, ip_address, kwh_per_100km))
+        charge_km_eta = ChargeKmEtaSensor(coordinator, ip_address)
+        sensors.append(ChargeKmSensor(coordinator, ip_address, kwh_per_100km, charge_km_eta))
+        sensors.append(charge_km_eta)
         sensors.append(NumericalStatus(coordinator, ip_address))
+        sensors.extend(V2CtrydanMetricSensor(coordinator, key) for key in METRIC_SENSOR_MAP)
 
         # Add PVPC price sensor if configured
         precio_luz_entity_id = config_entry.options.get(CONF_PRECIO_LUZ)
@@ -218,265 +171,216 @@ async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entitie
     else:
         _LOGGER.warning("No coordinator data available, sensors will not be created")
 
-    async_add_entities(sensors, update_before_add=True)
+    async_add_entities(sensors)
 
-class V2CtrydanSensor(CoordinatorEntity, SensorEntity):
+class V2CtrydanSensor(V2CtrydanEntity, SensorEntity):
     """Representation of a V2C Trydan sensor."""
-    
-    def __init__(self, coordinator, ip_address, data_key, kwh_per_100km, config_entry_id):
-        """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._ip_address = ip_address
-        self._data_key = data_key
-        self._kwh_per_100km = kwh_per_100km
-        self._config_entry_id = config_entry_id
-        self.imax_old = 0
-        self.imin_old = 0
-        self.i_old = 0
-        self.carga_previo = 0
-        self._last_reset = None
-        self._attr_has_entity_name = True
-        # Set translation key if available
-        self._attr_translation_key = TRANSLATION_KEY_MAP.get(data_key)
 
-    @property
-    def last_reset(self):
-        if self.state_class == "total":
-            if self.state == 0:
-                self._last_reset = datetime.now(timezone.utc)
-            return self._last_reset
-        return None
-
-    @property
-    def unique_id(self):
-        return f"{self._ip_address}_{self._data_key}"
-
-        
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
-        
-    @property
-    def device_class(self):
-        """Return the device class of the sensor."""
-        return DEVICE_CLASS_MAP.get(self._data_key)
-        
-    @property
-    def state_class(self):
-        """Return the state class of the sensor."""
-        state_class_str = STATE_CLASS_MAP.get(self._data_key)
-        if state_class_str == "total_increasing":
-            return SensorStateClass.TOTAL_INCREASING
-        elif state_class_str == "measurement":
-            return SensorStateClass.MEASUREMENT
-        return None
-        
-    @property
-    def native_unit_of_measurement(self):
-        """Return the unit of measurement."""
-        return NATIVE_UNIT_MAP.get(self._data_key)
-        
-    @property
-    def options(self):
-        """Return the list of available options for ENUM sensors."""
-        return SENSOR_OPTIONS_MAP.get(self._data_key)
-        
-    @property
-    def entity_category(self):
-        """Return the entity category for diagnostic sensors."""
-        return ENTITY_CATEGORY_MAP.get(self._data_key)
-
-    async def update_min_intensity(self, value):
-        #_LOGGER.debug(f"Entity MinIntensity value")
-        if self.imin_old != value:
-            #_LOGGER.debug(f"Entity MinIntensity changed from {self.imin_old} to {value}")
-            if self.hass.states.get("number.v2c_min_intensity") is not None:
-                #_LOGGER.debug(f"Entity MinIntensity update 1000")
-                await self.hass.services.async_call(
-                    "number",
-                    "set_value",
-                    {"entity_id": "number.v2c_min_intensity", "value": float(value)},
-                )
-                self.imin_old = value
-
-    async def update_max_intensity(self, value):
-        if self.imax_old != value:
-            if self.hass.states.get("number.v2c_max_intensity") is not None:
-                await self.hass.services.async_call(
-                    "number",
-                    "set_value",
-                    {"entity_id": "number.v2c_max_intensity", "value": float(value)},
-                )
-                self.imax_old = value
-
-    async def update_intensity(self, value):
-        if self.i_old != value:
-            if self.hass.states.get("number.intensity") is not None:
-                await self.hass.services.async_call(
-                    "number",
-                    "set_value",
-                    {"entity_id": "number.intensity", "value": float(value)},
-                )
-                self.i_old = value
-
-    async def async_added_to_hass(self):
-        await super().async_added_to_hass()
-
-        if self.coordinator.data is None:
-            return
-            
-        if self._data_key == "MinIntensity" and self._data_key in self.coordinator.data:
-            self.hass.async_create_task(self.update_min_intensity(self.coordinator.data[self._data_key]))
-
-        if self._data_key == "MaxIntensity" and self._data_key in self.coordinator.data:
-            self.hass.async_create_task(self.update_max_intensity(self.coordinator.data[self._data_key]))
-
-        if self._data_key == "Intensity" and self._data_key in self.coordinator.data:
-            self.hass.async_create_task(self.update_intensity(self.coordinator.data[self._data_key]))
-
-        self.async_on_remove(self.coordinator.async_add_listener(self.update_numbers))
-
-    @callback
-    def update_numbers(self):
-        if self.coordinator.data is None:
-            return
-            
-        if self._data_key == "MinIntensity" and self._data_key in self.coordinator.data:
-            self.hass.async_create_task(self.update_min_intensity(self.coordinator.data[self._data_key]))
-
-        if self._data_key == "MaxIntensity" and self._data_key in self.coordinator.data:
-            self.hass.async_create_task(self.update_max_intensity(self.coordinator.data[self._data_key]))
-
-        if self._data_key == "Intensity" and self._data_key in self.coordinator.data:
-            self.hass.async_create_task(self.update_intensity(self.coordinator.data[self._data_key]))
+    entity_description: V2CtrydanSensorEntityDescription
+    _attr_has_entity_name = True
 
+    def __init__(self, coordinator, description):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._data_key = description.key
+        self._watched_keys = (description.key,)
+        self._value_fn = description.value_fn
+        self._attr_unique_id = f"{coordinator.ip_address}_{description.key}"
 
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        if self.coordinator.data is None:
+        data = self.coordinator.data
+        if data is None:
             return None
-            
-        if self._data_key == "ChargeState":
-            current = self.coordinator.data.get(self._data_key)
-            if current is None:
-                return None
-            if current == 0:
-                self.carga_previo = 0
-                return "Manguera no conectada"
-            elif current == 1:
-                #if self.carga_previo == 2:
-                #    self.hass.bus.async_fire("v2c_trydan.charging_complete")
-                self.carga_previo = 1
-                return "Manguera conectada (NO CARGA)"
-            elif current == 2:
-                self.carga_previo = 2
-                return "Manguera conectada (CARGANDO)"
-            else:
-                return current
-        elif self._data_key == "ChargeTime":
-            charge_time_seconds = self.coordinator.data.get("ChargeTime", 0)
-            hours = charge_time_seconds // 3600
-            minutes = (charge_time_seconds % 3600) // 60
-            seconds = charge_time_seconds % 60
-            return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        elif self._data_key == "MinIntensity":
-            return self.coordinator.data.get(self._data_key)
-        elif self._data_key == "MaxIntensity":
-            return self.coordinator.data.get(self._data_key)
-        elif self._data_key == "Intensity":
-            return self.coordinator.data.get(self._data_key)
-        else:
-            value = self.coordinator.data.get(self._data_key)
-            if value is None:
-                return None
-            if self._data_key in ["HousePower", "ChargePower", "FVPower", "BatteryPower"]:
-                try:
-                    return round(float(value))
-                except (ValueError, TypeError):
-                    return None
-            else:
-                return value
+        return self._value_fn(data.get(self._data_key))
 
     @property
     def available(self):
         """Return if entity is available."""
         return self.coordinator.last_update_success and self.coordinator.data is not None
-        
-    @property
-    def device_class(self):
-        return DEVICE_CLASS_MAP.get(self._data_key)
-
-    @property
-    def native_unit_of_measurement(self):
-        return NATIVE_UNIT_MAP.get(self._data_key)
-
-    @property
-    def last_reset(self):
-        if self.state_class == "total":
-            return datetime.fromisoformat('2011-11-04')
-        return None
 
 
-class ChargeKmSensor(CoordinatorEntity, SensorEntity):
+class ChargeKmSensor(V2CtrydanEntity, SensorEntity):
     """Representation of a V2C Trydan charge km sensor."""
     
-    def __init__(self, coordinator, ip_address, kwh_per_100km):
+    _watched_keys = ("ChargeEnergy",)
+    _attr_has_entity_name = True
+    _attr_name = "V2C trydan Sensor ChargeKm"
+    _attr_device_class = SensorDeviceClass.DISTANCE
+    _attr_native_unit_of_measurement = "km"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator, ip_address, kwh_per_100km, eta_sensor=None):
         """Initialize the sensor."""
         super().__init__(coordinator)
         self._ip_address = ip_address
         self._kwh_per_100km = kwh_per_100km
         self._charging_paused = False
-        self._attr_has_entity_name = True
+        self._attr_unique_id = f"{ip_address}_ChargeKm"
+        self._companions = None
+        self._unsub_states = None
+        self._checking = False
+        self._eta_sensor = eta_sensor
+        self._unsub_completion = None
 
     async def handle_paused_state_change(self, event):
-        entity_id = event.data.get("entity_id")
         old_state = event.data.get("old_state")
         new_state = event.data.get("new_state")
         
         if new_state is not None and old_state is not None:
             if new_state.state == "on" and old_state.state == "off":
                 #_LOGGER.debug("Charging paused")
-                await self.async_set_km_to_charge(0)
+                # Charging by price pauses between the cheap hours, and the grid
+                # protection and the load balancer pause for the supply: keep the target
+                if not self._charging_by_price() and self.coordinator.pause_owner is None:
+                    await self.async_set_km_to_charge(0)
                 self._charging_paused = True
             if new_state.state == "off" and old_state.state == "on":
                 #_LOGGER.debug("Charging unpaused")
                 self._charging_paused = False
+                await self.check_and_pause_charging()
+        self._async_schedule_completion()
 
     async def handle_km_to_charge_state_change(self, event):
-        entity_id = event.data.get("entity_id")
-        
-        if entity_id == "number.v2c_km_to_charge":
-            old_state = event.data.get("old_state")
-            new_state = event.data.get("new_state")
-            #_LOGGER.debug(f"Entity {entity_id} changed from {old_state} to {new_state}")
+        await self.check_and_pause_charging()
+        self._async_schedule_completion()
+
+    def _charging_by_price(self):
+        entity_id = self._companions.get("v2c_carga_pvpc_switch")
+        state = self.hass.states.get(entity_id) if entity_id is not None else None
+        return state is not None and state.state == "on"
 
     async def async_set_km_to_charge(self, value):
+        km_to_charge_entity_id = self._companions.get("km_to_charge")
+        if km_to_charge_entity_id is None:
+            return
         await self.hass.services.async_call(
             "number",
             "set_value",
-            {"entity_id": "number.v2c_km_to_charge", "value": value},
+            {"entity_id": km_to_charge_entity_id, "value": value},
         )
 
     async def async_added_to_hass(self):
+        """Follow this charger's Paused switch and km to charge number."""
         await super().async_added_to_hass()
-        async_track_time_interval(self.hass, self.check_and_pause_charging, timedelta(seconds=10))
-        async_track_state_change_event(self.hass, ["switch.v2c_trydan_switch_paused"], self.handle_paused_state_change)
-        self.hass.bus.async_listen("state_changed", self.handle_km_to_charge_state_change)
+        self._companions = DeviceEntityIds(
+            self.hass,
+            self._ip_address,
+            paused_switch=("switch", "Paused"),
+            locked_switch=("switch", "Locked"),
+            v2c_carga_pvpc_switch=("switch", "v2c_carga_pvpc"),
+            km_to_charge=("number", "v2c_km_to_charge"),
+        )
+        self.async_on_remove(self._companions.async_track(self._async_follow_entities))
+        self.async_on_remove(self._async_unfollow_entities)
+        self.async_on_remove(self._async_cancel_completion)
+        self._async_follow_entities()
+
+    @callback
+    def _async_follow_entities(self):
+        """Subscribe to the state changes of Paused and km to charge only."""
+        self._async_unfollow_entities()
+        unsubs = []
+        for name, action in (
+            ("paused_switch", self.handle_paused_state_change),
+            ("km_to_charge", self.handle_km_to_charge_state_change),
+        ):
+            entity_id = self._companions.get(name)
+            if entity_id is not None:
+                unsubs.append(async_track_state_change_event(self.hass, [entity_id], action))
+        self._unsub_states = unsubs
+
+    @callback
+    def _async_unfollow_entities(self):
+        if self._unsub_states is not None:
+            for unsub in self._unsub_states:
+                unsub()
+            self._unsub_states = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state and check the km target when ChargeEnergy changes."""
+        if self.coordinator.snapshot_changed(self._watched_keys):
+            self.async_write_ha_state()
+            if not self._checking:
+                self.hass.async_create_task(self.check_and_pause_charging())
+        self._async_schedule_completion()
+
+    def _target_energy(self):
+        """Return the ChargeEnergy (kWh) of the km target, None without an active target."""
+        if self._companions is None:
+            return None
+        paused_switch = self.hass.states.get(self._companions.get("paused_switch") or "")
+        if paused_switch is None or paused_switch.state == "on":
+            return None
+        km_to_charge = self.hass.states.get(self._companions.get("km_to_charge") or "")
+        km_to_charge_float = _float(km_to_charge.state) if km_to_charge is not None else None
+        if not km_to_charge_float or km_to_charge_float < 0:
+            return None
+        return km_to_energy(km_to_charge_float, self._kwh_per_100km)
+
+    @callback
+    def _async_schedule_completion(self):
+        """Predict when the km target is reached and stop right then.
+
+        The stop is scheduled only when the predicted moment comes before
+        the next poll; later predictions are refined by the polls to come.
+        """
+        self._async_cancel_completion()
+        target_kwh = self._target_energy()
+        eta = completion_time(self.coordinator.samples, target_kwh) if target_kwh is not None else None
+        if self._eta_sensor is not None:
+            self._eta_sensor.async_set_eta(eta)
+        if eta is None:
+            return
+        now = dt_util.utcnow()
+        if now < eta < now + timedelta(seconds=self.coordinator.poll_interval):
+            self._unsub_completion = async_track_point_in_time(self.hass, self._async_completion_due, eta)
 
-    async def check_and_pause_charging(self, now):
-        paused_switch = self.hass.states.get("switch.v2c_trydan_switch_paused")
+    @callback
+    def _async_cancel_completion(self):
+        if self._unsub_completion is not None:
+            self._unsub_completion()
+            self._unsub_completion = None
+
+    async def _async_completion_due(self, now):
+        self._unsub_completion = None
+        if self._checking or self._target_energy() is None:
+            return
+        try:
+            await self._async_complete()
+        except Exception as e:
+            _LOGGER.error(f"Error al parar la carga de kilometros prevista a las {now}: {e}")
+
+    async def _async_complete(self):
+        """Pause and lock the charger, clear the km target and fire the event."""
+        # A second completion while the pause is being written would fire the event twice
+        self._checking = True
+        try:
+            await self.hass.services.async_call(
+                "switch", "turn_on", {"entity_id": self._companions.get("paused_switch")}
+            )
+            locked_entity_id = self._companions.get("locked_switch")
+            if locked_entity_id is not None:
+                await self.hass.services.async_call("switch", "turn_on", {"entity_id": locked_entity_id})
+            await self.async_set_km_to_charge(0)
+            self.hass.bus.async_fire("v2c_trydan.charging_complete", {"ip_address": self._ip_address})
+        finally:
+            self._checking = False
+
+    async def check_and_pause_charging(self, now=None):
+        paused_entity_id = self._companions.get("paused_switch")
+        km_to_charge_entity_id = self._companions.get("km_to_charge")
+        if paused_entity_id is None or km_to_charge_entity_id is None or self._checking:
+            return
+
+        paused_switch = self.hass.states.get(paused_entity_id)
         if paused_switch is not None and paused_switch.state == "on":
             return
 
-        km_to_charge = self.hass.states.get("number.v2c_km_to_charge")
+        km_to_charge = self.hass.states.get(km_to_charge_entity_id)
         if km_to_charge is not None:
             try:
                 try:
@@ -485,77 +389,59 @@ class ChargeKmSensor(CoordinatorEntity, SensorEntity):
                     km_to_charge_float = -1.0
 
                 if self.state >= km_to_charge_float and km_to_charge_float != 0:
-                    await self.hass.services.async_call("switch", "turn_on", {"entity_id": "switch.v2c_trydan_switch_paused"})
-                    await self.hass.services.async_call("switch", "turn_on", {"entity_id": "switch.v2c_trydan_switch_locked"})
-                    await self.async_set_km_to_charge(0)
-                    self.hass.bus.async_fire("v2c_trydan.charging_complete")
+                    await self._async_complete()
             except Exception as e:
                 _LOGGER.error(f"Error en carga de kilometros el valor esperado es: {km_to_charge.state} y el error {e}")
 
-    @property
-    def unique_id(self):
-        return f"{self._ip_address}_ChargeKm"
-
-    @property
-    def name(self):
-        return "V2C trydan Sensor ChargeKm"
-        
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
 
     @property
     def native_value(self):
         charge_energy = self.coordinator.data.get("ChargeEnergy", 0)
-        charge_km = (charge_energy / (self._kwh_per_100km / 100)) * 0.92
+        charge_km = (charge_energy / (self._kwh_per_100km / 100)) * CHARGE_EFFICIENCY
         return round(charge_km, 2)
 
-    @property
-    def device_class(self):
-        return SensorDeviceClass.DISTANCE
+class ChargeKmEtaSensor(V2CtrydanEntity, SensorEntity):
+    """Predicted time the km to charge target is reached."""
 
-    @property
-    def native_unit_of_measurement(self):
-        return "km"
+    # State comes from ChargeKmSensor, not from the device snapshot
+    _watched_keys = ()
+    _attr_has_entity_name = True
+    _attr_translation_key = "charge_km_eta"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_icon = "mdi:timer-check-outline"
 
-    @property
-    def state_class(self):
-        return SensorStateClass.MEASUREMENT
+    def __init__(self, coordinator, ip_address):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{ip_address}_ChargeKmEta"
+        self._attr_native_value = None
 
-class NumericalStatus(CoordinatorEntity, SensorEntity):
+    @callback
+    def async_set_eta(self, eta):
+        """Publish eta; shifts under a minute are not written."""
+        current = self._attr_native_value
+        if eta is None and current is None:
+            return
+        if eta is not None and current is not None and abs(eta - current) < timedelta(minutes=1):
+            return
+        self._attr_native_value = eta.replace(microsecond=0) if eta is not None else None
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+
+class NumericalStatus(V2CtrydanEntity, SensorEntity):
     """Representation of a V2C Trydan numerical status sensor."""
     
+    _watched_keys = ("ChargeState",)
+    _attr_has_entity_name = True
+    _attr_name = "V2C trydan NumericalStatus"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
     def __init__(self, coordinator, ip_address):
         """Initialize the sensor."""
         super().__init__(coordinator)
         self._ip_address = ip_address
-        self._attr_has_entity_name = True
-
-    @property
-    def unique_id(self):
-        return "NumericalStatus"
-
-    @property
-    def name(self):
-        return "V2C trydan NumericalStatus"
-        
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
+        self._attr_unique_id = f"{ip_address}_NumericalStatus"
 
     @property
     def native_value(self):
@@ -570,15 +456,19 @@ class NumericalStatus(CoordinatorEntity, SensorEntity):
             return Charge_State  
         return -1
 
-    @property
-    def state_class(self):
-        return SensorStateClass.MEASUREMENT
-
-class PrecioLuzEntity(CoordinatorEntity, SensorEntity):
+class PrecioLuzEntity(V2CtrydanEntity, SensorEntity):
     """Representation of a V2C Trydan price sensor."""
     
+    # State comes from the price entity, not from the device snapshot
+    _watched_keys = ()
+    _attr_has_entity_name = True
+    _attr_name = "v2c Precio Luz"
+
     def __init__(self, coordinator, precio_luz_entity, ip_address, config_entry):
         """Initialize the sensor."""
+        # The price features load only with a price sensor configured
+        from .pricing import PriceCurveCache
+
         super().__init__(coordinator)
         self.v2c_precio_luz_entity = precio_luz_entity
         self.config_entry = config_entry
@@ -586,26 +476,13 @@ class PrecioLuzEntity(CoordinatorEntity, SensorEntity):
         self.valid_hours = "0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23"
         self.valid_hours_next_day = "0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23"
         self.total_hours = 24
-        self._attr_has_entity_name = True
-
-    @property
-    def unique_id(self):
-        return f"v2c_precio_luz_entity"
-
-    @property
-    def name(self):
-        return "v2c Precio Luz"
-        
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.ip_address)},
-            name=f"V2C Trydan ({self.ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self.ip_address}",
-        )
+        self._attr_unique_id = f"{ip_address}_v2c_precio_luz_entity"
+        self._prices = PriceCurveCache()
+        self._companions = None
+        self._unsub_states = None
+        self._plan = None
+        self._plan_inputs = None
+        self._unsub_plan_timer = None
 
     @property
     def native_value(self):
@@ -621,6 +498,13 @@ class PrecioLuzEntity(CoordinatorEntity, SensorEntity):
             attributes["ValidHours"] = self.valid_hours
             attributes["ValidHoursNextDay"] = self.valid_hours_next_day
             attributes["TotalHours"] = self.total_hours
+            if self._plan is not None:
+                attributes["ChargePlan"] = [
+                    {"start": start.isoformat(), "end": end.isoformat()} for start, end in self._plan.windows
+                ]
+                attributes["ChargePlanEnergy"] = round(self._plan.energy_kwh, 2)
+                attributes["ChargePlanCost"] = round(self._plan.cost, 2)
+                attributes["ChargePlanUnmetEnergy"] = round(self._plan.unmet_kwh, 2)
             return attributes
         else:
             return None
@@ -640,87 +524,205 @@ class PrecioLuzEntity(CoordinatorEntity, SensorEntity):
             return "€/kWh"
 
     async def async_added_to_hass(self):
-        """Register update callback when added to hass."""
-        paused_switch_id = f"{self.ip_address}_Paused"
-        v2c_carga_pvpc_switch_id = f"v2c_carga_pvpc"
-        max_price_entity_id = "v2c_MaxPrice"
-
-        async def find_entities():
-            entity_registry_instance = entity_registry.async_get(self.hass)
-            entities = {}
-            for entity_id, entity_entry in entity_registry_instance.entities.items():
-                if entity_entry.unique_id == paused_switch_id:
-                    entities["paused_switch"] = self.hass.states.get(entity_id)
-                if entity_entry.unique_id == v2c_carga_pvpc_switch_id:
-                    entities["v2c_carga_pvpc_switch"] = self.hass.states.get(entity_id)
-                if entity_entry.unique_id == max_price_entity_id:
-                    entities["max_price_entity"] = self.hass.states.get(entity_id)
-            return entities
-
-        async def extract_price_attrs(precio_luz_entity, max_price, current_hour):
-            valid_hours = []
-            valid_hours_next_day = []
-            total_hours = 0
-            attributes = precio_luz_entity.attributes
-
-            for i in range(24):
-                price_attr = f"price_{i:02d}h"
-                next_day_price_attr = f"price_next_day_{i:02d}h"
-
-                if price_attr in attributes and float(attributes[price_attr]) <= max_price:
-                    if i > current_hour:
-                        valid_hours.append(i)
-                        total_hours += 1
-
-                if next_day_price_attr in attributes and float(attributes[next_day_price_attr]) <= max_price:
-                    valid_hours_next_day.append(i)
-                    total_hours += 1
-
-            return valid_hours, valid_hours_next_day, total_hours
-    
-        async def pause_or_resume_charging(current_state, max_price, paused_switch, v2c_carga_pvpc_switch):
-            if v2c_carga_pvpc_switch.state == "on":
-                if float(current_state) <= max_price:
-                    await self.hass.services.async_call("switch", "turn_off", {"entity_id": paused_switch.entity_id})
-                else:
-                    await self.hass.services.async_call("switch", "turn_on", {"entity_id": paused_switch.entity_id})
-
-        async def update_state(event_time):
-            entities = await find_entities()
-            paused_switch = entities.get("paused_switch")
-            v2c_carga_pvpc_switch = entities.get("v2c_carga_pvpc_switch")
-            max_price_entity = entities.get("max_price_entity")
-            precio_luz_entity_id = self.config_entry.options.get(CONF_PRECIO_LUZ)
-            
-            if precio_luz_entity_id:
-                await self.hass.services.async_call('homeassistant', 'update_entity', {'entity_id': precio_luz_entity_id})
-                precio_luz_entity = self.hass.states.get(precio_luz_entity_id)
-            else:
-                precio_luz_entity = None
-
-            if all([precio_luz_entity, paused_switch, v2c_carga_pvpc_switch, max_price_entity]):
-                max_price = float(max_price_entity.state)
-                current_hour = datetime.now().hour
-
-                self.valid_hours, self.valid_hours_next_day, self.total_hours = await extract_price_attrs(
-                    precio_luz_entity, max_price, current_hour
-                )
+        """Follow the price entity, MaxPrice, km to charge and the PVPC switch."""
+        await super().async_added_to_hass()
+        self._companions = DeviceEntityIds(
+            self.hass,
+            self.ip_address,
+            paused_switch=("switch", "Paused"),
+            v2c_carga_pvpc_switch=("switch", "v2c_carga_pvpc"),
+            max_price_entity=("number", "v2c_MaxPrice"),
+            km_to_charge=("number", "v2c_km_to_charge"),
+        )
+        self.async_on_remove(self._companions.async_track(self._async_follow_entities))
+        self.async_on_remove(self._async_unfollow_entities)
+        self.async_on_remove(self._async_drop_plan)
+        self.async_on_remove(self.config_entry.add_update_listener(self._async_options_updated))
+        # Hours already past drop out of ValidHours
+        self.async_on_remove(
+            async_track_time_change(self.hass, self._async_hour_changed, minute=0, second=0)
+        )
+        self._async_follow_entities()
+        await self._async_update_prices()
+
+    @callback
+    def _async_follow_entities(self):
+        """Subscribe to the state changes of the entities the prices depend on."""
+        self._async_unfollow_entities()
+        entity_ids = [self.config_entry.options.get(CONF_PRECIO_LUZ)]
+        for name in ("v2c_carga_pvpc_switch", "max_price_entity", "km_to_charge"):
+            entity_ids.append(self._companions.get(name))
+        self._unsub_states = async_track_state_change_event(
+            self.hass, [entity_id for entity_id in entity_ids if entity_id], self._async_state_changed
+        )
+
+    @callback
+    def _async_unfollow_entities(self):
+        if self._unsub_states is not None:
+            self._unsub_states()
+            self._unsub_states = None
+
+    async def _async_state_changed(self, event):
+        await self._async_update_prices()
+
+    async def _async_hour_changed(self, now):
+        await self._async_update_prices()
+
+    async def _async_options_updated(self, hass, config_entry):
+        await self._async_update_prices()
+
+    async def _async_update_prices(self):
+        """Recompute the valid hours and the plan, then pause or resume charging."""
+        states = {}
+        for name in ("paused_switch", "v2c_carga_pvpc_switch", "max_price_entity", "km_to_charge"):
+            entity_id = self._companions.get(name)
+            states[name] = self.hass.states.get(entity_id) if entity_id is not None else None
+        precio_luz_entity_id = self.config_entry.options.get(CONF_PRECIO_LUZ)
+        precio_luz_entity = self.hass.states.get(precio_luz_entity_id) if precio_luz_entity_id else None
+
+        if precio_luz_entity is None or None in states.values():
+            _LOGGER.debug("Hay entidades aun no creadas")
+            return
+        try:
+            max_price = float(states["max_price_entity"].state)
+        except ValueError:
+            return
+
+        curve_changed = self._prices.update(precio_luz_entity.attributes)
+        self.valid_hours, self.valid_hours_next_day, self.total_hours = self._prices.valid_hours(
+            max_price, dt_util.now().hour
+        )
+        self.v2c_precio_luz_entity = precio_luz_entity
+        pvpc_on = states["v2c_carga_pvpc_switch"].state == "on"
+        if pvpc_on:
+            self._async_update_plan(curve_changed, states["km_to_charge"])
+        else:
+            self._async_drop_plan()
+        self.async_write_ha_state()
 
-                self.extra_state_attributes["ValidHours"] = self.valid_hours
-                self.extra_state_attributes["ValidHoursNextDay"] = self.valid_hours_next_day
-                self.extra_state_attributes["TotalHours"] = self.total_hours
+        if not pvpc_on:
+            return
+        if self._plan is not None:
+            # Charge in the planned windows only
+            pause = not self._plan.charging_at(dt_util.now())
+        else:
+            try:
+                pause = float(precio_luz_entity.state) > max_price
+            except ValueError:
+                return
+        paused_switch = states["paused_switch"]
+        # Only touch the switch when it has to change
+        if (paused_switch.state == "on") != pause:
+            await self.hass.services.async_call(
+                "switch", "turn_on" if pause else "turn_off", {"entity_id": paused_switch.entity_id}
+            )
+
+    def _planner_inputs(self, km_to_charge_state):
+        """Return (km to charge, kWh per 100 km, charge power in kW, departure), or None.
+
+        The planner runs when a departure time is configured and a number of
+        km to charge is set; otherwise charging follows MaxPrice. The power
+        is the one at MaxIntensity, so the changes of the live intensity
+        (dynamic mode, balancer) do not force a new plan.
+        """
+        departure_time = dt_util.parse_time(self.config_entry.options.get(CONF_DEPARTURE_TIME) or "")
+        try:
+            km_to_charge = float(km_to_charge_state.state)
+        except ValueError:
+            return None
+        data = self.coordinator.data or {}
+        power_kw = (data.get("MaxIntensity") or 32) * (data.get("VoltageInstallation") or 230) / 1000
+        if departure_time is None or km_to_charge <= 0 or power_kw <= 0:
+            return None
+        now = dt_util.now()
+        departure = now.replace(
+            hour=departure_time.hour, minute=departure_time.minute, second=0, microsecond=0
+        )
+        if departure <= now:
+            departure += timedelta(days=1)
+        kwh_per_100km = self.config_entry.options.get(CONF_KWH_PER_100KM, 15)
+        return km_to_charge, kwh_per_100km, power_kw, departure
 
-                await pause_or_resume_charging(
-                    self.state, max_price, paused_switch, v2c_carga_pvpc_switch
+    @callback
+    def _async_update_plan(self, curve_changed, km_to_charge_state):
+        """Plan again when the prices or the planner inputs changed."""
+        inputs = self._planner_inputs(km_to_charge_state)
+        if inputs is None:
+            self._async_drop_plan()
+            return
+        if curve_changed or inputs != self._plan_inputs:
+            from .planner import hourly_slots, plan_charge
+
+            km_to_charge, kwh_per_100km, power_kw, departure = inputs
+            charged = (self.coordinator.data or {}).get("ChargeEnergy", 0)
+            energy_kwh = km_to_energy(km_to_charge, kwh_per_100km) - charged
+            now = dt_util.now()
+            today = dt_util.start_of_local_day(now)
+            tomorrow = dt_util.start_of_local_day(now.date() + timedelta(days=1))
+            self._plan = plan_charge(
+                hourly_slots(self._prices.curve, today, tomorrow), energy_kwh, power_kw, now, departure
+            )
+            self._plan_inputs = inputs
+            if self._plan.unmet_kwh > 0:
+                _LOGGER.info(
+                    f"{self.ip_address}: {self._plan.unmet_kwh:.1f} kWh do not fit in the hours with "
+                    f"a known price before {departure:%H:%M}"
                 )
+        self._async_schedule_plan_timer()
+
+    @callback
+    def _async_schedule_plan_timer(self):
+        """Wake up exactly at the next start or end of a planned window."""
+        if self._unsub_plan_timer is not None:
+            self._unsub_plan_timer()
+            self._unsub_plan_timer = None
+        next_change = self._plan.next_change(dt_util.now())
+        if next_change is not None:
+            self._unsub_plan_timer = async_track_point_in_time(
+                self.hass, self._async_plan_timer, next_change
+            )
+
+    async def _async_plan_timer(self, now):
+        self._unsub_plan_timer = None
+        await self._async_update_prices()
+
+    @callback
+    def _async_drop_plan(self):
+        if self._unsub_plan_timer is not None:
+            self._unsub_plan_timer()
+            self._unsub_plan_timer = None
+        self._plan = None
+        self._plan_inputs = None
 
-                self.v2c_precio_luz_entity = precio_luz_entity
 
-                self.async_write_ha_state()
-            else:
-                _LOGGER.debug("Hay entidades aun no creadas")
+class V2CtrydanMetricSensor(SensorEntity):
+    """Diagnostic sensor for one request metric of the charger.
 
+    Metrics live in memory, so the entity is polled on the platform's scan
+    interval instead of following the coordinator; it keeps reporting while
+    the device is unreachable.
+    """
 
-        await update_state(None)
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
 
-        async_track_time_interval(self.hass, update_state, timedelta(seconds=30))
\ No newline at end of file
+    def __init__(self, coordinator, metric_key):
+        """Initialize the sensor."""
+        self._metrics = coordinator.metrics
+        self._ip_address = coordinator.ip_address
+        self._metric_key = metric_key
+        self._attr_device_info = coordinator.device_info
+        unit, self._value_fn = METRIC_SENSOR_MAP[metric_key]
+        self._attr_translation_key = metric_key
+        self._attr_unique_id = f"{self._ip_address}_metric_{metric_key}"
+        self._attr_native_unit_of_measurement = unit
+        if unit is None:
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        else:
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self):
+        return self._value_fn(self._metrics)
@@ -0,0 +1,209 @@
+"""Charging sessions of a charger imported as long-term statistics."""
+import bisect
+from collections import defaultdict
+from datetime import datetime, timezone
+import logging
+import math
+from time import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .kmtarget import energy_to_km
+from .samples import TIME
+from .sessions import NOT_CONNECTED, SessionDetector
+
+_LOGGER = logging.getLogger(__name__)
+
+# Sample ring columns the session detector reads
+SESSION_KEYS = ("ChargeState", "ChargePower", "ChargeEnergy", "FVPower", "HousePower")
+
+# Statistic suffix: (name, unit, has_sum)
+SESSION_STATISTICS = {
+    "session_energy": ("Session energy", "kWh", True),
+    "session_solar_energy": ("Session solar energy", "kWh", True),
+    "session_km": ("Session km", "km", True),
+    "session_charging_time": ("Session charging time", "h", True),
+    "sessions": ("Sessions", None, True),
+    "session_power": ("Session power", "W", False),
+}
+
+
+class SessionStatistics:
+    """Detect the charging sessions of one charger and import them in bulk.
+
+    Sessions are imported as external statistics (v2c_trydan:<ip>_session_*)
+    in one batch per statistic, once their hour is over: each hour with
+    sessions gets one row with the energy, solar energy, km, charging time
+    and number of sessions added in that hour, plus the mean and peak power.
+    On start the sample ring is replayed, so a session in progress and the
+    sessions of hours not imported yet survive a restart.
+    """
+
+    def __init__(self, hass, coordinator, kwh_per_100km):
+        self.hass = hass
+        self.coordinator = coordinator
+        self._kwh_per_100km = kwh_per_100km
+        self.detector = SessionDetector()
+        self._object_id = slugify(coordinator.ip_address)
+        self._recorder = "recorder" in hass.config.components
+        self._pending = []
+        self._sums = {}
+        self._imported_until = 0.0
+        self._last_sample = None
+        self._unsubs = []
+
+    def statistic_id(self, suffix) -> str:
+        return f"{DOMAIN}:{self._object_id}_{suffix}"
+
+    async def async_start(self):
+        """Resume from the last imported hour and the sample ring."""
+        if self._recorder:
+            await self._async_load_last_rows()
+        times, columns = self._recent_polls()
+        self._pending = await self.hass.async_add_executor_job(self._replay, times, columns)
+        self._last_sample = times[-1] if times else None
+        self._unsubs = [
+            self.coordinator.async_add_listener(self._async_poll),
+            async_track_time_change(self.hass, self._async_hour_changed, minute=0, second=10),
+        ]
+
+    @callback
+    def async_stop(self):
+        """Stop following the charger and import the hours that are over."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+        self._async_import()
+
+    async def _async_load_last_rows(self):
+        from homeassistant.components.recorder import get_instance
+        from homeassistant.components.recorder.statistics import get_last_statistics
+
+        for suffix, (_name, _unit, has_sum) in SESSION_STATISTICS.items():
+            statistic_id = self.statistic_id(suffix)
+            rows = await get_instance(self.hass).async_add_executor_job(
+                get_last_statistics, self.hass, 1, statistic_id, False, {"sum"} if has_sum else {"max"}
+            )
+            for row in rows.get(statistic_id, ()):
+                if has_sum:
+                    self._sums[statistic_id] = row["sum"] or 0.0
+                self._imported_until = max(self._imported_until, row["start"] + 3600)
+
+    def _recent_polls(self):
+        """Return the polls of the sample ring that sessions not imported yet may span.
+
+        They start at the last poll without the car connected before the
+        last imported hour; without the recorder only the session in
+        progress matters.
+        """
+        samples = self.coordinator.samples
+        count = len(samples)
+        times = samples.last(TIME, count)
+        states = samples.last("ChargeState", count)
+        cutoff = self._imported_until if self._recorder else math.inf
+        first = bisect.bisect_left(times, cutoff) - 1
+        while first > 0 and states[first] != NOT_CONNECTED:
+            first -= 1
+        first = max(first, 0)
+        return times[first:], {key: samples.last(key, count - first) for key in SESSION_KEYS}
+
+    def _replay(self, times, columns) -> list:
+        """Feed the detector past polls; returns the sessions to import. Runs in an executor."""
+        sessions = []
+        for index, when in enumerate(times):
+            session = self.detector.add(when, {key: values[index] for key, values in columns.items()})
+            if session is not None and self._recorder and session.end >= self._imported_until:
+                sessions.append(session)
+        return sessions
+
+    @callback
+    def _async_poll(self):
+        when = self.coordinator.samples.latest(TIME)
+        # Listeners also run after failed polls and local writes
+        if when is None or when == self._last_sample:
+            return
+        self._last_sample = when
+        session = self.detector.add(when, self.coordinator.data)
+        if session is None:
+            return
+        if self._recorder:
+            self._pending.append(session)
+        self.hass.bus.async_fire(
+            "v2c_trydan.session_complete",
+            {
+                "ip_address": self.coordinator.ip_address,
+                "start": datetime.fromtimestamp(session.start, timezone.utc).isoformat(),
+                "end": datetime.fromtimestamp(session.end, timezone.utc).isoformat(),
+                "energy_kwh": round(session.energy_kwh, 3),
+                "km": round(energy_to_km(session.energy_kwh, self._kwh_per_100km), 2),
+                "charging_time": round(session.charging_s),
+                "peak_power_w": round(session.peak_power_w),
+                "mean_power_w": round(session.mean_power_w),
+                "solar_share": round(session.solar_share, 3),
+            },
+        )
+
+    async def _async_hour_changed(self, now):
+        self._async_import()
+
+    @callback
+    def _async_import(self):
+        """Import the pending sessions of the hours that are over, one batch per statistic."""
+        if not self._pending:
+            return
+        from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+        current_hour = time() // 3600 * 3600
+        by_hour = defaultdict(list)
+        pending = []
+        for session in self._pending:
+            if session.end < current_hour:
+                by_hour[session.end // 3600 * 3600].append(session)
+            else:
+                pending.append(session)
+        self._pending = pending
+        if not by_hour:
+            return
+
+        rows = {suffix: [] for suffix in SESSION_STATISTICS}
+        for hour in sorted(by_hour):
+            sessions = by_hour[hour]
+            start = datetime.fromtimestamp(hour, timezone.utc)
+            energy_kwh = sum(session.energy_kwh for session in sessions)
+            for suffix, added in (
+                ("session_energy", energy_kwh),
+                ("session_solar_energy", sum(session.solar_energy_kwh for session in sessions)),
+                ("session_km", energy_to_km(energy_kwh, self._kwh_per_100km)),
+                ("session_charging_time", sum(session.charging_s for session in sessions) / 3600),
+                ("sessions", len(sessions)),
+            ):
+                statistic_id = self.statistic_id(suffix)
+                total = self._sums.get(statistic_id, 0.0) + added
+                self._sums[statistic_id] = total
+                rows[suffix].append({"start": start, "state": added, "sum": total})
+            mean_power_w = [session.mean_power_w for session in sessions]
+            rows["session_power"].append({
+                "start": start,
+                "mean": sum(mean_power_w) / len(mean_power_w),
+                "min": min(mean_power_w),
+                "max": max(session.peak_power_w for session in sessions),
+            })
+            self._imported_until = hour + 3600
+
+        for suffix, (name, unit, has_sum) in SESSION_STATISTICS.items():
+            async_add_external_statistics(
+                self.hass,
+                {
+                    "has_mean": not has_sum,
+                    "has_sum": has_sum,
+                    "name": f"{self.coordinator.device_info['name']} {name}",
+                    "source": DOMAIN,
+                    "statistic_id": self.statistic_id(suffix),
+                    "unit_of_measurement": unit,
+                },
+                rows[suffix],
+            )
+        _LOGGER.debug(f"Imported {sum(map(len, by_hour.values()))} sessions of {self.coordinator.ip_address}")
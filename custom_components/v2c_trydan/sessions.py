@@ -0,0 +1,119 @@
+"""Charging sessions detected from the ChargeState of each poll."""
+from dataclasses import dataclass
+
+from .const import CHARGING_POWER_THRESHOLD_W
+
+# ChargeState codes of /RealTimeData
+NOT_CONNECTED = 0
+CHARGING = 2
+
+# Readings of a poll stand for at most this long; a longer gap (a restart,
+# an offline charger) adds no energy (seconds)
+MAX_SAMPLE_GAP = 60
+
+
+@dataclass(frozen=True)
+class ChargingSession:
+    """Aggregates of one charging session; times are POSIX timestamps."""
+
+    start: float
+    end: float
+    energy_kwh: float
+    charging_s: float
+    peak_power_w: float
+    mean_power_w: float
+    solar_share: float
+
+    @property
+    def solar_energy_kwh(self) -> float:
+        return self.energy_kwh * self.solar_share
+
+
+def _number(value):
+    """Return value as a float, None for a missing reading (None or NaN)."""
+    if value is None or value != value:
+        return None
+    return float(value)
+
+
+class SessionDetector:
+    """Build charging sessions from the polls of one charger.
+
+    A session starts with the first poll that is charging and ends with the
+    first poll without the car connected, so the pauses in between belong
+    to the same session. Each poll updates the running aggregates in
+    constant time: its power readings are held until the next poll.
+
+    The energy is the device's ChargeEnergy for the session, or the
+    integrated ChargePower when the device reports none. The solar share is
+    the part of the charge power covered by the surplus (FVPower minus
+    HousePower).
+    """
+
+    def __init__(self):
+        self._start = None
+        self._last_when = None
+        self._last_charging = False
+        self._last_power_w = 0.0
+        self._last_solar_w = 0.0
+        self._reset()
+
+    def _reset(self):
+        self._charging_s = 0.0
+        self._energy_ws = 0.0
+        self._solar_ws = 0.0
+        self._peak_power_w = 0.0
+        self._device_energy_kwh = 0.0
+
+    @property
+    def active(self) -> bool:
+        """Tell whether a session is in progress."""
+        return self._start is not None
+
+    def add(self, when, data):
+        """Take one poll; returns the ChargingSession it ends, or None."""
+        state = _number(data.get("ChargeState"))
+        if state is None:
+            return None
+
+        if self._start is not None and self._last_when is not None and self._last_charging:
+            elapsed = min(max(when - self._last_when, 0.0), MAX_SAMPLE_GAP)
+            self._charging_s += elapsed
+            self._energy_ws += self._last_power_w * elapsed
+            self._solar_ws += self._last_solar_w * elapsed
+
+        power_w = _number(data.get("ChargePower")) or 0.0
+        charging = state == CHARGING or power_w > CHARGING_POWER_THRESHOLD_W
+        self._last_when = when
+        self._last_charging = charging
+        self._last_power_w = power_w
+        surplus_w = (_number(data.get("FVPower")) or 0.0) - (_number(data.get("HousePower")) or 0.0)
+        self._last_solar_w = min(power_w, max(surplus_w, 0.0))
+
+        if self._start is None:
+            if not charging:
+                return None
+            self._start = when
+
+        if charging:
+            self._peak_power_w = max(self._peak_power_w, power_w)
+            energy_kwh = _number(data.get("ChargeEnergy"))
+            if energy_kwh is not None:
+                self._device_energy_kwh = max(self._device_energy_kwh, energy_kwh)
+
+        if state != NOT_CONNECTED:
+            return None
+
+        integrated_kwh = self._energy_ws / 3600000
+        session = ChargingSession(
+            start=self._start,
+            end=when,
+            energy_kwh=self._device_energy_kwh or integrated_kwh,
+            charging_s=self._charging_s,
+            peak_power_w=self._peak_power_w,
+            mean_power_w=self._energy_ws / self._charging_s if self._charging_s else 0.0,
+            solar_share=min(self._solar_ws / self._energy_ws, 1.0) if self._energy_ws else 0.0,
+        )
+        self._start = None
+        self._reset()
+        return session
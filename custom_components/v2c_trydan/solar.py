@@ -0,0 +1,95 @@
+"""Charge intensity that follows the solar surplus."""
+from dataclasses import dataclass
+import math
+
+from .const import DEFAULT_SOLAR_BATTERY_PRIORITY, DEFAULT_SOLAR_HYSTERESIS_W, DEFAULT_SOLAR_MAX_STEP
+
+# ChargeState codes of /RealTimeData
+NOT_CONNECTED = 0
+
+DEFAULT_VOLTAGE = 230
+
+
+@dataclass(frozen=True)
+class SolarSettings:
+    """Tuning of the solar controller.
+
+    hysteresis_w: extra surplus needed before the intensity goes up
+    max_step_a: largest increase of one write (A)
+    min_interval: shortest time between two increases (seconds)
+    battery_priority: leave the power the home battery is charging with
+      to the battery instead of handing it to the car
+    """
+
+    hysteresis_w: float = DEFAULT_SOLAR_HYSTERESIS_W
+    max_step_a: int = DEFAULT_SOLAR_MAX_STEP
+    min_interval: float = 10
+    battery_priority: bool = DEFAULT_SOLAR_BATTERY_PRIORITY
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def available_power(data, battery_priority=True) -> float:
+    """Return the solar power (W) the car may take from one snapshot.
+
+    The surplus is FVPower minus HousePower; with battery priority, the
+    power a charging home battery takes (positive BatteryPower) is left to
+    it.
+    """
+    surplus_w = _number(data.get("FVPower")) - _number(data.get("HousePower"))
+    if battery_priority:
+        surplus_w -= max(_number(data.get("BatteryPower")), 0.0)
+    return surplus_w
+
+
+class SolarController:
+    """Pick the Intensity (A) that follows the surplus of each snapshot.
+
+    The intensity drops at once to what the surplus covers, so the car does
+    not draw from the grid, and rises only once the surplus covers the next
+    amp plus the hysteresis, so a surplus hovering around a step does not
+    toggle it. Increases are limited to max_step_a per write and one write
+    per min_interval; the intensity stays between MinIntensity and
+    MaxIntensity. update() returns a target only when the rounded amps
+    differ from the current intensity, so every target is worth a write.
+    """
+
+    def __init__(self, settings=SolarSettings()):
+        self.settings = settings
+        self._last_increase = -math.inf
+
+    def update(self, data, now):
+        """Return the new Intensity for a snapshot taken at now (monotonic), or None."""
+        if data.get("ChargeState") in (None, NOT_CONNECTED) or data.get("Paused") or data.get("Dynamic"):
+            # The device's own dynamic control already follows the surplus
+            return None
+        current = data.get("Intensity")
+        if not isinstance(current, (int, float)):
+            return None
+        current = int(current)
+        settings = self.settings
+        low = int(_number(data.get("MinIntensity"), 6))
+        high = int(_number(data.get("MaxIntensity"), 32))
+        voltage = _number(data.get("VoltageInstallation")) or DEFAULT_VOLTAGE
+        available_w = available_power(data, settings.battery_priority)
+
+        down = math.floor(available_w / voltage)
+        up = math.floor((available_w - settings.hysteresis_w) / voltage)
+        if down < current:
+            target = down
+        elif up > current and now - self._last_increase >= settings.min_interval:
+            target = min(up, current + settings.max_step_a)
+        else:
+            target = current
+        target = min(max(target, low), high)
+
+        if target == current:
+            return None
+        if target > current:
+            self._last_increase = now
+        return target
@@ -1,16 +1,22 @@
+import asyncio
 import logging
 import aiohttp
-import voluptuous as vol
 
-from homeassistant.components.switch import PLATFORM_SCHEMA, SwitchEntity
-from homeassistant.const import CONF_IP_ADDRESS
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.device_registry import DeviceInfo
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.components.switch import SwitchEntity
+from homeassistant.const import CONF_IP_ADDRESS, STATE_ON
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.restore_state import RestoreEntity
+from time import monotonic
 
-from .coordinator import V2CtrydanDataUpdateCoordinator
-from .const import DOMAIN, CONF_PRECIO_LUZ
+from .entity import V2CtrydanEntity
+from .const import (
+    DOMAIN,
+    CONF_PRECIO_LUZ,
+    CONF_SOLAR_HYSTERESIS_W,
+    CONF_SOLAR_MAX_STEP,
+    CONF_SOLAR_BATTERY_PRIORITY,
+    CONF_GRID_MARGIN_W,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,32 +27,18 @@ SWITCH_TRANSLATION_KEY_MAP = {
     "Locked": "locked",
 }
 
-PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
-    {
-        vol.Required(CONF_IP_ADDRESS): str,
-    }
-)
-
 async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entities):
     ip_address = config_entry.data[CONF_IP_ADDRESS]
     
     # Get coordinator from domain data (already created in __init__.py)
-    coordinator = hass.data[DOMAIN].get(config_entry.entry_id)
-    if not coordinator:
-        # Create coordinator as fallback
-        _LOGGER.info("Creating coordinator as fallback for switch platform")
-        coordinator = V2CtrydanDataUpdateCoordinator(hass, ip_address)
-        try:
-            await coordinator.async_config_entry_first_refresh()
-            hass.data[DOMAIN][config_entry.entry_id] = coordinator
-        except Exception as e:
-            _LOGGER.error(f"Failed to setup coordinator: {e}")
-            return
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
     switches = [
         V2CtrydanSwitch(coordinator, ip_address, key)
         for key in ["Paused", "Dynamic", "Locked"]
     ]
+    switches.append(V2CSolarSwitch(coordinator, ip_address, config_entry))
+    switches.append(V2CGridProtectionSwitch(coordinator, ip_address, config_entry))
     _LOGGER.info(f"Created {len(switches)} basic switches: {[s.__class__.__name__ for s in switches]}")
 
     # Only add PVPC switch if precio_luz entity is configured
@@ -54,18 +46,19 @@ async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entitie
         precio_luz_entity_id = config_entry.options[CONF_PRECIO_LUZ]
         _LOGGER.info(f"PVPC entity configured: {precio_luz_entity_id}")
         
-        # Check if entity exists and log all available PVPC entities for debugging
-        all_pvpc_entities = [state.entity_id for state in hass.states.async_all() if 'pvpc' in state.entity_id.lower()]
-        _LOGGER.info(f"Available PVPC entities: {all_pvpc_entities}")
+        # Listing the PVPC entities walks every state, only worth it when debugging
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            all_pvpc_entities = [state.entity_id for state in hass.states.async_all() if 'pvpc' in state.entity_id.lower()]
+            _LOGGER.debug(f"Available PVPC entities: {all_pvpc_entities}")
         
         precio_luz_entity = hass.states.get(precio_luz_entity_id)
         if precio_luz_entity is not None:
-            switches.append(V2CCargaPVPCSwitch(precio_luz_entity, ip_address))
+            switches.append(V2CCargaPVPCSwitch(precio_luz_entity, ip_address, coordinator.device_info))
             _LOGGER.info(f"Added PVPC switch, total switches: {len(switches)}")
         else:
             # Create switch anyway - it will work once the entity becomes available
             _LOGGER.warning(f"PVPC entity '{precio_luz_entity_id}' not found yet, but creating switch anyway")
-            switches.append(V2CCargaPVPCSwitch(None, ip_address))
+            switches.append(V2CCargaPVPCSwitch(None, ip_address, coordinator.device_info))
             _LOGGER.info(f"Added PVPC switch (will activate when entity available), total switches: {len(switches)}")
     else:
         _LOGGER.info("PVPC entity not configured in options")
@@ -73,34 +66,21 @@ async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entitie
     _LOGGER.info(f"Setting up {len(switches)} switches total")
     async_add_entities(switches)
 
-class V2CtrydanSwitch(CoordinatorEntity, SwitchEntity):
+class V2CtrydanSwitch(V2CtrydanEntity, SwitchEntity):
     """Representation of a V2C Trydan switch."""
-    
+
+    _attr_has_entity_name = True
+
     def __init__(self, coordinator, ip_address, data_key):
         """Initialize the switch."""
         super().__init__(coordinator)
         self._ip_address = ip_address
         self._data_key = data_key
-        self._attr_has_entity_name = True
+        self._watched_keys = (data_key,)
+        self._attr_unique_id = f"{ip_address}_{data_key}"
         # Set translation key if available
         self._attr_translation_key = SWITCH_TRANSLATION_KEY_MAP.get(data_key)
 
-    @property
-    def unique_id(self):
-        return f"{self._ip_address}_{self._data_key}"
-
-        
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
-
     @property
     def is_on(self):
         """Return true if switch is on."""
@@ -110,57 +90,34 @@ class V2CtrydanSwitch(CoordinatorEntity, SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         """Turn the switch on."""
-        session = async_get_clientsession(self.hass)
-        url = f"http://{self._ip_address}/write/{self._data_key}=1"
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                response.raise_for_status()
-                await self.coordinator.async_request_refresh()
-        except aiohttp.ClientError as e:
+            await self.coordinator.async_write(self._data_key, 1)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
             _LOGGER.error(f"Error turning on switch {self._data_key}: {e}")
             raise
 
     async def async_turn_off(self, **kwargs):
         """Turn the switch off."""
-        session = async_get_clientsession(self.hass)
-        url = f"http://{self._ip_address}/write/{self._data_key}=0"
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                response.raise_for_status()
-                await self.coordinator.async_request_refresh()
-        except aiohttp.ClientError as e:
+            await self.coordinator.async_write(self._data_key, 0)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
             _LOGGER.error(f"Error turning off switch {self._data_key}: {e}")
             raise
 
 class V2CCargaPVPCSwitch(SwitchEntity):
-    def __init__(self, precio_luz_entity, ip_address):
+    _attr_has_entity_name = True
+    _attr_translation_key = "carga_pvpc"
+    _attr_name = "V2C trydan Switch v2c_carga_pvpc"
+
+    def __init__(self, precio_luz_entity, ip_address, device_info):
         self._is_on = False
         self.precio_luz_entity = precio_luz_entity
         self._ip_address = ip_address
         self._precio_luz_entity_id = precio_luz_entity.entity_id if precio_luz_entity else "sensor.pvpc"
-        self._attr_has_entity_name = True
-        self._attr_translation_key = "carga_pvpc"
+        self._attr_unique_id = f"{ip_address}_v2c_carga_pvpc"
+        self._attr_device_info = device_info
         _LOGGER.info(f"Initialized V2CCargaPVPCSwitch with entity: {self._precio_luz_entity_id}")
 
-    @property
-    def unique_id(self):
-        return f"v2c_carga_pvpc"
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information for this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._ip_address)},
-            name=f"V2C Trydan ({self._ip_address})",
-            manufacturer="V2C",
-            model="Trydan",
-            configuration_url=f"http://{self._ip_address}",
-        )
-
-    @property
-    def name(self):
-        return "V2C trydan Switch v2c_carga_pvpc"
-
     @property
     def is_on(self):
         return self._is_on
@@ -202,3 +159,147 @@ class V2CCargaPVPCSwitch(SwitchEntity):
                 _LOGGER.info(f"PVPC entity {self._precio_luz_entity_id} found after being added to hass")
                 # Update the entity state to reflect availability
                 self.async_write_ha_state()
+
+
+def _solar_settings(options):
+    from .solar import SolarSettings
+
+    return SolarSettings(
+        hysteresis_w=options.get(CONF_SOLAR_HYSTERESIS_W, SolarSettings.hysteresis_w),
+        max_step_a=options.get(CONF_SOLAR_MAX_STEP, SolarSettings.max_step_a),
+        battery_priority=options.get(CONF_SOLAR_BATTERY_PRIORITY, SolarSettings.battery_priority),
+    )
+
+
+class V2CSolarSwitch(V2CtrydanEntity, SwitchEntity, RestoreEntity):
+    """Follow the solar surplus with the charge intensity."""
+
+    # State is local, the controller runs on every snapshot
+    _watched_keys = ()
+    _attr_has_entity_name = True
+    _attr_translation_key = "solar_surplus"
+    _attr_icon = "mdi:solar-power"
+
+    def __init__(self, coordinator, ip_address, config_entry):
+        """Initialize the switch."""
+        super().__init__(coordinator)
+        self.config_entry = config_entry
+        self._attr_unique_id = f"{ip_address}_v2c_solar_surplus"
+        self._attr_is_on = False
+        # Built on the first turn on, most chargers have no solar installation
+        self._controller = None
+        self._release_fast_poll = None
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(self.config_entry.add_update_listener(self._async_options_updated))
+        self.async_on_remove(self._async_stop_control)
+        last_state = await self.async_get_last_state()
+        if last_state is not None and last_state.state == STATE_ON:
+            self._async_start_control()
+
+    async def _async_options_updated(self, hass, config_entry):
+        if self._controller is not None:
+            self._controller.settings = _solar_settings(config_entry.options)
+
+    async def async_turn_on(self, **kwargs):
+        self._async_start_control()
+        self.async_write_ha_state()
+        self._async_control()
+
+    async def async_turn_off(self, **kwargs):
+        self._async_stop_control()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_start_control(self):
+        self._attr_is_on = True
+        if self._controller is None:
+            from .solar import SolarController
+
+            self._controller = SolarController(_solar_settings(self.config_entry.options))
+        if self._release_fast_poll is None:
+            # A control loop needs fresh readings
+            self._release_fast_poll = self.coordinator.async_hold_fast_poll(self)
+
+    @callback
+    def _async_stop_control(self):
+        self._attr_is_on = False
+        if self._release_fast_poll is not None:
+            self._release_fast_poll()
+            self._release_fast_poll = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        super()._handle_coordinator_update()
+        if self._attr_is_on:
+            self._async_control()
+
+    @callback
+    def _async_control(self):
+        data = self.coordinator.data
+        if data is None or not self.coordinator.last_update_success:
+            return
+        target = self._controller.update(data, monotonic())
+        if target is not None:
+            _LOGGER.debug(f"Solar surplus: Intensity {data.get('Intensity')} -> {target} A")
+            self.hass.async_create_task(self._async_write_intensity(target))
+
+    async def _async_write_intensity(self, target):
+        try:
+            await self.coordinator.async_write("Intensity", target)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            _LOGGER.error(f"Error setting solar intensity {target}: {e}")
+
+
+def _grid_settings(options):
+    from .protection import GridSettings
+
+    return GridSettings(margin_w=options.get(CONF_GRID_MARGIN_W, GridSettings.margin_w))
+
+
+class V2CGridProtectionSwitch(V2CtrydanEntity, SwitchEntity, RestoreEntity):
+    """Keep the household load plus the charge under the contracted power."""
+
+    # State is local, the coordinator checks every snapshot while on
+    _watched_keys = ()
+    _attr_has_entity_name = True
+    _attr_translation_key = "grid_protection"
+    _attr_icon = "mdi:transmission-tower"
+
+    def __init__(self, coordinator, ip_address, config_entry):
+        """Initialize the switch."""
+        super().__init__(coordinator)
+        self.config_entry = config_entry
+        self._attr_unique_id = f"{ip_address}_v2c_grid_protection"
+        self._attr_is_on = False
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(self.config_entry.add_update_listener(self._async_options_updated))
+        self.async_on_remove(lambda: self.coordinator.async_set_protection(None))
+        last_state = await self.async_get_last_state()
+        if last_state is not None and last_state.state == STATE_ON:
+            self._async_set(True)
+
+    async def _async_options_updated(self, hass, config_entry):
+        if self.coordinator.protection is not None:
+            self.coordinator.protection.settings = _grid_settings(config_entry.options)
+
+    async def async_turn_on(self, **kwargs):
+        self._async_set(True)
+        self.async_write_ha_state()
+
+    async def async_turn_off(self, **kwargs):
+        self._async_set(False)
+        self.async_write_ha_state()
+
+    @callback
+    def _async_set(self, on):
+        self._attr_is_on = on
+        protection = None
+        if on:
+            from .protection import GridProtection
+
+            protection = GridProtection(_grid_settings(self.config_entry.options))
+        self.coordinator.async_set_protection(protection)
@@ -0,0 +1,5 @@
+"""Import the integration modules through the development tools loader."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
@@ -0,0 +1,51 @@
+"""Tests of the weighted split of the fleet budget."""
+import random
+
+import pytest
+
+from _integration import HAS_HOMEASSISTANT, load
+
+pytestmark = pytest.mark.skipif(not HAS_HOMEASSISTANT, reason="balancer imports Home Assistant")
+
+
+def _allocate(budget_a, demands):
+    return load("balancer").allocate(budget_a, demands)
+
+
+def _random_demands(rng, count):
+    demands = []
+    for _ in range(count):
+        low = rng.randint(6, 16)
+        demands.append((rng.choice([1, 2, 3, 5]), low, rng.randint(low, 32)))
+    return sorted(demands, key=lambda demand: demand[0], reverse=True)
+
+
+def test_allocation_fits_the_budget_and_the_minimums():
+    rng = random.Random(7)
+    for _ in range(500):
+        demands = _random_demands(rng, rng.randint(1, 6))
+        budget = rng.randint(0, 120)
+        allocation = _allocate(budget, demands)
+        assert len(allocation) == len(demands)
+        assert sum(allocation) <= budget
+        for amps, (_, low, high) in zip(allocation, demands):
+            # 0 pauses the car; otherwise MinIntensity is never undercut
+            assert amps == 0 or low <= amps <= high
+
+
+def test_cars_are_admitted_by_weight():
+    # 20 A covers the minimums of the first two cars only; the 4 A left
+    # are shared 3:2 between them
+    assert _allocate(20, [(3, 6, 32), (2, 10, 32), (1, 6, 32)]) == [9, 11, 0]
+
+
+def test_budget_is_shared_by_weight():
+    assert _allocate(40, [(3, 6, 32), (1, 6, 32)]) == [27, 13]
+
+
+def test_enough_budget_gives_every_car_its_maximum():
+    assert _allocate(100, [(2, 6, 16), (1, 6, 32)]) == [16, 32]
+
+
+def test_no_budget_pauses_everyone():
+    assert _allocate(5, [(2, 6, 16), (1, 6, 32)]) == [0, 0]
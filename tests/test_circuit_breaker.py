@@ -0,0 +1,66 @@
+"""Tests of the per-device circuit breaker."""
+from _integration import load
+
+circuit_breaker = load("circuit_breaker")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock):
+    return circuit_breaker.CircuitBreaker(
+        failure_threshold=3, backoff_base=10, backoff_max=40, jitter=0, clock=clock
+    )
+
+
+def test_opens_after_three_failures():
+    breaker = _breaker(_Clock())
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.allow_request()
+    assert breaker.record_failure()
+    assert breaker.state == circuit_breaker.STATE_OPEN
+    assert not breaker.allow_request()
+    assert breaker.time_until_retry() == 10
+
+
+def test_half_open_lets_one_probe_through():
+    clock = _Clock()
+    breaker = _breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow_request()
+    assert breaker.is_probing
+    assert not breaker.allow_request()
+    assert breaker.record_success()
+    assert breaker.state == circuit_breaker.STATE_CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_with_a_longer_backoff():
+    clock = _Clock()
+    breaker = _breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    for backoff in (20, 40, 40):
+        clock.now += breaker.time_until_retry()
+        assert breaker.allow_request()
+        # Already counted as open: not a new opening
+        assert not breaker.record_failure()
+        assert breaker.state == circuit_breaker.STATE_OPEN
+        assert breaker.time_until_retry() == backoff
+
+
+def test_success_resets_the_failure_count():
+    breaker = _breaker(_Clock())
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.record_success()
+    assert not breaker.record_failure()
+    assert breaker.state == circuit_breaker.STATE_CLOSED
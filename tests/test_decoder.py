@@ -0,0 +1,36 @@
+"""Tests of the tolerant /RealTimeData decoder."""
+from pathlib import Path
+
+import pytest
+
+from _integration import load
+
+decoder = load("decoder")
+
+CORPUS = Path(__file__).resolve().parent.parent / "tools" / "corpus" / "realtimedata"
+
+
+@pytest.mark.parametrize("path", sorted(CORPUS.glob("*.txt")), ids=lambda path: path.stem)
+def test_corpus_decodes(path):
+    data, repairs = decoder.decode_realtime_data(path.read_bytes())
+    assert isinstance(data["FirmwareVersion"], str)
+    assert "ReadyState" in data
+    assert (repairs == 0) == (path.stem in ("clean", "duplicate_firmware_version"))
+
+
+def test_unquoted_version_is_quoted():
+    data, repairs = decoder.decode_realtime_data(b'{"FirmwareVersion":1.6.13,"Paused":0}')
+    assert data == {"FirmwareVersion": "1.6.13", "Paused": 0}
+    assert repairs == 1
+
+
+def test_version_like_string_values_are_left_alone():
+    raw = b'{"SSID":"net:1.2.3,guest","FirmwareVersion":2.1.7"ReadyState":0}'
+    data, repairs = decoder.decode_realtime_data(raw)
+    assert data == {"SSID": "net:1.2.3,guest", "FirmwareVersion": "2.1.7", "ReadyState": 0}
+    assert repairs == 2
+
+
+def test_non_object_payload_is_refused():
+    with pytest.raises(ValueError):
+        decoder.decode_realtime_data(b"[1, 2]")
@@ -0,0 +1,90 @@
+"""Tests of the cheapest-hours planner around DST changes."""
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from _integration import load
+
+planner = load("planner")
+
+MADRID = ZoneInfo("Europe/Madrid")
+
+
+def _midnight(year, month, day):
+    return datetime(year, month, day, tzinfo=MADRID)
+
+
+def _slots(day, curve):
+    tomorrow = _midnight(day.year, day.month, day.day) + timedelta(days=1)
+    return list(planner.hourly_slots(curve, day, tomorrow))
+
+
+def test_spring_forward_day_has_23_slots():
+    day = _midnight(2026, 3, 29)
+    slots = _slots(day, list(range(48)))
+    today = [slot for slot in slots if slot[0].date() == day.date()]
+    assert len(today) == 23
+    # 02:00 does not exist: 01:00 is followed by 03:00
+    assert [start.hour for start, _, _ in today[:3]] == [0, 1, 3]
+    assert [price for _, _, price in today[:3]] == [0, 1, 3]
+    assert all(
+        end.astimezone(timezone.utc) - start.astimezone(timezone.utc) == timedelta(hours=1)
+        for start, end, _ in slots
+    )
+    assert len(slots) == 23 + 24
+
+
+def test_fall_back_day_has_25_slots():
+    day = _midnight(2026, 10, 25)
+    slots = _slots(day, list(range(48)))
+    today = [slot for slot in slots if slot[0].date() == day.date()]
+    assert len(today) == 25
+    # 02:00 happens twice and gets its price both times
+    assert [start.hour for start, _, _ in today[:4]] == [0, 1, 2, 2]
+    assert [price for _, _, price in today[:4]] == [0, 1, 2, 2]
+    assert len(slots) == 25 + 24
+
+
+def _charged_hours(plan):
+    # In UTC: local times of one zone subtract by wall clock
+    return sum(
+        (end.astimezone(timezone.utc) - start.astimezone(timezone.utc)).total_seconds()
+        for start, end in plan.windows
+    ) / 3600
+
+
+def test_plan_over_the_spring_forward_night():
+    day = _midnight(2026, 3, 29)
+    # Cheap from midnight to 05:00 local, expensive afterwards
+    curve = [0.05 if hour < 5 else 0.30 for hour in range(24)] * 2
+    slots = _slots(day, curve)
+    now = datetime(2026, 3, 28, 22, tzinfo=MADRID)
+    departure = datetime(2026, 3, 29, 8, tzinfo=MADRID)
+    plan = planner.plan_charge(slots, 4 * 7.4, 7.4, now, departure)
+    # Only four real hours are cheap that night: 00, 01, 03 and 04
+    assert plan.unmet_kwh == 0
+    assert _charged_hours(plan) == 4
+    assert plan.cost == pytest.approx(4 * 7.4 * 0.05)
+    assert plan.windows[0][0] == day
+    assert plan.windows[-1][1] == datetime(2026, 3, 29, 5, tzinfo=MADRID)
+    assert plan.charging_at(datetime(2026, 3, 29, 3, 30, tzinfo=MADRID))
+    assert not plan.charging_at(datetime(2026, 3, 29, 5, 30, tzinfo=MADRID))
+
+
+def test_plan_over_the_fall_back_night():
+    day = _midnight(2026, 10, 25)
+    curve = [0.05 if hour < 3 else 0.30 for hour in range(24)] * 2
+    slots = _slots(day, curve)
+    now = datetime(2026, 10, 24, 22, tzinfo=MADRID)
+    departure = datetime(2026, 10, 25, 8, tzinfo=MADRID)
+    plan = planner.plan_charge(slots, 4 * 7.4, 7.4, now, departure)
+    # 00:00 to 03:00 local is four real hours that night
+    assert plan.unmet_kwh == 0
+    assert _charged_hours(plan) == 4
+    assert plan.windows == ((day, datetime(2026, 10, 25, 3, tzinfo=MADRID)),)
+    # The second 02:30 is still inside the window
+    second = datetime(2026, 10, 25, 1, 30, tzinfo=timezone.utc)
+    assert second.astimezone(MADRID).hour == 2
+    assert plan.charging_at(second)
+    assert plan.next_change(second) == datetime(2026, 10, 25, 3, tzinfo=MADRID)
@@ -0,0 +1,70 @@
+"""Import V2C Trydan integration modules from the development tools.
+
+When Home Assistant is not installed, the package __init__ cannot run, so
+the package is registered as a bare namespace and only the modules that do
+not depend on Home Assistant (decoder, circuit_breaker, const, ...) can be
+imported.
+"""
+import importlib
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "custom_components.v2c_trydan"
+PACKAGE_DIR = ROOT / "custom_components" / "v2c_trydan"
+
+try:
+    import homeassistant  # noqa: F401
+    HAS_HOMEASSISTANT = True
+except ImportError:
+    HAS_HOMEASSISTANT = False
+
+
+def load(name):
+    """Import and return PACKAGE.<name>."""
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    if not HAS_HOMEASSISTANT and PACKAGE not in sys.modules:
+        for module_name, path in (("custom_components", PACKAGE_DIR.parent), (PACKAGE, PACKAGE_DIR)):
+            module = types.ModuleType(module_name)
+            module.__path__ = [str(path)]
+            sys.modules[module_name] = module
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+async def async_start_homeassistant(config_dir):
+    """Start a bare Home Assistant instance that can load the integration.
+
+    Home Assistant finds the integration through the repository's
+    custom_components package; config_dir only holds .storage.
+    """
+    from homeassistant import bootstrap, config_entries, loader
+    from homeassistant.core import HomeAssistant
+
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+    hass = HomeAssistant(str(config_dir))
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    await hass.async_start()
+    return hass
+
+
+async def async_add_charger(hass, ip_address, options=None):
+    """Add and set up a config entry for the charger at ip_address."""
+    from homeassistant.config_entries import ConfigEntry
+
+    entry = ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=PACKAGE_DIR.name,
+        title=ip_address,
+        data={"ip_address": ip_address},
+        source="user",
+        options=options or {},
+    )
+    await hass.config_entries.async_add(entry)
+    return entry
@@ -0,0 +1,130 @@
+"""Benchmark the fleet poll scheduler with simulated chargers.
+
+Every simulated charger answers after a fixed latency; a fraction of them
+are slow and only give up when the request budget runs out. The report
+shows how evenly polls are staggered, how many requests were in flight at
+once and how late healthy chargers were polled because of the slow ones.
+
+Usage: python tools/bench_fleet.py [--chargers 60] [--slow 0.1] [--duration 15]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from _integration import load
+
+
+class _Hass:
+    """The two attributes of HomeAssistant used by the scheduler."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self._tasks = set()
+
+    def async_create_background_task(self, coro, name):
+        task = self.loop.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+
+class _Charger:
+    """Coordinator stand-in with a fixed response latency."""
+
+    stats = {"in_flight": 0, "max_in_flight": 0}
+
+    def __init__(self, index, latency, interval):
+        self.ip_address = f"10.0.{index // 250}.{index % 250}"
+        self.latency = latency
+        self.poll_interval = interval
+        self.request_budget = None
+        self.scheduler = None
+        self.starts = []
+        self.timeouts = 0
+
+    async def async_refresh(self):
+        stats = self.stats
+        self.starts.append(time.monotonic())
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.wait_for(asyncio.sleep(self.latency), self.request_budget)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+        finally:
+            stats["in_flight"] -= 1
+
+
+async def _run(args):
+    fleet = load("fleet")
+    const = load("const")
+    loop = asyncio.get_running_loop()
+    scheduler = fleet.FleetScheduler(_Hass(loop))
+
+    slow_every = round(1 / args.slow) if args.slow else 0
+    chargers = []
+    for index in range(args.chargers):
+        slow = slow_every and index % slow_every == 0
+        charger = _Charger(index, args.slow_latency if slow else args.latency, const.POLL_INTERVAL_FAST)
+        charger.slow = bool(slow)
+        chargers.append(charger)
+
+    cpu_start = time.process_time()
+    start = time.monotonic()
+    for charger in chargers:
+        scheduler.async_register(charger)
+    await asyncio.sleep(args.duration)
+    for charger in chargers:
+        scheduler.async_unregister(charger)
+    cpu = time.process_time() - cpu_start
+
+    starts = sorted(t - start for charger in chargers for t in charger.starts)
+    window = 0.25
+    busiest, left = 0, 0
+    for right, value in enumerate(starts):
+        while value - starts[left] > window:
+            left += 1
+        busiest = max(busiest, right - left + 1)
+
+    healthy = [charger for charger in chargers if not charger.slow]
+    first_polls = sorted(charger.starts[0] - start for charger in healthy if charger.starts)
+    gaps = sorted(
+        later - earlier
+        for charger in healthy
+        for earlier, later in zip(charger.starts, charger.starts[1:])
+    )
+
+    print(f"chargers            {args.chargers} ({sum(c.slow for c in chargers)} slow)")
+    print(f"polls               {len(starts)} in {args.duration} s")
+    print(f"busiest {window * 1000:.0f} ms       {busiest} poll starts")
+    print(
+        f"max in flight       {_Charger.stats['max_in_flight']} "
+        f"(shared lane limit {const.FLEET_MAX_CONCURRENT_POLLS}, plus chargers over budget)"
+    )
+    print(f"timeouts            {sum(c.timeouts for c in chargers)}")
+    if first_polls:
+        print(f"first poll          all healthy chargers within {first_polls[-1]:.2f} s")
+    if gaps:
+        p99 = gaps[min(len(gaps) - 1, int(len(gaps) * 0.99))]
+        print(
+            f"healthy poll gap    p50 {statistics.median(gaps):.2f} s, p99 {p99:.2f} s, "
+            f"max {gaps[-1]:.2f} s (interval {const.POLL_INTERVAL_FAST} s)"
+        )
+    print(f"CPU                 {cpu * 1000:.1f} ms ({cpu / max(1, len(starts)) * 1e6:.0f} us per poll)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chargers", type=int, default=60)
+    parser.add_argument("--slow", type=float, default=0.1, help="fraction of slow chargers")
+    parser.add_argument("--latency", type=float, default=0.05, help="healthy response time (s)")
+    parser.add_argument("--slow-latency", type=float, default=30.0, help="slow response time (s)")
+    parser.add_argument("--duration", type=float, default=15.0, help="benchmark length (s)")
+    return asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
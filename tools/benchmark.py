@@ -0,0 +1,709 @@
+"""Offline benchmark suite for the integration's hot paths.
+
+Cases:
+- decode: /RealTimeData decode time per corpus payload, next to json.loads
+- refresh: coordinator refresh latency against a local simulated charger
+- fanout: CPU per poll to diff the snapshot and update every entity of one
+  charger, the cost of one state write and of each sensor's native_value
+- entities: construction time and memory of every entity for 100
+  chargers, built by the platforms' own setup
+- write: write round trip through the request gateway
+- startup: config entry setup time with the charger answering, and from
+  the saved snapshot with the charger asleep: its port takes connections
+  and never answers
+- imports: import time of the package and of its platforms and config
+  flow in a fresh interpreter, on top of the Home Assistant modules
+  every setup loads
+- protection: time from a household load spike at the simulated charger
+  to the grid protection's intensity cut, with the headroom already low
+- balancer: allocation time for 100 chargers, and the writes and time
+  the load balancer needs when 20 cars plug in at once on one supply
+- eventbus: cost of a state write of an unrelated entity before and after
+  a charger is set up; the integration only follows its own entities
+- planner: price curve parse, cached valid hours and a 48-hour charge plan
+- backtest: a year of hourly prices replayed against 40 strategy parameters
+- samples: append to and read from the per-charger sample ring, the time
+  to map a full ring file again after a restart and to replay it through
+  the charging session detector
+- scaling: setup time and CPU per poll from 1 to 100 chargers; the
+  simulated chargers run in the same process and are part of the CPU
+
+Every case but decode, planner, backtest and samples needs Home Assistant
+and is skipped without it.
+Results are printed and, with --json, written as a JSON document. Metrics
+are compared against the limits in --thresholds; the exit status is 1 when
+one is exceeded.
+
+Usage: python tools/benchmark.py [--case decode ...] [--quick] [--json out.json]
+           [--thresholds tools/benchmark_thresholds.json]
+"""
+import argparse
+import asyncio
+import compileall
+import contextlib
+import json
+import logging
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from _integration import HAS_HOMEASSISTANT, PACKAGE, PACKAGE_DIR, ROOT, async_add_charger, async_start_homeassistant, load
+from trydan_simulator import start_simulators, stop_simulators
+
+TOOLS = Path(__file__).resolve().parent
+CORPUS = TOOLS / "corpus" / "realtimedata"
+THRESHOLDS = TOOLS / "benchmark_thresholds.json"
+
+# Loaded by Home Assistant before any integration platform, not our cost
+IMPORT_BASELINE = (
+    "homeassistant.config_entries",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.device_registry",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.entity_registry",
+    "homeassistant.helpers.event",
+    "homeassistant.helpers.restore_state",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+    "homeassistant.components.number",
+    "homeassistant.components.select",
+    "homeassistant.components.sensor",
+    "homeassistant.components.switch",
+)
+IMPORT_PLATFORMS = ("config_flow", "sensor", "switch", "number", "select")
+
+# Keys that move between two polls of a charging car
+VOLATILE_KEYS = ("ChargePower", "ChargeEnergy", "ChargeTime", "HousePower", "FVPower")
+
+
+def _best(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+@contextlib.asynccontextmanager
+async def _homeassistant():
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_homeassistant(config_dir)
+        try:
+            yield hass
+        finally:
+            await hass.async_stop(force=True)
+
+
+@contextlib.asynccontextmanager
+async def _simulators(count, port, **options):
+    simulators, runners = await start_simulators(count, port, **options)
+    try:
+        yield simulators
+    finally:
+        await stop_simulators(runners)
+
+
+async def _case_decode(args):
+    decoder = load("decoder")
+    number = 2000 if args.quick else 20000
+    clean = (CORPUS / "clean.txt").read_bytes()
+    baseline = _best(lambda: json.loads(clean), number)
+    results = {"json_loads_us": baseline * 1e6}
+    for path in sorted(CORPUS.glob("*.txt")):
+        raw = path.read_bytes()
+        data, _ = decoder.decode_realtime_data(raw)
+        if not isinstance(data.get("FirmwareVersion"), str) or "ReadyState" not in data:
+            raise ValueError(f"{path.name} decoded to {data}")
+        elapsed = _best(lambda: decoder.decode_realtime_data(raw), number)
+        results[f"{path.stem}_us"] = elapsed * 1e6
+        results[f"{path.stem}_ratio"] = elapsed / baseline
+    return results
+
+
+async def _case_planner(args):
+    pricing = load("pricing")
+    planner = load("planner")
+    number = 200 if args.quick else 2000
+    attributes = {name: 0.1 + (index % 24) / 100 for index, name in enumerate(
+        pricing.PRICE_ATTRIBUTES + pricing.NEXT_DAY_PRICE_ATTRIBUTES
+    )}
+    cache = pricing.PriceCurveCache()
+    cache.update(attributes)
+    cache.valid_hours(0.2, 12)
+    today = datetime(2024, 1, 15, tzinfo=timezone.utc)
+    tomorrow = today + timedelta(days=1)
+    now = today.replace(hour=18, minute=20)
+    departure = tomorrow.replace(hour=7)
+
+    def plan():
+        return planner.plan_charge(
+            planner.hourly_slots(cache.curve, today, tomorrow), 30, 7.4, now, departure
+        )
+
+    if not plan().windows:
+        raise ValueError("the planner found no window")
+    return {
+        "parse_us": _best(lambda: pricing.parse_price_curve(attributes), number) * 1e6,
+        "valid_hours_cached_us": _best(lambda: cache.valid_hours(0.2, 12), number) * 1e6,
+        "plan_us": _best(plan, number) * 1e6,
+    }
+
+
+async def _case_backtest(args):
+    backtest = load("backtest")
+    days = 90 if args.quick else 365
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    hours = range(days * 24)
+    series = backtest.HourlySeries(
+        [start + timedelta(hours=hour) for hour in hours],
+        [0.12 + 0.06 * math.sin(hour / 24 * 2 * math.pi) + (hour * 7919 % 13) / 400 for hour in hours],
+        [max(0.0, 4 * math.sin((hour % 24 - 6) / 12 * math.pi)) for hour in hours],
+        [3.0 if hour % 24 == 20 else 0.0 for hour in hours],
+    )
+    parameters = {
+        "threshold": [0.05 + 0.005 * step for step in range(20)],
+        "cheapest_hours": list(range(1, 13)),
+        "deadline": [None],
+        "solar_first": [0.5, 1, 2, 3, 4, 5, 6],
+    }
+    start_time = time.perf_counter()
+    sessions = backtest.build_sessions(series, 19, 7)
+    results = backtest.run_backtest(sessions, 7.4, parameters)
+    elapsed = time.perf_counter() - start_time
+    return {
+        "sessions": len(sessions),
+        "parameter_sets": len(results),
+        "run_s": elapsed,
+        "us_per_session_and_parameter": elapsed / (len(sessions) * len(results)) * 1e6,
+    }
+
+
+async def _case_samples(args):
+    const = load("const")
+    samples = load("samples")
+    decoder = load("decoder")
+    snapshot, _ = decoder.decode_realtime_data((CORPUS / "clean.txt").read_bytes())
+    capacity = const.SAMPLE_BUFFER_CAPACITY
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "ring.samples")
+        ring = samples.SampleRing(capacity, path)
+        clock = [0.0]
+
+        def _append():
+            clock[0] += 5
+            ring.append(clock[0], snapshot)
+
+        append = _best(_append, 2000 if args.quick else 20000)
+        for _ in range(capacity):
+            _append()
+        window = _best(lambda: ring.last("ChargePower", const.VOLATILITY_WINDOW), 2000 if args.quick else 20000)
+        day = _best(lambda: ring.last("ChargePower", 17280), 5 if args.quick else 50)
+
+        # Worst case replay on start: every poll of a full ring
+        start = time.perf_counter()
+        times = ring.last(samples.TIME, capacity)
+        columns = {key: ring.last(key, capacity) for key in ("ChargeState", "ChargePower", "ChargeEnergy")}
+        detector = load("sessions").SessionDetector()
+        for index, when in enumerate(times):
+            detector.add(when, {key: values[index] for key, values in columns.items()})
+        replay = time.perf_counter() - start
+        ring.close()
+
+        start = time.perf_counter()
+        ring = samples.SampleRing(capacity, path)
+        reopen = time.perf_counter() - start
+        restored = len(ring)
+        ring.close()
+        size = Path(path).stat().st_size
+
+    return {
+        "append_us": append * 1e6,
+        "last_window_us": window * 1e6,
+        "last_day_ms": day * 1000,
+        "reopen_ms": reopen * 1000,
+        "session_replay_ms": replay * 1000,
+        "restored_samples": restored,
+        "file_mib": size / 2**20,
+    }
+
+
+async def _case_refresh(args):
+    coordinator_module = load("coordinator")
+    samples = []
+    async with _simulators(1, args.port) as simulators, _homeassistant() as hass:
+        coordinator = coordinator_module.V2CtrydanDataUpdateCoordinator(hass, simulators[0].address)
+        for _ in range(50 if args.quick else 300):
+            # Skip the snapshot cache so every refresh reaches the device
+            coordinator._snapshot = None
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            samples.append(time.perf_counter() - start)
+            if not coordinator.last_update_success:
+                raise RuntimeError(f"refresh failed: {coordinator.last_exception}")
+        coordinator.gateway.async_shutdown()
+    return {
+        "latency_p50_ms": statistics.median(samples) * 1000,
+        "latency_p95_ms": _percentile(samples, 0.95) * 1000,
+    }
+
+
+async def _case_fanout(args):
+    from homeassistant.helpers.entity_platform import async_get_platforms
+
+    const = load("const")
+    polls = 200 if args.quick else 1000
+    async with _simulators(1, args.port + 1) as simulators, _homeassistant() as hass:
+        entry = await async_add_charger(hass, simulators[0].address)
+        await hass.async_block_till_done()
+        coordinator = hass.data[const.DOMAIN][entry.entry_id]
+        hass.data[const.DATA_FLEET].async_unregister(coordinator)
+        entities = [
+            entity
+            for entity_platform in async_get_platforms(hass, const.DOMAIN)
+            for entity in entity_platform.entities.values()
+        ]
+
+        payloads = []
+        for step in range(2):
+            payload = dict(coordinator.data)
+            for key in VOLATILE_KEYS:
+                payload[key] = (payload.get(key) or 0) + step + 1
+            payloads.append(payload)
+
+        state_writes = 0
+
+        def _count(event):
+            nonlocal state_writes
+            state_writes += 1
+
+        unsub = hass.bus.async_listen("state_changed", _count)
+        cpu_start = time.process_time()
+        for poll in range(polls):
+            # Serve the poll from the snapshot cache: everything but the HTTP request
+            coordinator._snapshot = payloads[poll % 2]
+            coordinator._snapshot_started = time.monotonic()
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+        cpu = time.process_time() - cpu_start
+        unsub()
+
+        state_write = _best(
+            lambda: [entity.async_write_ha_state() for entity in entities], 20 if args.quick else 200
+        ) / len(entities)
+
+        sensors = [entity for entity in entities if hasattr(type(entity), "native_value")]
+        native_value = {
+            entity.entity_id: _best(lambda: entity.native_value, 200 if args.quick else 2000)
+            for entity in sensors
+        }
+        await hass.config_entries.async_unload(entry.entry_id)
+
+    return {
+        "entities": len(entities),
+        "poll_us": cpu / polls * 1e6,
+        "state_writes_per_poll": state_writes / polls,
+        "state_write_us": state_write * 1e6,
+        "native_value_mean_us": statistics.mean(native_value.values()) * 1e6,
+        "native_value_max_us": max(native_value.values()) * 1e6,
+    }
+
+
+async def _case_entities(args):
+    from homeassistant.config_entries import ConfigEntry
+
+    const = load("const")
+    coordinator_module = load("coordinator")
+    decoder = load("decoder")
+    platforms = [load(name) for name in ("switch", "number", "select", "sensor")]
+    snapshot, _ = decoder.decode_realtime_data((CORPUS / "clean.txt").read_bytes())
+    chargers = 20 if args.quick else 100
+
+    async with _homeassistant() as hass:
+        entries = []
+        for index in range(chargers):
+            ip_address = f"10.0.{index // 250}.{index % 250 + 1}"
+            coordinator = coordinator_module.V2CtrydanDataUpdateCoordinator(hass, ip_address)
+            coordinator.data = dict(snapshot)
+            entry = ConfigEntry(
+                version=1, minor_version=1, domain=const.DOMAIN, title=ip_address,
+                data={"ip_address": ip_address}, source="user", options={},
+            )
+            hass.data.setdefault(const.DOMAIN, {})[entry.entry_id] = coordinator
+            entries.append(entry)
+
+        entities = []
+
+        def _add(new_entities, update_before_add=False):
+            entities.extend(new_entities)
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for entry in entries:
+            for platform_module in platforms:
+                await platform_module.async_setup_entry(hass, entry, _add)
+        elapsed = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        # Properties Home Assistant reads on every state write; the first
+        # pass stands for the registration, the second one is timed
+        lookups = 0.0
+        for _ in range(2):
+            start = time.perf_counter()
+            for entity in entities:
+                (
+                    entity.unique_id, entity.device_info, entity.device_class,
+                    entity.capability_attributes, entity.unit_of_measurement, entity.entity_category,
+                )
+            lookups = time.perf_counter() - start
+
+    return {
+        "entities_per_charger": len(entities) / chargers,
+        "setup_us_per_entity": elapsed / len(entities) * 1e6,
+        "bytes_per_entity": memory / len(entities),
+        "kib_per_charger": memory / chargers / 1024,
+        "static_properties_us": lookups / len(entities) * 1e6,
+    }
+
+
+async def _case_eventbus(args):
+    writes = 2000 if args.quick else 20000
+
+    async def _unrelated_writes(hass):
+        start = time.perf_counter()
+        for index in range(writes):
+            hass.states.async_set(f"sensor.unrelated_{index % 100}", index)
+        await hass.async_block_till_done()
+        return (time.perf_counter() - start) / writes
+
+    async with _simulators(1, args.port + 3) as simulators, _homeassistant() as hass:
+        await _unrelated_writes(hass)
+        listeners = sum(hass.bus.async_listeners().values())
+        baseline = min([await _unrelated_writes(hass) for _ in range(3)])
+
+        entry = await async_add_charger(hass, simulators[0].address)
+        await hass.async_block_till_done()
+        added = sum(hass.bus.async_listeners().values()) - listeners
+        loaded = min([await _unrelated_writes(hass) for _ in range(3)])
+        await hass.config_entries.async_unload(entry.entry_id)
+
+    return {
+        "baseline_write_us": baseline * 1e6,
+        "loaded_write_us": loaded * 1e6,
+        "overhead_us": max(0.0, loaded - baseline) * 1e6,
+        "listeners_added": added,
+    }
+
+
+async def _case_write(args):
+    coordinator_module = load("coordinator")
+    gateway = load("gateway")
+    results = {}
+    async with _simulators(1, args.port + 2) as simulators, _homeassistant() as hass:
+        coordinator = coordinator_module.V2CtrydanDataUpdateCoordinator(hass, simulators[0].address)
+        await coordinator.async_refresh()
+        for name, priority, count in (
+            ("safety", gateway.PRIORITY_SAFETY, 30 if args.quick else 200),
+            ("user", gateway.PRIORITY_USER, 4 if args.quick else 20),
+        ):
+            samples = []
+            for index in range(count):
+                start = time.perf_counter()
+                await coordinator.async_write("Intensity", 6 + index % 27, priority)
+                samples.append(time.perf_counter() - start)
+            results[f"{name}_p50_ms"] = statistics.median(samples) * 1000
+            results[f"{name}_p95_ms"] = _percentile(samples, 0.95) * 1000
+        coordinator.gateway.async_shutdown()
+    return results
+
+
+async def _case_startup(args):
+    const = load("const")
+    async with _homeassistant() as hass:
+        simulators, runners = await start_simulators(1, args.port + 5)
+        try:
+            start = time.perf_counter()
+            entry = await async_add_charger(hass, simulators[0].address)
+            await hass.async_block_till_done()
+            online = time.perf_counter() - start
+            await hass.config_entries.async_unload(entry.entry_id)
+        finally:
+            await stop_simulators(runners)
+
+        # A refused connection fails at once; a sleeping charger makes
+        # every request wait for its timeout
+        host, port = simulators[0].address.split(":")
+        silent = await asyncio.start_server(lambda reader, writer: None, host, int(port))
+        try:
+            start = time.perf_counter()
+            if not await hass.config_entries.async_setup(entry.entry_id):
+                raise RuntimeError("setup failed with the charger offline")
+            # Not waiting for the tasks: the first poll runs in the background
+            offline = time.perf_counter() - start
+            entities = sum(
+                1 for entity_id in hass.states.async_entity_ids()
+                if entity_id.split(".", 1)[1].startswith(const.DOMAIN)
+            )
+            await hass.config_entries.async_unload(entry.entry_id)
+        finally:
+            silent.close()
+    return {
+        "online_setup_ms": online * 1000,
+        "offline_setup_ms": offline * 1000,
+        "offline_entities": entities,
+    }
+
+
+def _import_times():
+    """Import the package and then its platforms with -X importtime.
+
+    Returns {stage: (cumulative seconds, modules loaded)}; the stages are
+    told apart by marker lines the script writes between the imports.
+    """
+    script = "\n".join([
+        "import sys",
+        *(f"import {module}" for module in IMPORT_BASELINE),
+        "sys.stderr.write('--package\\n')",
+        f"import {PACKAGE}",
+        "sys.stderr.write('--platforms\\n')",
+        *(f"import {PACKAGE}.{platform}" for platform in IMPORT_PLATFORMS),
+    ])
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stderr
+    stages = {}
+    stage = None
+    for line in stderr.splitlines():
+        if line.startswith("--"):
+            stage = line[2:]
+            stages[stage] = [0.0, 0]
+        elif stage is not None and line.startswith("import time:"):
+            _, cumulative, name = line[len("import time:"):].split("|")
+            stages[stage][1] += 1
+            # Nested imports are indented, their time is in the outer one
+            if name[1] != " ":
+                stages[stage][0] += int(cumulative) / 1e6
+    return stages
+
+
+async def _case_imports(args):
+    # Bytecode is written up front, the runs measure imports and not compiles
+    compileall.compile_dir(PACKAGE_DIR, quiet=1)
+    runs = [await asyncio.to_thread(_import_times) for _ in range(3 if args.quick else 9)]
+    return {
+        "package_ms": min(run["package"][0] for run in runs) * 1000,
+        "platforms_ms": min(run["platforms"][0] for run in runs) * 1000,
+        "package_modules": runs[0]["package"][1],
+        "platform_modules": runs[0]["platforms"][1],
+    }
+
+
+async def _case_protection(args):
+    const = load("const")
+    protection = load("protection")
+    trials = 5 if args.quick else 20
+    samples = []
+    async with _simulators(1, args.port + 4) as simulators, _homeassistant() as hass:
+        simulator = simulators[0]
+        simulator.write("ContractedPower", "9000")
+        entry = await async_add_charger(hass, simulator.address)
+        await hass.async_block_till_done()
+        coordinator = hass.data[const.DOMAIN][entry.entry_id]
+        coordinator.async_set_protection(protection.GridProtection())
+        for _ in range(trials):
+            # 16 A with 3.5 kW of household load leaves under 1.5 kW: burst polling
+            simulator.add_load(3500)
+            simulator.write("Intensity", "16")
+            await asyncio.sleep(1)
+            while coordinator.poll_interval != const.POLL_INTERVAL_BURST:
+                await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            simulator.add_load(5500)
+            while simulator.state["Intensity"] >= 16:
+                if time.perf_counter() - start > 10:
+                    raise RuntimeError("the grid protection did not react")
+                await asyncio.sleep(0.002)
+            samples.append(time.perf_counter() - start)
+        reaction = coordinator.metrics.protection
+        results = {
+            "spike_to_cut_p50_ms": statistics.median(samples) * 1000,
+            "spike_to_cut_max_ms": max(samples) * 1000,
+            "reaction_p50_ms": reaction.percentile(0.5) * 1000,
+            "reaction_p95_ms": reaction.percentile(0.95) * 1000,
+        }
+        await hass.config_entries.async_unload(entry.entry_id)
+    return results
+
+
+async def _case_balancer(args):
+    balancer = load("balancer")
+    const = load("const")
+    demands = sorted(((index % 10 + 1, 6, 32) for index in range(100)), reverse=True)
+    allocate = _best(lambda: balancer.allocate(1500, demands), 100 if args.quick else 1000)
+
+    count = 20
+    contracted_w = 30000
+    duration = 15 if args.quick else 60
+    async with _simulators(count, args.port + 200, plugged=False) as simulators, _homeassistant() as hass:
+        for simulator in simulators:
+            simulator.write("ContractedPower", str(contracted_w))
+            await async_add_charger(hass, simulator.address, {const.CONF_BALANCE_WEIGHT: 1})
+        await hass.async_block_till_done()
+        writes = sum(simulator.writes for simulator in simulators)
+
+        start = time.perf_counter()
+        for simulator in simulators:
+            simulator.plug()
+        # Stand in for the next polls noticing the cars
+        fleet = hass.data[const.DATA_FLEET]
+        for coordinator in hass.data[const.DOMAIN].values():
+            coordinator._snapshot = None
+            fleet.async_poll_within(coordinator, 0)
+
+        settled = None
+        overload_w = 0.0
+        while time.perf_counter() - start < duration:
+            await asyncio.sleep(0.1)
+            house_w = max(simulator.state["HousePower"] for simulator in simulators)
+            draw_w = sum(
+                simulator.state["Intensity"] * simulator.state["VoltageInstallation"]
+                for simulator in simulators if not simulator.state["Paused"]
+            )
+            overload_w = house_w + draw_w - contracted_w
+            if settled is None and overload_w <= 0:
+                settled = time.perf_counter() - start
+        writes = sum(simulator.writes for simulator in simulators) - writes
+        for entry in hass.config_entries.async_entries(const.DOMAIN):
+            await hass.config_entries.async_unload(entry.entry_id)
+
+    if settled is None:
+        raise RuntimeError(f"the chargers still draw {overload_w:.0f} W over the supply")
+    return {
+        "allocate_100_us": allocate * 1e6,
+        "plugin_settle_s": settled,
+        "plugin_writes_per_charger": writes / count,
+        "final_overload_w": overload_w,
+    }
+
+
+async def _case_scaling(args):
+    counts = (1, 10) if args.quick else (1, 10, 100)
+    duration = 5 if args.quick else 15
+    results = {}
+    port = args.port + 10
+    for count in counts:
+        async with _simulators(count, port) as simulators, _homeassistant() as hass:
+            start = time.perf_counter()
+            for simulator in simulators:
+                await async_add_charger(hass, simulator.address)
+            await hass.async_block_till_done()
+            results[f"{count}_setup_s"] = time.perf_counter() - start
+
+            requests = sum(simulator.requests for simulator in simulators)
+            cpu_start = time.process_time()
+            await asyncio.sleep(duration)
+            cpu = time.process_time() - cpu_start
+            polls = sum(simulator.requests for simulator in simulators) - requests
+            results[f"{count}_polls_per_s"] = polls / duration
+            results[f"{count}_cpu_ms_per_poll"] = cpu / max(1, polls) * 1000
+            for entry in hass.config_entries.async_entries(load("const").DOMAIN):
+                await hass.config_entries.async_unload(entry.entry_id)
+        port += count
+    return results
+
+
+CASES = {
+    "decode": (_case_decode, False),
+    "refresh": (_case_refresh, True),
+    "fanout": (_case_fanout, True),
+    "entities": (_case_entities, True),
+    "eventbus": (_case_eventbus, True),
+    "write": (_case_write, True),
+    "startup": (_case_startup, True),
+    "imports": (_case_imports, True),
+    "protection": (_case_protection, True),
+    "balancer": (_case_balancer, True),
+    "planner": (_case_planner, False),
+    "backtest": (_case_backtest, False),
+    "samples": (_case_samples, False),
+    "scaling": (_case_scaling, True),
+}
+
+
+def _check(results, thresholds):
+    """Return the metrics outside their thresholds."""
+    regressions = []
+    for metric, limits in thresholds.items():
+        value = results.get(metric)
+        if value is None:
+            continue
+        if "max" in limits and value > limits["max"]:
+            regressions.append(f"{metric} = {value:.4g} > {limits['max']}")
+        if "min" in limits and value < limits["min"]:
+            regressions.append(f"{metric} = {value:.4g} < {limits['min']}")
+    return regressions
+
+
+async def _run(args):
+    results = {}
+    skipped = []
+    for name in args.case or CASES:
+        case, needs_homeassistant = CASES[name]
+        if needs_homeassistant and not HAS_HOMEASSISTANT:
+            skipped.append(name)
+            print(f"{name:8} skipped, Home Assistant is not installed")
+            continue
+        for metric, value in (await case(args)).items():
+            results[f"{name}.{metric}"] = value
+            print(f"{name:8} {metric:36} {value:10.3f}")
+    return results, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--case", action="append", choices=CASES, help="run only this case, repeatable")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a smoke run")
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS, help="regression limits")
+    parser.add_argument("--port", type=int, default=18500, help="first port for simulated chargers")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    results, skipped = asyncio.run(_run(args))
+    thresholds = json.loads(args.thresholds.read_text()) if args.thresholds.exists() else {}
+    regressions = _check(results, thresholds)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    if args.json:
+        homeassistant_version = None
+        if HAS_HOMEASSISTANT:
+            from homeassistant.const import __version__ as homeassistant_version
+        document = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "homeassistant": homeassistant_version,
+            "quick": args.quick,
+            "skipped": skipped,
+            "results": results,
+            "regressions": regressions,
+        }
+        args.json.write_text(json.dumps(document, indent=2) + "\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""Local stand-in for V2C Trydan chargers.
+
+Serves /RealTimeData and /write/<Key>=<value> like the charger's embedded
+web server, with a small charging model (plug-in, charging, pause, lock,
+dynamic power modes), the known firmware quirks and injectable faults:
+latency, requests that never answer and connection resets. The state is
+advanced lazily on each request, so hundreds of instances fit on one host.
+
+Every instance listens on its own port; add them to Home Assistant as
+127.0.0.1:<port>. GET /sim/plug and /sim/unplug connect or disconnect the
+simulated car, GET /sim/load?watts=N adds N W of household load.
+
+Usage: python tools/trydan_simulator.py [--count 1] [--port 18000]
+           [--quirks all] [--latency 0.05] [--timeout-rate 0.01] ...
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+
+from aiohttp import web
+
+QUIRKS = (
+    "duplicate_firmware_version",
+    "unquoted_version",
+    "missing_comma_readystate",
+    "text_content_type",
+)
+
+FIRMWARE_VERSION = "2.1.7"
+
+# Keys accepted by /write and their allowed range
+WRITABLE = {
+    "Paused": (0, 1),
+    "Locked": (0, 1),
+    "Timer": (0, 1),
+    "Dynamic": (0, 1),
+    "PauseDynamic": (0, 1),
+    "DynamicPowerMode": (0, 7),
+    "Intensity": (6, 32),
+    "MinIntensity": (6, 32),
+    "MaxIntensity": (6, 32),
+    "ContractedPower": (-1, 50000),
+}
+
+# ChargeState values reported by the device
+NOT_CONNECTED = 0
+CONNECTED = 1
+CHARGING = 2
+
+
+class SimulatedTrydan:
+    """State and HTTP handlers of one simulated charger."""
+
+    def __init__(
+        self,
+        index=0,
+        quirks=(),
+        latency=0.0,
+        jitter=0.0,
+        timeout_rate=0.0,
+        reset_rate=0.0,
+        error_rate=0.0,
+        plugged=True,
+        seed=None,
+    ):
+        self.quirks = frozenset(quirks)
+        self.latency = latency
+        self.jitter = jitter
+        self.timeout_rate = timeout_rate
+        self.reset_rate = reset_rate
+        self.error_rate = error_rate
+        self._random = random.Random(index if seed is None else seed)
+        self._phase = self._random.uniform(0, 2 * math.pi)
+        self._updated = time.monotonic()
+        self.requests = 0
+        self.writes = 0
+        self.extra_load = 0.0
+        self.state = {
+            "ID": f"SIM{index:05d}",
+            "SignalStatus": 3,
+            "SSID": "SimWifi",
+            "IP": f"10.0.{index // 250}.{index % 250 + 1}",
+            "ChargeState": CONNECTED if plugged else NOT_CONNECTED,
+            "ChargePower": 0.0,
+            "ChargeEnergy": 0.0,
+            "SlaveError": 0,
+            "ChargeTime": 0,
+            "HousePower": 0.0,
+            "FVPower": 0.0,
+            "BatteryPower": 0.0,
+            "Paused": 0,
+            "Locked": 0,
+            "Timer": 0,
+            "Intensity": 16,
+            "Dynamic": 0,
+            "MinIntensity": 6,
+            "MaxIntensity": 32,
+            "PauseDynamic": 0,
+            "FirmwareVersion": FIRMWARE_VERSION,
+            "ReadyState": 0,
+            "DynamicPowerMode": 0,
+            "ContractedPower": 6900,
+            "VoltageInstallation": 230,
+        }
+        self._advance(0)
+
+    def plug(self, plugged=True):
+        """Connect or disconnect the simulated car."""
+        self._advance(time.monotonic() - self._updated)
+        self.state["ChargeState"] = CONNECTED if plugged else NOT_CONNECTED
+        if not plugged:
+            self.state["ChargeEnergy"] = 0.0
+            self.state["ChargeTime"] = 0
+        self._advance(0)
+
+    def add_load(self, watts):
+        """Switch on (or off, with 0) an extra household load of watts."""
+        self._advance(time.monotonic() - self._updated)
+        self.extra_load = watts
+        self._advance(0)
+
+    def write(self, key, raw_value):
+        """Apply a write; returns False when the device would answer ERROR."""
+        if key not in WRITABLE:
+            return False
+        try:
+            value = int(raw_value)
+        except ValueError:
+            return False
+        low, high = WRITABLE[key]
+        if not low <= value <= high:
+            return False
+        state = self.state
+        if key == "Intensity" and not state["MinIntensity"] <= value <= state["MaxIntensity"]:
+            return False
+        if key == "MinIntensity" and value > state["MaxIntensity"]:
+            return False
+        if key == "MaxIntensity" and value < state["MinIntensity"]:
+            return False
+        self._advance(time.monotonic() - self._updated)
+        state[key] = value
+        self.writes += 1
+        self._advance(0)
+        return True
+
+    def _dynamic_intensity(self, surplus_amps):
+        """Intensity chosen by the device's own control loop, None to stop."""
+        state = self.state
+        low, high = state["MinIntensity"], state["MaxIntensity"]
+        mode = state["DynamicPowerMode"]
+        if mode in (2, 5):
+            # Solar only: stop when the surplus does not cover the minimum
+            return None if surplus_amps < low else min(high, surplus_amps)
+        if mode == 3:
+            return max(low, min(high, surplus_amps))
+        if mode == 4:
+            return max(low, min(high, low + surplus_amps))
+        # Timed power modes stay under the contracted power
+        contracted = state["ContractedPower"]
+        if contracted <= 0:
+            return high
+        headroom = (contracted - state["HousePower"]) / state["VoltageInstallation"]
+        return max(low, min(high, int(headroom)))
+
+    def _advance(self, elapsed):
+        """Move the model forward by elapsed seconds."""
+        self._updated += elapsed
+        state = self.state
+        voltage = state["VoltageInstallation"]
+        clock = self._updated / 60 + self._phase
+        state["FVPower"] = round(max(0.0, 4000 * math.sin(clock / 10)) + self._random.uniform(0, 150), 1)
+        state["HousePower"] = round(
+            400 + 300 * (1 + math.sin(clock)) + self._random.uniform(0, 100) + self.extra_load, 1
+        )
+
+        # Energy for the elapsed time at the power reported until now
+        if state["ChargeState"] == CHARGING:
+            state["ChargeEnergy"] = round(state["ChargeEnergy"] + state["ChargePower"] * elapsed / 3600000, 3)
+            state["ChargeTime"] += int(elapsed)
+
+        intensity = None
+        if state["ChargeState"] != NOT_CONNECTED and not state["Paused"] and not state["Locked"]:
+            if state["Dynamic"]:
+                surplus_amps = int((state["FVPower"] - state["HousePower"]) / voltage)
+                intensity = self._dynamic_intensity(surplus_amps)
+                state["PauseDynamic"] = int(intensity is None)
+                if intensity is not None:
+                    state["Intensity"] = intensity
+            else:
+                intensity = state["Intensity"]
+
+        if intensity is None:
+            state["ChargePower"] = 0.0
+            if state["ChargeState"] == CHARGING:
+                state["ChargeState"] = CONNECTED
+        else:
+            state["ChargePower"] = round(intensity * voltage * self._random.uniform(0.97, 1.0), 1)
+            state["ChargeState"] = CHARGING
+
+    def render(self):
+        """Return the /RealTimeData body with the enabled quirks."""
+        body = json.dumps(self.state, separators=(",", ":"))
+        version = f'"FirmwareVersion":"{FIRMWARE_VERSION}"'
+        if "duplicate_firmware_version" in self.quirks:
+            body = body.replace(version, f"{version},{version}")
+        if "unquoted_version" in self.quirks and version in body:
+            # Only the last occurrence, like the firmware that sends both
+            head, _, tail = body.rpartition(version)
+            body = f'{head}"FirmwareVersion":{FIRMWARE_VERSION}{tail}'
+        if "missing_comma_readystate" in self.quirks:
+            body = body.replace(',"ReadyState"', '"ReadyState"')
+        return body
+
+    async def _fault(self, request):
+        """Apply latency and faults; returns True if the request was dropped."""
+        self.requests += 1
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < self.timeout_rate:
+            # Never answer, like a device stuck on a request
+            await asyncio.sleep(3600)
+        if roll < self.timeout_rate + self.reset_rate:
+            request.transport.close()
+            return True
+        return False
+
+    async def handle_realtime_data(self, request):
+        if await self._fault(request):
+            raise web.HTTPServiceUnavailable()
+        if self._random.random() < self.error_rate:
+            raise web.HTTPInternalServerError()
+        self._advance(time.monotonic() - self._updated)
+        content_type = "text/html" if "text_content_type" in self.quirks else "application/json"
+        return web.Response(text=self.render(), content_type=content_type)
+
+    async def handle_write(self, request):
+        if await self._fault(request):
+            raise web.HTTPServiceUnavailable()
+        key, _, value = request.match_info["assignment"].partition("=")
+        return web.Response(text="OK" if self.write(key, value) else "ERROR", content_type="text/html")
+
+    async def handle_plug(self, request):
+        self.plug(request.path.endswith("/plug"))
+        return web.Response(text="OK")
+
+    async def handle_load(self, request):
+        try:
+            self.add_load(float(request.query.get("watts", 0)))
+        except ValueError:
+            raise web.HTTPBadRequest()
+        return web.Response(text="OK")
+
+    def application(self):
+        app = web.Application()
+        app.router.add_get("/RealTimeData", self.handle_realtime_data)
+        app.router.add_get("/write/{assignment}", self.handle_write)
+        app.router.add_get("/sim/plug", self.handle_plug)
+        app.router.add_get("/sim/unplug", self.handle_plug)
+        app.router.add_get("/sim/load", self.handle_load)
+        return app
+
+
+async def start_simulators(count, port, host="127.0.0.1", **options):
+    """Start count simulators on consecutive ports.
+
+    Returns (simulators, runners); pass the runners to stop_simulators.
+    """
+    simulators = []
+    runners = []
+    for index in range(count):
+        simulator = SimulatedTrydan(index, **options)
+        runner = web.AppRunner(simulator.application(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port + index, backlog=16).start()
+        simulator.address = f"{host}:{port + index}"
+        simulators.append(simulator)
+        runners.append(runner)
+    return simulators, runners
+
+
+async def stop_simulators(runners):
+    await asyncio.gather(*(runner.cleanup() for runner in runners))
+
+
+def _parse_quirks(value):
+    if value in ("", "none"):
+        return ()
+    if value == "all":
+        return QUIRKS
+    quirks = tuple(value.split(","))
+    unknown = set(quirks) - set(QUIRKS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown quirks: {', '.join(sorted(unknown))}")
+    return quirks
+
+
+async def _serve(args):
+    options = {
+        "quirks": args.quirks,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "timeout_rate": args.timeout_rate,
+        "reset_rate": args.reset_rate,
+        "error_rate": args.error_rate,
+    }
+    simulators, runners = await start_simulators(args.count, args.port, args.host, **options)
+    # Spread the plugged-in cars evenly over the chargers
+    for index, simulator in enumerate(simulators):
+        simulator.plug(math.floor((index + 1) * args.plugged) > math.floor(index * args.plugged))
+    print(f"{len(simulators)} simulated chargers on {args.host}:{args.port}-{args.port + args.count - 1}")
+    try:
+        while True:
+            await asyncio.sleep(args.report or 3600)
+            if args.report:
+                requests = sum(simulator.requests for simulator in simulators)
+                writes = sum(simulator.writes for simulator in simulators)
+                print(f"{requests} requests, {writes} writes")
+    finally:
+        await stop_simulators(runners)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1, help="number of chargers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18000, help="port of the first charger")
+    parser.add_argument("--quirks", type=_parse_quirks, default=(), help=f"'all' or a comma list of {', '.join(QUIRKS)}")
+    parser.add_argument("--latency", type=float, default=0.05, help="response latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="+/- latency jitter (s)")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests never answered")
+    parser.add_argument("--reset-rate", type=float, default=0.0, help="fraction of connections reset")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of HTTP 500 on /RealTimeData")
+    parser.add_argument("--plugged", type=float, default=0.5, help="fraction of chargers with a car plugged in")
+    parser.add_argument("--report", type=float, default=0, help="print request counts every N seconds")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())